@@ -0,0 +1,122 @@
+"""Database selection, a throwaway mongod, and RSS sampling for the benchmark scripts."""
+import asyncio
+import contextlib
+import importlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BENCH_DB_PREFIX = "bench"
+
+
+def load_server(mongo_url: str, db_name: str, allow_any_db: bool = False):
+    """Import server.py against the given database.
+
+    server.py binds its Mongo client at import time, so the environment has to be
+    set first. Seeding drops collections, hence the guard on the database name.
+    """
+    if not db_name.startswith(BENCH_DB_PREFIX) and not allow_any_db:
+        raise SystemExit(
+            f"Refusing to use database {db_name!r}; bench databases must start with {BENCH_DB_PREFIX!r}"
+        )
+    if "server" in sys.modules:
+        raise RuntimeError("server was imported before the benchmark database was chosen")
+    os.environ["MONGO_URL"] = mongo_url
+    os.environ["DB_NAME"] = db_name
+    return importlib.import_module("server")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def ephemeral_mongod():
+    """Run a private mongod on tmpfs (when available) and yield its URL.
+
+    This is the in-memory stand-in: GridFS, aggregation, $text and
+    find_one_and_update pipelines all need a real server, so we use a real
+    server whose data directory lives in RAM and is deleted afterwards.
+    """
+    mongod = shutil.which("mongod")
+    if not mongod:
+        raise SystemExit("--ephemeral needs a mongod binary on PATH")
+    shm = Path("/dev/shm")
+    dbpath = tempfile.mkdtemp(prefix="bench-mongod-", dir=shm if shm.is_dir() else None)
+    port = free_port()
+    process = subprocess.Popen(
+        [mongod, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"mongodb://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                MongoClient(url, serverSelectionTimeoutMS=500).admin.command("ping")
+                break
+            except PyMongoError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise SystemExit("mongod did not start")
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+
+def rss_bytes(pid: str = "self") -> int:
+    """Resident set size from /proc (Linux); 0 where that isn't available"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class RssSampler:
+    """Track start, end and peak RSS of a process while a scenario runs"""
+
+    def __init__(self, pid: str = "self", interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.start = self.peak = self.end = 0
+        self._task = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes(self.pid))
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self.start = self.peak = rss_bytes(self.pid)
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self.end = rss_bytes(self.pid)
+        self.peak = max(self.peak, self.end)
+
+    def report(self) -> dict:
+        mb = 1024 * 1024
+        return {
+            "start_mb": round(self.start / mb, 1),
+            "end_mb": round(self.end / mb, 1),
+            "peak_mb": round(self.peak / mb, 1),
+        }
@@ -0,0 +1,278 @@
+"""Async load scenarios for the API with per-endpoint latency, throughput and RSS.
+
+Each scenario mimics one client: the manager dashboard, the mechanic dashboard,
+login, or invoice PDF downloads. It runs with --concurrency virtual users for
+--duration seconds. Scenarios run one after another so RSS can be attributed
+to them. By default the app runs in-process behind httpx's ASGI transport, so
+RSS is the server's own. With --base-url the harness drives a running server
+instead, and --server-pid points RSS sampling at it.
+
+Results are written as JSON with sorted keys so two runs can be diffed;
+--baseline prints p95 and throughput changes against an earlier file.
+
+Run from backend/:
+    python -m benchmarks.load --ephemeral --seed 10000 --output bench.json
+    python -m benchmarks.load --db bench_10000 --scenarios manager,mechanic --baseline old.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.environment import RssSampler, ephemeral_mongod, load_server
+from benchmarks.seed import BENCH_PASSWORD, seed
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        await response.aread()
+        self.latencies[label].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def summary(self, wall_seconds: float) -> dict:
+        endpoints = {}
+        for label, values in self.latencies.items():
+            values = sorted(values)
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "throughput_rps": round(len(values) / wall_seconds, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            }
+        return endpoints
+
+
+class BenchContext:
+    """Tokens and sample IDs collected once, before any scenario runs"""
+
+    def __init__(self):
+        self.manager_token = None
+        self.mechanics = []  # [{"username", "token", "job_ids"}]
+        self.invoice_ids = []
+        self.search_terms = []
+
+    @staticmethod
+    def auth(token: str) -> dict:
+        return {"Authorization": f"Bearer {token}"}
+
+
+async def login_as(client: httpx.AsyncClient, username: str) -> str:
+    response = await client.post("/api/auth/login", json={"username": username, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def build_context(server, client: httpx.AsyncClient) -> BenchContext:
+    ctx = BenchContext()
+    ctx.manager_token = await login_as(client, "bench-manager")
+    async for user in server.db.users.find({"role": "Mechanic"}, {"_id": 0, "id": 1, "username": 1}):
+        job_ids = [job["id"] async for job in server.db.jobs.find(
+            {"assigned_mechanic_id": user["id"]}, {"_id": 0, "id": 1}
+        ).limit(50)]
+        ctx.mechanics.append({
+            "username": user["username"],
+            "token": await login_as(client, user["username"]),
+            "job_ids": job_ids,
+        })
+    ctx.invoice_ids = [inv["id"] async for inv in server.db.invoices.find({}, {"_id": 0, "id": 1}).limit(200)]
+    async for job in server.db.jobs.aggregate([{"$sample": {"size": 50}}]):
+        ctx.search_terms += [job["registration_number"][:6], job["contact_number"][:5], job["customer_name"]]
+    return ctx
+
+
+# Scenarios: one iteration is what a single page load or action costs the API
+async def manager_dashboard(client, ctx: BenchContext, rec: Recorder, rng: random.Random):
+    headers = ctx.auth(ctx.manager_token)
+    page = await rec.request(client, "GET /jobs/summary", "GET", "/api/jobs/summary",
+                             params={"limit": 200}, headers=headers)
+    job_ids = [job["id"] for job in page.json().get("items", [])]
+    await rec.request(client, "GET /stats", "GET", "/api/stats", headers=headers)
+    await rec.request(client, "POST /invoices/batch", "POST", "/api/invoices/batch",
+                      json={"job_ids": job_ids}, headers=headers)
+    await rec.request(client, "GET /reports/mechanics", "GET", "/api/reports/mechanics", headers=headers)
+    if ctx.search_terms:
+        await rec.request(client, "GET /jobs/search", "GET", "/api/jobs/search",
+                          params={"q": rng.choice(ctx.search_terms)}, headers=headers)
+
+
+async def mechanic_dashboard(client, ctx: BenchContext, rec: Recorder, rng: random.Random):
+    mechanic = rng.choice(ctx.mechanics)
+    headers = ctx.auth(mechanic["token"])
+    await rec.request(client, "GET /jobs", "GET", "/api/jobs", params={"limit": 200}, headers=headers)
+    await rec.request(client, "GET /stats", "GET", "/api/stats", headers=headers)
+    if mechanic["job_ids"]:
+        job_id = rng.choice(mechanic["job_ids"])
+        await rec.request(client, "GET /jobs/{id}", "GET", f"/api/jobs/{job_id}", headers=headers)
+        checklist = [{"item": "Road test", "completed": rng.random() < 0.5}]
+        await rec.request(client, "PUT /jobs/{id}/checklist", "PUT", f"/api/jobs/{job_id}/checklist",
+                          json=checklist, headers=headers)
+
+
+async def login(client, ctx: BenchContext, rec: Recorder, rng: random.Random):
+    username = rng.choice(["bench-manager"] + [m["username"] for m in ctx.mechanics])
+    await rec.request(client, "POST /auth/login", "POST", "/api/auth/login",
+                      json={"username": username, "password": BENCH_PASSWORD})
+
+
+async def invoice_pdf(client, ctx: BenchContext, rec: Recorder, rng: random.Random):
+    if ctx.invoice_ids:
+        invoice_id = rng.choice(ctx.invoice_ids)
+        await rec.request(client, "GET /invoices/{id}/pdf", "GET", f"/api/invoices/{invoice_id}/pdf",
+                          headers=ctx.auth(ctx.manager_token))
+
+
+SCENARIOS = {
+    "manager": manager_dashboard,
+    "mechanic": mechanic_dashboard,
+    "login": login,
+    "pdf": invoice_pdf,
+}
+
+
+async def run_scenario(name: str, client, ctx: BenchContext, concurrency: int, duration: float,
+                       rss_pid: str) -> dict:
+    rec = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index: int):
+        rng = random.Random(f"{name}-{index}")
+        while time.perf_counter() < deadline:
+            await SCENARIOS[name](client, ctx, rec, rng)
+
+    async with RssSampler(rss_pid) as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+    endpoints = rec.summary(wall)
+    return {
+        "wall_seconds": round(wall, 2),
+        "requests": sum(e["requests"] for e in endpoints.values()),
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "rss": rss.report(),
+        "endpoints": endpoints,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict, baseline: dict = None):
+    for name, scenario in results["scenarios"].items():
+        rss = scenario["rss"]
+        print(f"\n[{name}] {scenario['requests']} requests in {scenario['wall_seconds']}s, "
+              f"{scenario['errors']} errors, RSS {rss['start_mb']} -> {rss['end_mb']} MB (peak {rss['peak_mb']})")
+        old = (baseline or {}).get("scenarios", {}).get(name, {}).get("endpoints", {})
+        for label, e in sorted(scenario["endpoints"].items()):
+            line = (f"  {label:<28} {e['throughput_rps']:>8.1f} rps  p50 {e['p50_ms']:>8.1f}  "
+                    f"p95 {e['p95_ms']:>8.1f}  p99 {e['p99_ms']:>8.1f} ms")
+            if label in old and old[label]["p95_ms"]:
+                p95_change = (e["p95_ms"] / old[label]["p95_ms"] - 1) * 100
+                rps_change = (e["throughput_rps"] / old[label]["throughput_rps"] - 1) * 100 \
+                    if old[label]["throughput_rps"] else 0.0
+                line += f"  (p95 {p95_change:+.0f}%, rps {rps_change:+.0f}%)"
+            print(line)
+
+
+async def run(server, args) -> dict:
+    if args.seed:
+        print("seeded", await seed(server, args.seed))
+    dataset = await server.db.jobs.estimated_document_count()
+
+    if args.base_url:
+        transport, base_url, rss_pid = None, args.base_url, args.server_pid or "0"
+    else:
+        await server.startup_db_client()
+        transport, base_url, rss_pid = httpx.ASGITransport(app=server.app), "http://bench", "self"
+
+    scenarios = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            ctx = await build_context(server, client)
+            for name in args.scenarios.split(","):
+                scenarios[name] = await run_scenario(name, client, ctx, args.concurrency, args.duration, rss_pid)
+    finally:
+        if not args.base_url:
+            await server.shutdown_db_client()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "jobs": dataset,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "mode": "http" if args.base_url else "asgi",
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a bench database")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma list of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="seed this many jobs first (1000/10000/100000)")
+    parser.add_argument("--ephemeral", action="store_true", help="start a throwaway mongod on tmpfs")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--db", default="bench")
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--server-pid", help="PID to sample RSS from with --base-url")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with ephemeral_mongod() if args.ephemeral else contextlib.nullcontext(args.mongo_url) as mongo_url:
+        server = load_server(mongo_url, args.db)
+        results = asyncio.run(run(server, args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
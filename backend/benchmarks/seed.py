@@ -0,0 +1,187 @@
+"""Fill a bench database with synthetic users, jobs, media and invoices.
+
+Sizes are whatever --jobs says; the reference datasets are 1k, 10k and 100k.
+Photos and voice notes go into GridFS exactly as uploads would, so media routes
+serve real bytes. Counters, rollups, metrics and indexes are rebuilt at the end,
+the same way manage.py would after a migration.
+
+Run from backend/:
+    python -m benchmarks.seed --jobs 10000 [--db bench_10k] [--mongo-url ...]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import time
+import uuid
+from datetime import timedelta
+from io import BytesIO
+
+from PIL import Image
+
+from benchmarks.environment import load_server
+from benchmarks.synthetic import make_job, make_mechanics
+
+BENCH_PASSWORD = "bench-password"
+INSERT_BATCH = 1000
+
+
+def make_photo_pool(rng: random.Random, count: int = 4) -> list:
+    """Camera-sized JPEGs (1600x1200, a few hundred KB) to share between synthetic photos"""
+    pool = []
+    for _ in range(count):
+        gradient = Image.linear_gradient("L").resize((1600, 1200))
+        bands = [Image.blend(gradient, Image.effect_noise((1600, 1200), rng.randint(20, 60)), 0.3)
+                 for _ in range(3)]
+        buffer = BytesIO()
+        Image.merge("RGB", bands).save(buffer, "JPEG", quality=85)
+        pool.append(buffer.getvalue())
+    return pool
+
+
+def make_voice_pool(rng: random.Random, count: int = 4) -> list:
+    """Opus-sized payloads (~24 kbit/s for 10-30 s); the bytes only need to be served"""
+    return [rng.randbytes(rng.randint(30, 90) * 1024) for _ in range(count)]
+
+
+def make_invoice(server, job: dict, number: int, rng: random.Random) -> dict:
+    labour = float(rng.randrange(500, 5000, 50))
+    parts = [{"part_name": f"Part {n}", "part_charges": float(rng.randrange(200, 8000, 100))}
+             for n in range(rng.randint(0, 4))]
+    parts_total = sum(p["part_charges"] for p in parts)
+    tuning = float(rng.choice([0, 0, 4500, 12000]))
+    others = float(rng.choice([0, 250, 500]))
+    subtotal = labour + parts_total + tuning + others
+    gst = subtotal * 0.18
+    invoice_date = job["completion_date"] + timedelta(hours=rng.randint(1, 48))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "invoice_number": f"{server.INVOICE_PREFIX}-BENCH-{number:06d}",
+        "job_id": job["id"],
+        "invoice_date": invoice_date,
+        "labour_charges": labour,
+        "parts": parts,
+        "parts_charges": parts_total,
+        "tuning_charges": tuning,
+        "others_charges": others,
+        "subtotal": subtotal,
+        "gst_amount": gst,
+        "grand_total": subtotal + gst,
+        "sent_to_customer": rng.random() < 0.7,
+        "sent_to_accountant": rng.random() < 0.5,
+        "version": 1,
+        "updated_at": invoice_date,
+        "assigned_mechanic_id": job["assigned_mechanic_id"],
+        "assigned_mechanic_name": job["assigned_mechanic_name"],
+    }
+
+
+async def store_media(server, job: dict, rng: random.Random, photos: list, voices: list, photo_ratio: float,
+                      voice_ratio: float):
+    job["photos"] = []
+    job["voice_note"] = None
+    if rng.random() < photo_ratio:
+        for _ in range(rng.randint(1, 3)):
+            data = rng.choice(photos)
+            photo_id = str(uuid.uuid4())
+            await server.photo_bucket.upload_from_stream_with_id(
+                photo_id, photo_id, data,
+                chunk_size_bytes=server.PHOTO_CHUNK_SIZE,
+                metadata={
+                    "job_id": job["id"],
+                    "content_type": "image/jpeg",
+                    "uploaded_by": "bench",
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                },
+            )
+            job["photos"].append(photo_id)
+    if rng.random() < voice_ratio:
+        data = rng.choice(voices)
+        voice_id = str(uuid.uuid4())
+        await server.voice_bucket.upload_from_stream_with_id(
+            voice_id, voice_id, data,
+            chunk_size_bytes=server.PHOTO_CHUNK_SIZE,
+            metadata={"job_id": job["id"], "content_type": "audio/ogg"},
+        )
+        job["voice_note"] = {
+            "id": voice_id,
+            "content_type": "audio/ogg",
+            "duration_seconds": round(len(data) * 8 / 24000, 1),
+            "size_bytes": len(data),
+        }
+
+
+async def seed(server, jobs: int, mechanics: int = 8, photo_ratio: float = 0.05, voice_ratio: float = 0.2,
+               invoice_ratio: float = 0.6, derivatives: bool = False, seed_value: int = 25) -> dict:
+    """Replace the bench database contents with a synthetic dataset"""
+    rng = random.Random(seed_value)
+    db = server.db
+    started = time.perf_counter()
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+
+    password_hash = server.get_password_hash(BENCH_PASSWORD)
+    mechanic_users = make_mechanics(mechanics)
+    users = [{"id": str(uuid.uuid4()), "username": "bench-manager", "full_name": "Bench Manager",
+              "role": "Manager", "password_hash": password_hash}]
+    users += [{**m, "username": f"bench-mechanic-{n}", "role": "Mechanic", "password_hash": password_hash}
+              for n, m in enumerate(mechanic_users)]
+    await db.users.insert_many(users)
+
+    photos = make_photo_pool(rng)
+    voices = make_voice_pool(rng)
+    totals = {"jobs": 0, "photos": 0, "voice_notes": 0, "invoices": 0}
+    batch, invoices = [], []
+    for index in range(jobs):
+        job = make_job(index, mechanic_users, rng)
+        job.update(server.job_search_keys(job))
+        await store_media(server, job, rng, photos, voices, photo_ratio, voice_ratio)
+        totals["photos"] += len(job["photos"])
+        totals["voice_notes"] += job["voice_note"] is not None
+        if job["completion_date"] and rng.random() < invoice_ratio:
+            invoices.append(make_invoice(server, job, len(invoices) + 1, rng))
+        batch.append(job)
+        if len(batch) == INSERT_BATCH:
+            await db.jobs.insert_many(batch)
+            totals["jobs"] += len(batch)
+            batch = []
+        if len(invoices) >= INSERT_BATCH:
+            await db.invoices.insert_many(invoices)
+            totals["invoices"] += len(invoices)
+            invoices = []
+    if batch:
+        await db.jobs.insert_many(batch)
+        totals["jobs"] += len(batch)
+    if invoices:
+        await db.invoices.insert_many(invoices)
+        totals["invoices"] += len(invoices)
+
+    await server.ensure_indexes()
+    await server.rebuild_job_counters()
+    await server.rebuild_revenue_rollups()
+    await server.rebuild_mechanic_metrics()
+    if derivatives:
+        await server.backfill_photo_derivatives()
+    return {**totals, "seconds": round(time.perf_counter() - started, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a bench database with synthetic data")
+    parser.add_argument("--jobs", type=int, default=1000, help="reference sizes: 1000, 10000, 100000")
+    parser.add_argument("--mechanics", type=int, default=8)
+    parser.add_argument("--photo-ratio", type=float, default=0.05, help="share of jobs with 1-3 photos")
+    parser.add_argument("--voice-ratio", type=float, default=0.2, help="share of jobs with a voice note")
+    parser.add_argument("--derivatives", action="store_true", help="also render photo thumbnails")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--db", default=None, help="defaults to bench_<jobs>")
+    args = parser.parse_args()
+
+    server = load_server(args.mongo_url, args.db or f"bench_{args.jobs}")
+    result = asyncio.run(seed(server, args.jobs, args.mechanics, args.photo_ratio, args.voice_ratio,
+                              derivatives=args.derivatives))
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Per-job CPU cost of serving GET /api/jobs, before and after native dates + orjson.
+
+Before: ISO-string dates in Mongo, `fromisoformat` per field, `Job(**doc)` per job,
+then FastAPI's response_model pass (dump, validate again, serialize) and json.dumps.
+After: BSON datetimes decoded by the driver, the JOB_PROJECTION fields shaped by
+`shape_jobs` and written by orjson, exactly as get_jobs does it.
+
+Both paths include BSON decoding so the driver's share of the work is counted.
+
+Run from backend/:
+    python -m benchmarks.serialization [--page-size 200] [--pages 50] [--json]
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import bson
+from bson.codec_options import CodecOptions
+from pydantic import TypeAdapter
+
+from benchmarks.environment import load_server
+from benchmarks.synthetic import make_job, make_mechanics
+
+CODEC_OPTIONS = CodecOptions(tz_aware=True)
+
+
+def legacy_page(server, raw_docs: list) -> bytes:
+    jobs = bson.decode_all(b"".join(raw_docs), CODEC_OPTIONS)
+    for job in jobs:
+        job.pop("_id", None)
+        for field in ("entry_date", "estimated_delivery", "completion_date", "created_at"):
+            if isinstance(job.get(field), str):
+                job[field] = datetime.fromisoformat(job[field])
+    page = server.JobPage(items=[server.Job(**job) for job in jobs], next_cursor=None)
+    # What FastAPI does with a model returned under response_model
+    page_adapter = TypeAdapter(server.JobPage)
+    content = page_adapter.validate_python(page.model_dump())
+    content = page_adapter.dump_python(content, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def native_page(server, raw_docs: list) -> bytes:
+    # raw_docs hold only the JOB_PROJECTION fields, as Mongo returns them to get_jobs
+    jobs = bson.decode_all(b"".join(raw_docs), CODEC_OPTIONS)
+    next_cursor = server.encode_job_cursor(jobs[-1])
+    server.validator_headers(server.list_etag("jobs", jobs, next_cursor), jobs)
+    return server.ORJSONResponse({"items": server.shape_jobs(jobs), "next_cursor": next_cursor}).body
+
+
+def project(job: dict, projection: dict) -> dict:
+    return {field: value for field, value in job.items() if projection.get(field)}
+
+
+def measure(render, raw_docs: list, pages: int) -> dict:
+    render(raw_docs)  # warm up
+    started = time.process_time()
+    for _ in range(pages):
+        body = render(raw_docs)
+    elapsed = time.process_time() - started
+    return {
+        "us_per_job": elapsed * 1e6 / (pages * len(raw_docs)),
+        "ms_per_page": elapsed * 1e3 / pages,
+        "bytes_per_page": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    # Nothing here talks to Mongo, but server.py needs a database configured to import
+    server = load_server(os.environ.get("MONGO_URL", "mongodb://127.0.0.1:27017"), "bench_serialization")
+
+    rng = random.Random(18)
+    mechanics = make_mechanics(8)
+    legacy = [bson.encode(make_job(i, mechanics, rng, string_dates=True)) for i in range(args.page_size)]
+    rng = random.Random(18)
+    native = [
+        bson.encode(project(make_job(i, mechanics, rng), server.JOB_PROJECTION)) for i in range(args.page_size)
+    ]
+
+    results = {
+        "page_size": args.page_size,
+        "pages": args.pages,
+        "before": measure(functools.partial(legacy_page, server), legacy, args.pages),
+        "after": measure(functools.partial(native_page, server), native, args.pages),
+    }
+    results["speedup"] = results["before"]["us_per_job"] / results["after"]["us_per_job"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for label in ("before", "after"):
+        r = results[label]
+        print(
+            f"{label:>6}: {r['us_per_job']:8.1f} us/job  {r['ms_per_page']:7.2f} ms/page"
+            f"  {r['bytes_per_page']} bytes"
+        )
+    print(f"speedup: {results['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Synthetic job documents shaped like the ones the API stores."""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+STATUSES = ["Car Received", "Work in progress", "Work complete", "Washed", "Ready for delivery", "Delivered"]
+BRANDS = [("Maruti", "Swift"), ("Hyundai", "Creta"), ("Tata", "Nexon"), ("Mahindra", "XUV700"), ("Honda", "City")]
+CHECKLIST = ["Oil change", "Air filter", "Brake pads", "Coolant top-up", "Wheel alignment",
+             "Battery check", "ECU remap", "Spark plugs", "Road test", "Wash"]
+
+
+def make_job(index: int, mechanics: list, rng: random.Random, string_dates: bool = False) -> dict:
+    """One job document; `string_dates` reproduces the pre-migration ISO-string layout"""
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=37 * index)
+    status = rng.choice(STATUSES)
+    brand, model = rng.choice(BRANDS)
+    mechanic = mechanics[index % len(mechanics)]
+    checklist = [{"item": item, "completed": rng.random() < 0.5} for item in rng.sample(CHECKLIST, 6)]
+    job = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "customer_name": f"Customer {index}",
+        "contact_number": f"9{index:09d}",
+        "car_brand": brand,
+        "car_model": model,
+        "year": 2012 + index % 13,
+        "registration_number": f"MH{index % 50:02d}AB{index % 10000:04d}",
+        "vin": f"MA3{index:014d}",
+        "kms": 10000 + index * 13 % 150000,
+        "entry_date": created_at,
+        "work_description": "Service and tune-up; check rattling noise from rear suspension.",
+        "voice_note": {"id": str(uuid.uuid4()), "content_type": "audio/ogg", "duration_seconds": 12.5,
+                       "size_bytes": 48000} if index % 3 == 0 else None,
+        "estimated_delivery": created_at + timedelta(days=2),
+        "assigned_mechanic_id": mechanic["id"],
+        "assigned_mechanic_name": mechanic["full_name"],
+        "assigned_by_manager_id": "manager",
+        "assigned_by_manager_name": "Manager",
+        "status": status,
+        "photos": [str(uuid.uuid4()) for _ in range(index % 4)],
+        "notes": None,
+        "checklist": checklist,
+        "checklist_total": len(checklist),
+        "checklist_completed": sum(item["completed"] for item in checklist),
+        "completion_date": created_at + timedelta(days=1, hours=index % 48)
+        if status in STATUSES[2:] else None,
+        "confirm_complete": status == "Delivered",
+        "created_at": created_at,
+        "updated_at": created_at,
+        "version": 1,
+    }
+    if string_dates:
+        for field in ("entry_date", "estimated_delivery", "completion_date", "created_at", "updated_at"):
+            if job[field] is not None:
+                job[field] = job[field].isoformat()
+    return job
+
+
+def make_mechanics(count: int) -> list:
+    return [{"id": str(uuid.uuid4()), "full_name": f"Mechanic {n}"} for n in range(count)]
@@ -0,0 +1,104 @@
+"""Maintenance commands for the ICD Tuning backend.
+
+Usage:
+    python manage.py migrate-photos
+    python manage.py migrate-voice-notes
+    python manage.py backfill-checklist-counts
+    python manage.py ensure-indexes
+    python manage.py index-report
+    python manage.py rebuild-job-counters
+    python manage.py migrate-dates
+    python manage.py backfill-photo-derivatives
+    python manage.py backfill-search-keys
+    python manage.py rebuild-revenue-rollups
+    python manage.py rebuild-mechanic-metrics
+"""
+import argparse
+import asyncio
+import json
+
+import server
+
+
+async def migrate_photos():
+    """Move legacy base64 photos out of job documents into GridFS"""
+    return await server.migrate_inline_photos()
+
+
+async def migrate_voice_notes():
+    """Move legacy base64 voice notes out of job documents into GridFS"""
+    return await server.migrate_inline_voice_notes()
+
+
+async def backfill_checklist_counts():
+    """Add checklist progress counters to jobs that predate them"""
+    return await server.backfill_checklist_counts()
+
+
+async def ensure_indexes():
+    """Create and verify the indexes the API relies on"""
+    return await server.ensure_indexes()
+
+
+async def index_report():
+    """Show indexes and flag hot queries that would scan a collection"""
+    return await server.build_index_report()
+
+
+async def rebuild_job_counters():
+    """Recompute the per-mechanic status counters behind /api/stats"""
+    return await server.rebuild_job_counters()
+
+
+async def migrate_dates():
+    """Convert ISO-string dates on jobs, invoices and the outbox into BSON datetimes"""
+    return await server.migrate_date_fields()
+
+
+async def backfill_photo_derivatives():
+    """Render thumbnail and medium WebP copies for photos that have none"""
+    return await server.backfill_photo_derivatives()
+
+
+async def backfill_search_keys():
+    """Store normalized registration/VIN/phone keys used by /api/jobs/search"""
+    return await server.backfill_job_search_keys()
+
+
+async def rebuild_revenue_rollups():
+    """Recompute the daily revenue rollups from invoices and list days that had drifted"""
+    return await server.rebuild_revenue_rollups()
+
+
+async def rebuild_mechanic_metrics():
+    """Recompute per-mechanic turnaround and on-time metrics from jobs"""
+    return await server.rebuild_mechanic_metrics()
+
+
+COMMANDS = {
+    "migrate-photos": migrate_photos,
+    "migrate-voice-notes": migrate_voice_notes,
+    "backfill-checklist-counts": backfill_checklist_counts,
+    "ensure-indexes": ensure_indexes,
+    "index-report": index_report,
+    "rebuild-job-counters": rebuild_job_counters,
+    "migrate-dates": migrate_dates,
+    "backfill-photo-derivatives": backfill_photo_derivatives,
+    "backfill-search-keys": backfill_search_keys,
+    "rebuild-revenue-rollups": rebuild_revenue_rollups,
+    "rebuild-mechanic-metrics": rebuild_mechanic_metrics,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ICD Tuning maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+
+    result = asyncio.run(COMMANDS[args.command]())
+    print(json.dumps(result, indent=2, default=str))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,37 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument, ReplaceOne, UpdateOne
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, computed_field, field_validator
+from typing import Dict, List, Optional
 import uuid
+import hashlib
+from email.utils import format_datetime
+import shutil
+import subprocess
+import tempfile
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
 from passlib.context import CryptContext
+from cachetools import TTLCache
 from jose import JWTError, jwt
 import base64
 import json
+import orjson
 import io
+import zipfile
+import gzip
+import time
 from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
@@ -25,23 +41,86 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import HexColor
+from PIL import Image as PILImage, ImageOps
+import gridfs
+import re
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import gspread
 from google.oauth2.service_account import Credentials
+try:
+    import brotli
+except ImportError:  # gzip-only when the extension isn't available
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Dates are stored as BSON datetimes and read back as UTC-aware datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+# Job photos live in GridFS; job documents only keep the photo IDs
+photo_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="photos")
+PHOTO_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+# WebP derivatives (longest edge in px) rendered in media_executor after upload, EXIF stripped
+PHOTO_DERIVATIVE_SIZES = {"medium": 1280, "thumb": 320}
+PHOTO_WEBP_QUALITY = int(os.environ.get("PHOTO_WEBP_QUALITY", "80"))
+PHOTO_BATCH_MAX = int(os.environ.get("PHOTO_BATCH_MAX", "20"))
+# Photos are identified from their bytes with Pillow; the client's content type is ignored
+PHOTO_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+# Media is served inline from the API origin, so browsers must not sniff it into HTML
+MEDIA_SECURITY_HEADERS = {"X-Content-Type-Options": "nosniff"}
+
+# Voice notes are compressed to Opus off the event loop and stored in GridFS
+voice_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="voice_notes")
+FFMPEG_PATH = shutil.which("ffmpeg")
+FFPROBE_PATH = shutil.which("ffprobe")
+VOICE_NOTE_BITRATE = os.environ.get("VOICE_NOTE_BITRATE", "24k")
+media_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MEDIA_WORKERS", "2")),
+    thread_name_prefix="media"
+)
+
+# Invoice PDFs render in worker processes and are cached on disk by content hash
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+PDF_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", str(ROOT_DIR / "pdf_cache")))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_MB", "200")) * 1024 * 1024
+PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS rehashes each user's password on their next login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop.
+# PASSWORD_HASH_QUEUE caps running + waiting hashes; beyond it requests get a 503.
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+    thread_name_prefix="bcrypt"
+)
+password_slots = asyncio.Semaphore(int(os.environ.get("PASSWORD_HASH_QUEUE", "32")))
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 SECRET_KEY = os.environ.get("JWT_SECRET", "icd-tuning-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 30
+# <img>, <audio> and EventSource can't send headers, so those URLs carry a short-lived token
+# that is only valid for the one path it was issued for, never the session token
+MEDIA_TOKEN_TTL_SECONDS = int(os.environ.get("MEDIA_TOKEN_TTL_SECONDS", "300"))
+MEDIA_TOKEN_PATHS = re.compile(r"/api/jobs/(stream|[^/]+/voice-note|[^/]+/photos/[^/]+)")
+
+# Authenticated-user cache: get_current_user runs on every request
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))  # seconds
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+user_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
 
 # Google Sheets Configuration
 GOOGLE_SHEETS_ENABLED = os.environ.get("GOOGLE_SHEETS_ENABLED", "false").lower() == "true"
@@ -80,20 +159,154 @@ def get_google_sheets_client():
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
-# Add middleware to prevent caching on API responses
+# API response middleware: no-cache defaults and compression
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 
-class NoCacheMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        if request.url.path.startswith("/api"):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        return response
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+NO_CACHE_HEADERS = [
+    (b"cache-control", b"no-cache, no-store, must-revalidate, max-age=0"),
+    (b"pragma", b"no-cache"),
+    (b"expires", b"0"),
+]
+
+compression_stats = {
+    "responses": 0,
+    "skipped": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "seconds": 0.0,
+    "by_encoding": {},
+}
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from Accept-Encoding, honouring q=0"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def vary_on_accept_encoding(headers: list) -> list:
+    """Add Accept-Encoding to the Vary header, keeping whatever the route already varies on"""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class ApiResponseMiddleware:
+    """Pure-ASGI replacement for the old BaseHTTPMiddleware cache layer.
+
+    Adds no-cache headers to /api responses that don't set their own
+    Cache-Control, and compresses single-message JSON/text bodies above
+    COMPRESSION_MIN_BYTES. Streaming responses (SSE, ZIP export, files) pass
+    straight through without buffering. Every JSON/text response and every
+    304 carries Vary: Accept-Encoding, compressed or not, so shared caches
+    keep the encodings apart.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = negotiate_encoding(accept) if accept else None
+        start_message = None
 
-app.add_middleware(NoCacheMiddleware)
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                names = {name.lower() for name, _ in headers}
+                if b"cache-control" not in names:
+                    headers.extend(NO_CACHE_HEADERS)
+                content_type = next((v for n, v in headers if n.lower() == b"content-type"), b"").decode("latin-1")
+                if message["status"] == 304 or content_type.startswith(COMPRESSIBLE_TYPES):
+                    vary_on_accept_encoding(headers)
+                message = {**message, "headers": headers}
+                if encoding is None or b"content-encoding" in names:
+                    await send(message)
+                else:
+                    # Hold the headers until we know whether the body is compressible
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start["headers"]
+            content_type = next((v for n, v in headers if n.lower() == b"content-type"), b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or len(body) < COMPRESSION_MIN_BYTES
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                if len(body) >= COMPRESSION_MIN_BYTES or message.get("more_body", False):
+                    compression_stats["skipped"] += 1
+                await send(start)
+                await send(message)
+                return
+
+            started = time.perf_counter()
+            compressed = compress_body(body, encoding)
+            elapsed = time.perf_counter() - started
+
+            compression_stats["responses"] += 1
+            compression_stats["bytes_in"] += len(body)
+            compression_stats["bytes_out"] += len(compressed)
+            compression_stats["seconds"] += elapsed
+            compression_stats["by_encoding"][encoding] = compression_stats["by_encoding"].get(encoding, 0) + 1
+
+            rewritten = []
+            for name, value in headers:
+                lowered = name.lower()
+                if lowered == b"content-length":
+                    continue
+                if lowered == b"etag" and not value.startswith(b"W/"):
+                    # The encoded bytes differ, so a strong validator no longer applies
+                    value = b"W/" + value
+                rewritten.append((name, value))
+            rewritten.extend([
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ])
+            await send({**start, "headers": rewritten})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+app.add_middleware(ApiResponseMiddleware)
 
 # Models
 class User(BaseModel):
@@ -118,6 +331,19 @@ class Token(BaseModel):
     token_type: str
     user: User
 
+class MediaTokenRequest(BaseModel):
+    path: str  # e.g. /api/jobs/<id>/voice-note
+
+class MediaToken(BaseModel):
+    token: str  # Pass as ?access_token= on `path` only
+    expires_in: int
+
+class VoiceNote(BaseModel):
+    id: str
+    content_type: str
+    duration_seconds: Optional[float] = None
+    size_bytes: int
+
 class Job(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -131,19 +357,67 @@ class Job(BaseModel):
     kms: int  # Now mandatory (odometer)
     entry_date: datetime
     work_description: str
-    voice_note: Optional[str] = None  # Base64 encoded audio
+    voice_note: Optional[VoiceNote] = None  # Served from /api/jobs/{id}/voice-note
     estimated_delivery: datetime
     assigned_mechanic_id: str
     assigned_mechanic_name: str
     assigned_by_manager_id: str  # Manager who created the job
     assigned_by_manager_name: str  # Manager's name
     status: str = "Car Received"  # New default status
-    photos: List[str] = []  # base64 encoded images
+    photos: List[str] = []  # Photo IDs, served from /api/jobs/{id}/photos/{photo_id}
     notes: Optional[str] = None
     checklist: List[dict] = []  # [{"item": "Oil change", "completed": false}]
     completion_date: Optional[datetime] = None
     confirm_complete: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    version: int = 0  # Bumped on every write; backs ETag and If-Match
+
+    @computed_field
+    @property
+    def thumbnails(self) -> List[str]:
+        return photo_thumbnail_urls(self.id, self.photos)
+
+    @field_validator("voice_note", mode="before")
+    @classmethod
+    def drop_inline_voice_note(cls, value):
+        # Legacy base64 blobs are hidden until `manage.py migrate-voice-notes` moves them
+        return None if isinstance(value, str) else value
+
+class JobPage(BaseModel):
+    items: List[Job]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next page
+
+class JobSummary(BaseModel):
+    """Slim job card for list views; checklist progress comes as counts"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    customer_name: str
+    contact_number: str
+    car_brand: str
+    car_model: str
+    year: int
+    registration_number: str
+    vin: Optional[str] = None
+    entry_date: datetime
+    estimated_delivery: datetime
+    assigned_mechanic_id: str
+    assigned_mechanic_name: str
+    status: str
+    completion_date: Optional[datetime] = None
+    confirm_complete: bool = False
+    checklist_total: int = 0
+    checklist_completed: int = 0
+    has_voice_note: bool = False
+    thumbnails: List[str] = []  # ?size=thumb photo URLs; originals load on demand
+    created_at: datetime
+    version: int = 0
+
+class JobSummaryPage(BaseModel):
+    items: List[JobSummary]
+    next_cursor: Optional[str] = None
+
+class JobSearchResults(BaseModel):
+    items: List[JobSummary]  # Identifier prefix matches first, then text matches by relevance
 
 class JobCreate(BaseModel):
     customer_name: str
@@ -156,7 +430,6 @@ class JobCreate(BaseModel):
     kms: int  # Now mandatory (odometer)
     entry_date: str
     work_description: str
-    voice_note: Optional[str] = None  # Base64 encoded audio
     estimated_delivery: str
     assigned_mechanic_id: str
     checklist: List[dict] = []  # Optional checklist items
@@ -211,6 +484,39 @@ class Invoice(BaseModel):
     grand_total: float
     sent_to_customer: bool = False
     sent_to_accountant: bool = False
+    version: int = 0  # Bumped on every write; backs ETag
+
+class VehicleInvoiceTotal(BaseModel):
+    id: str
+    invoice_number: str
+    invoice_date: datetime
+    grand_total: float
+
+class VehicleServiceRecord(BaseModel):
+    job_id: str
+    entry_date: datetime
+    completion_date: Optional[datetime] = None
+    kms: int
+    status: str
+    work_description: str
+    assigned_mechanic_name: str
+    registration_number: str
+    invoices: List[VehicleInvoiceTotal] = []
+    invoice_total: float = 0
+
+class VehicleHistory(BaseModel):
+    vin: str
+    registration_numbers: List[str]  # Every plate the vehicle has been seen with
+    car_brand: str
+    car_model: str
+    year: int
+    customer_name: str  # From the latest visit
+    visits: int
+    total_invoiced: float
+    services: List[VehicleServiceRecord]  # Odometer order, oldest reading first
+
+class InvoiceBatchRequest(BaseModel):
+    job_ids: List[str] = Field(..., max_length=1000)
 
 class PartItem(BaseModel):
     part_name: str
@@ -242,6 +548,18 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def run_password_task(func, *args):
+    """Run a bcrypt call on password_executor, shedding load when the queue is full"""
+    if password_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    async with password_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
@@ -250,24 +568,66 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await get_user_from_token(credentials.credentials)
+
+def create_media_token(user_id: str, path: str) -> str:
+    expire = datetime.now(timezone.utc) + timedelta(seconds=MEDIA_TOKEN_TTL_SECONDS)
+    claims = {"sub": user_id, "scope": "media", "path": path, "exp": expire}
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+async def get_media_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = None
+):
+    """Auth for media routes: a bearer header, or a media token for this exact path in the URL"""
+    if credentials:
+        return await get_user_from_token(credentials.credentials)
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_user_from_token(access_token, media_path=request.url.path)
+
+async def get_user_from_token(token: str, media_path: Optional[str] = None):
+    """User for a session token, or for a media token when media_path is given"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    # Neither kind of token stands in for the other
+    if payload.get("scope") != ("media" if media_path else None):
+        raise credentials_exception
+    if media_path and payload.get("path") != media_path:
+        raise credentials_exception
     
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        user_cache_stats["hits"] += 1
+        return cached
+    
+    user_cache_stats["misses"] += 1
     user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    user_obj = User(**user)
+    user_cache[user_id] = user_obj
+    return user_obj
+
+def invalidate_user_cache(user_id: str):
+    """Call after any write to a user document so auth never serves stale data"""
+    if user_cache.pop(user_id, None) is not None:
+        user_cache_stats["invalidations"] += 1
 
 # Mock Integration Functions
 def send_whatsapp_message(phone_number: str, message: str):
@@ -416,6 +776,431 @@ def generate_invoice_pdf(invoice_data: dict, job_data: dict):
     buffer.seek(0)
     return buffer
 
+def render_invoice_pdf(invoice_data: dict, job_data: dict) -> bytes:
+    """Process-pool entry point: generate_invoice_pdf as plain bytes"""
+    return generate_invoice_pdf(invoice_data, job_data).getvalue()
+
+# Invoice PDF Cache
+# Bump when generate_invoice_pdf's layout changes so cached files are not reused
+PDF_TEMPLATE_VERSION = 1
+PDF_INVOICE_FIELDS = [
+    "invoice_number", "invoice_date", "labour_charges", "parts", "tuning_charges",
+    "others_charges", "subtotal", "gst_amount", "grand_total",
+]
+PDF_JOB_FIELDS = ["customer_name", "car_brand", "car_model", "year", "registration_number", "work_description"]
+pdf_executor = None
+pdf_renders_in_flight = {}
+# Eviction trims the cache to this fraction of the limit, so it runs once per batch of writes
+PDF_CACHE_LOW_WATER = 0.8
+# Running size of PDF_CACHE_DIR, so writes don't have to stat the whole directory. It is only
+# this process's view; each eviction rescans and corrects it. None until the first write.
+pdf_cache_bytes = None
+pdf_cache_lock = threading.Lock()
+
+def get_pdf_executor():
+    global pdf_executor
+    if pdf_executor is None:
+        # Forking would copy a process that already runs Motor and executor threads;
+        # forkserver children start clean and import this module themselves
+        pdf_executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return pdf_executor
+
+def invoice_pdf_key(invoice: dict, job: dict) -> str:
+    """Hash of exactly the fields drawn on the PDF"""
+    payload = {
+        "v": PDF_TEMPLATE_VERSION,
+        "invoice": {k: invoice.get(k) for k in PDF_INVOICE_FIELDS},
+        "job": {k: job.get(k) for k in PDF_JOB_FIELDS},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def evict_pdf_cache(target_bytes: int) -> int:
+    """Drop least recently used PDFs until the cache fits target_bytes; returns the new size"""
+    entries = []
+    for path in PDF_CACHE_DIR.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= target_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    return total
+
+def write_pdf_cache(path: Path, pdf_bytes: bytes):
+    """Store a rendered PDF (runs on a worker thread); scans the directory only to evict"""
+    global pdf_cache_bytes
+    tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(pdf_bytes)
+    with pdf_cache_lock:
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        if pdf_cache_bytes is None:
+            pdf_cache_bytes = evict_pdf_cache(PDF_CACHE_MAX_BYTES)
+        else:
+            pdf_cache_bytes += len(pdf_bytes) - replaced
+        if pdf_cache_bytes > PDF_CACHE_MAX_BYTES:
+            pdf_cache_bytes = evict_pdf_cache(int(PDF_CACHE_MAX_BYTES * PDF_CACHE_LOW_WATER))
+
+def read_pdf_cache(path: Path) -> Optional[bytes]:
+    """Cached PDF bytes, or None on a miss (runs on a worker thread)
+
+    Eviction in another request or process can remove the file at any point,
+    so a vanished file is just a miss.
+    """
+    try:
+        os.utime(path)  # mtime doubles as the LRU clock
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+async def get_cached_invoice_pdf(invoice: dict, job: dict) -> bytes:
+    """The invoice PDF's bytes, rendering it only on a cache miss"""
+    key = invoice_pdf_key(invoice, job)
+    path = PDF_CACHE_DIR / f"{key}.pdf"
+    loop = asyncio.get_running_loop()
+    pdf_bytes = await loop.run_in_executor(None, read_pdf_cache, path)
+    if pdf_bytes is not None:
+        return pdf_bytes
+    
+    # Concurrent requests for the same PDF share one render
+    render = pdf_renders_in_flight.get(key)
+    if render is None:
+        render = asyncio.ensure_future(render_to_pdf_cache(path, invoice, job))
+        pdf_renders_in_flight[key] = render
+        render.add_done_callback(lambda _: pdf_renders_in_flight.pop(key, None))
+    return await asyncio.shield(render)
+
+async def render_to_pdf_cache(path: Path, invoice: dict, job: dict) -> bytes:
+    loop = asyncio.get_running_loop()
+    pdf_bytes = await loop.run_in_executor(get_pdf_executor(), render_invoice_pdf, invoice, job)
+    await loop.run_in_executor(None, write_pdf_cache, path, pdf_bytes)
+    return pdf_bytes
+
+class ZipStreamSink:
+    """Write-only file object that hands zipfile output back in pieces"""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+# Photo Storage
+def identify_photo(file) -> Optional[str]:
+    """Content type of an uploaded image from its own bytes, or None (runs in media_executor)"""
+    try:
+        with PILImage.open(file) as image:
+            content_type = PILImage.MIME.get(image.format)
+            image.verify()
+    except Exception:
+        content_type = None
+    finally:
+        file.seek(0)
+    return content_type if content_type in PHOTO_CONTENT_TYPES else None
+
+async def check_photo_upload(upload: UploadFile) -> str:
+    loop = asyncio.get_running_loop()
+    content_type = await loop.run_in_executor(media_executor, identify_photo, upload.file)
+    if not content_type:
+        raise HTTPException(status_code=400, detail="Photos must be JPEG, PNG, WebP or GIF images")
+    return content_type
+
+def is_inline_media(content_type: Optional[str]) -> bool:
+    """Whether stored media may be served inline: a known image type or audio"""
+    return bool(content_type) and (content_type in PHOTO_CONTENT_TYPES or content_type.startswith("audio/"))
+
+async def store_photo(job_id: str, upload: UploadFile, uploaded_by: str, content_type: str) -> str:
+    """Stream a checked photo into GridFS chunk by chunk and return its ID"""
+    photo_id = str(uuid.uuid4())
+    digest = hashlib.sha256()
+    grid_in = photo_bucket.open_upload_stream_with_id(
+        photo_id,
+        upload.filename or photo_id,
+        chunk_size_bytes=PHOTO_CHUNK_SIZE,
+        metadata={
+            "job_id": job_id,
+            "content_type": content_type,
+            "uploaded_by": uploaded_by,
+        },
+    )
+    try:
+        while True:
+            chunk = await upload.read(PHOTO_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await grid_in.write(chunk)
+        await grid_in.close()
+    except Exception:
+        await grid_in.abort()
+        raise
+    # The digest doubles as a strong ETag for the photo endpoint
+    await db["photos.files"].update_one(
+        {"_id": photo_id},
+        {"$set": {"metadata.sha256": digest.hexdigest()}}
+    )
+    return photo_id
+
+def photo_thumbnail_urls(job_id: str, photo_ids: Optional[List[str]]) -> List[str]:
+    return [f"/api/jobs/{job_id}/photos/{photo_id}?size=thumb" for photo_id in photo_ids or []]
+
+def derivative_file_id(photo_id: str, size: str) -> str:
+    return f"{photo_id}.{size}"
+
+def render_photo_derivatives(data: bytes) -> Dict[str, bytes]:
+    """Downscaled WebP copies of a photo (runs in media_executor)
+
+    Orientation from EXIF is applied to the pixels and the metadata is not
+    carried over, so derivatives never leak camera or GPS details.
+    """
+    rendered = {}
+    with PILImage.open(BytesIO(data)) as original:
+        largest = max(PHOTO_DERIVATIVE_SIZES.values())
+        # JPEG can decode at a reduced scale, which skips most of the work for camera images
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        # Largest first, so each smaller size is resampled from the previous one
+        for size, edge in sorted(PHOTO_DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge), PILImage.Resampling.LANCZOS)
+            buffer = BytesIO()
+            image.save(buffer, "WEBP", quality=PHOTO_WEBP_QUALITY, method=4)
+            rendered[size] = buffer.getvalue()
+    return rendered
+
+async def generate_photo_derivatives(photo_id: str) -> bool:
+    """Render and store the WebP derivatives for one original photo"""
+    try:
+        grid_out = await photo_bucket.open_download_stream(photo_id)
+        data = await grid_out.read()
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(media_executor, render_photo_derivatives, data)
+    except Exception as e:
+        logging.warning(f"Could not render derivatives for photo {photo_id}: {str(e)}")
+        await db["photos.files"].update_one(
+            {"_id": photo_id}, {"$set": {"metadata.derivatives_error": str(e)}}
+        )
+        return False
+    
+    job_id = (grid_out.metadata or {}).get("job_id")
+    for size, payload in rendered.items():
+        file_id = derivative_file_id(photo_id, size)
+        # Re-running (e.g. from the backfill) replaces an earlier render
+        try:
+            await photo_bucket.delete(file_id)
+        except gridfs.errors.NoFile:
+            pass
+        await photo_bucket.upload_from_stream_with_id(
+            file_id,
+            file_id,
+            payload,
+            chunk_size_bytes=PHOTO_CHUNK_SIZE,
+            metadata={
+                "job_id": job_id,
+                "content_type": "image/webp",
+                "derivative_of": photo_id,
+                "size": size,
+                "sha256": hashlib.sha256(payload).hexdigest(),
+            },
+        )
+    await db["photos.files"].update_one(
+        {"_id": photo_id},
+        {"$set": {"metadata.derivatives": sorted(rendered)}, "$unset": {"metadata.derivatives_error": ""}}
+    )
+    return True
+
+photo_derivative_tasks = set()
+
+def queue_photo_derivatives(photo_id: str):
+    """Render derivatives in the background; the upload response doesn't wait"""
+    task = asyncio.create_task(generate_photo_derivatives(photo_id))
+    photo_derivative_tasks.add(task)
+    task.add_done_callback(photo_derivative_tasks.discard)
+
+async def backfill_photo_derivatives() -> dict:
+    """Render derivatives for originals that have none (legacy or interrupted uploads)"""
+    rendered = 0
+    failed = 0
+    query = {
+        "metadata.derivative_of": {"$exists": False},
+        "metadata.derivatives": {"$exists": False},
+    }
+    async for photo in db["photos.files"].find(query, {"_id": 1}):
+        if await generate_photo_derivatives(photo["_id"]):
+            rendered += 1
+        else:
+            failed += 1
+    return {"rendered": rendered, "failed": failed}
+
+async def migrate_inline_photos() -> dict:
+    """Move legacy base64 `data:` photos out of job documents into GridFS"""
+    migrated_jobs = 0
+    migrated_photos = 0
+    cursor = db.jobs.find({"photos": {"$regex": "^data:"}}, {"_id": 0, "id": 1, "photos": 1})
+    async for job in cursor:
+        photo_ids = []
+        for photo in job.get("photos", []):
+            if not photo.startswith("data:"):
+                photo_ids.append(photo)
+                continue
+            header, _, encoded = photo.partition(",")
+            content_type = header[len("data:"):].split(";")[0] or "application/octet-stream"
+            data = base64.b64decode(encoded)
+            photo_id = str(uuid.uuid4())
+            await photo_bucket.upload_from_stream_with_id(
+                photo_id,
+                photo_id,
+                data,
+                chunk_size_bytes=PHOTO_CHUNK_SIZE,
+                metadata={
+                    "job_id": job["id"],
+                    "content_type": content_type,
+                    "uploaded_by": "migration",
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                },
+            )
+            photo_ids.append(photo_id)
+            migrated_photos += 1
+        await db.jobs.update_one({"id": job["id"]}, {"$set": {"photos": photo_ids}})
+        migrated_jobs += 1
+    return {"jobs": migrated_jobs, "photos": migrated_photos}
+
+# Voice Note Storage
+def transcode_voice_note(src_path: str, content_type: str):
+    """Compress a recording to mono Opus with ffmpeg (runs in media_executor)
+
+    Returns (path, content_type, duration_seconds). Without ffmpeg, or if the
+    transcode fails, the original file is kept as-is.
+    """
+    out_path, out_type = src_path, content_type
+    if FFMPEG_PATH:
+        candidate = src_path + ".ogg"
+        result = subprocess.run(
+            [FFMPEG_PATH, "-y", "-loglevel", "error", "-i", src_path,
+             "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", VOICE_NOTE_BITRATE,
+             "-application", "voip", candidate],
+            capture_output=True
+        )
+        if result.returncode == 0:
+            out_path, out_type = candidate, "audio/ogg"
+        else:
+            logging.warning(f"Voice note transcode failed: {result.stderr.decode(errors='ignore')}")
+
+    duration = None
+    if FFPROBE_PATH:
+        probe = subprocess.run(
+            [FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", out_path],
+            capture_output=True
+        )
+        try:
+            duration = round(float(probe.stdout.decode().strip()), 2)
+        except ValueError:
+            pass
+    return out_path, out_type, duration
+
+async def store_voice_note(job_id: str, chunks, content_type: str, duration_seconds: Optional[float] = None) -> dict:
+    """Spool an audio stream to disk, compress it off-loop and store it in GridFS
+
+    `chunks` is an async iterator of bytes. Returns the reference kept on the job.
+    """
+    with tempfile.TemporaryDirectory(prefix="voice-") as tmp_dir:
+        src_path = os.path.join(tmp_dir, "source")
+        with open(src_path, "wb") as f:
+            async for chunk in chunks:
+                f.write(chunk)
+
+        loop = asyncio.get_running_loop()
+        out_path, out_type, probed_duration = await loop.run_in_executor(
+            media_executor, transcode_voice_note, src_path, content_type
+        )
+
+        voice_id = str(uuid.uuid4())
+        with open(out_path, "rb") as f:
+            await voice_bucket.upload_from_stream_with_id(
+                voice_id,
+                voice_id,
+                f,
+                chunk_size_bytes=PHOTO_CHUNK_SIZE,
+                metadata={"job_id": job_id, "content_type": out_type}
+            )
+        size_bytes = os.path.getsize(out_path)
+
+    return {
+        "id": voice_id,
+        "content_type": out_type,
+        "duration_seconds": probed_duration if probed_duration is not None else duration_seconds,
+        "size_bytes": size_bytes,
+    }
+
+async def iter_upload(upload: UploadFile):
+    """Read an UploadFile in GridFS-sized chunks"""
+    while True:
+        chunk = await upload.read(PHOTO_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+def parse_range_header(range_header: Optional[str], size: int):
+    """Parse a single `bytes=start-end` range; None means serve the whole file"""
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].split(",")[0].strip()
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+async def migrate_inline_voice_notes() -> dict:
+    """Move legacy base64 voice notes out of job documents into GridFS"""
+    migrated = 0
+    cursor = db.jobs.find({"voice_note": {"$type": "string"}}, {"_id": 0, "id": 1, "voice_note": 1})
+    async for job in cursor:
+        header, _, encoded = job["voice_note"].rpartition(",")
+        content_type = header[len("data:"):].split(";")[0] or "audio/webm"
+        data = base64.b64decode(encoded)
+
+        async def single_chunk():
+            yield data
+
+        voice_note = await store_voice_note(job["id"], single_chunk(), content_type)
+        await db.jobs.update_one({"id": job["id"]}, {"$set": {"voice_note": voice_note}})
+        migrated += 1
+    return {"voice_notes": migrated}
+
 # Auth Routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
@@ -427,10 +1212,15 @@ async def register(user_data: UserCreate):
     # Create user
     user_dict = user_data.model_dump()
     password = user_dict.pop("password")
-    user_dict["password_hash"] = get_password_hash(password)
+    user_dict["password_hash"] = await run_password_task(get_password_hash, password)
     user_dict["id"] = str(uuid.uuid4())
     
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same username
+        raise HTTPException(status_code=400, detail="Username already registered")
+    invalidate_user_cache(user_dict["id"])
     
     user_obj = User(**{k: v for k, v in user_dict.items() if k != "password_hash"})
     access_token = create_access_token(data={"sub": user_obj.id})
@@ -442,9 +1232,16 @@ async def login(credentials: UserLogin):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user['password_hash']):
+    valid, new_hash = await run_password_task(
+        pwd_context.verify_and_update, credentials.password, user['password_hash']
+    )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Stored hash used an old cost factor; upgrade it while we have the plaintext
+    if new_hash:
+        await db.users.update_one({"id": user['id']}, {"$set": {"password_hash": new_hash}})
+    
     user_obj = User(**{k: v for k, v in user.items() if k not in ["_id", "password_hash"]})
     access_token = create_access_token(data={"sub": user_obj.id})
     return Token(access_token=access_token, token_type="bearer", user=user_obj)
@@ -453,6 +1250,13 @@ async def login(credentials: UserLogin):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@api_router.post("/auth/media-token", response_model=MediaToken)
+async def issue_media_token(media: MediaTokenRequest, current_user: User = Depends(get_current_user)):
+    """Short-lived token for one photo, voice note or the job stream; access is checked on use"""
+    if not MEDIA_TOKEN_PATHS.fullmatch(media.path):
+        raise HTTPException(status_code=400, detail="Media tokens only cover photo, voice note and stream URLs")
+    return MediaToken(token=create_media_token(current_user.id, media.path), expires_in=MEDIA_TOKEN_TTL_SECONDS)
+
 # Mechanic Routes
 @api_router.get("/mechanics", response_model=List[User])
 async def get_mechanics(current_user: User = Depends(get_current_user)):
@@ -464,7 +1268,7 @@ async def get_mechanics(current_user: User = Depends(get_current_user)):
 
 # Job Routes
 @api_router.post("/jobs", response_model=Job)
-async def create_job(job_data: JobCreate, current_user: User = Depends(get_current_user)):
+async def create_job(job_data: JobCreate, response: Response, current_user: User = Depends(get_current_user)):
     if current_user.role != "Manager":
         raise HTTPException(status_code=403, detail="Only managers can create jobs")
     
@@ -488,38 +1292,455 @@ async def create_job(job_data: JobCreate, current_user: User = Depends(get_curre
     job_dict['estimated_delivery'] = datetime.fromisoformat(job_data.estimated_delivery)
     
     job = Job(**job_dict)
+    job.version = 1
     
-    job_dict = job.model_dump()
-    job_dict['entry_date'] = job_dict['entry_date'].isoformat()
-    job_dict['estimated_delivery'] = job_dict['estimated_delivery'].isoformat()
-    job_dict['created_at'] = job_dict['created_at'].isoformat()
+    # thumbnails is computed from photos on every read; a stored copy would only go stale
+    job_dict = job.model_dump(exclude={"thumbnails"})
+    job_dict.update(checklist_counts(job_dict['checklist']))
+    job_dict.update(job_search_keys(job_dict))
+    job_dict['updated_at'] = job_dict['created_at']
     
     await db.jobs.insert_one(job_dict)
+    await bump_job_counters(job.assigned_mechanic_id, job.status, 1, job.assigned_mechanic_name)
+    response.headers.update(validator_headers(document_etag(job_dict), [job_dict]))
+    publish_job_event("job.created", job_dict)
     return job
 
-@api_router.get("/jobs", response_model=List[Job])
-async def get_jobs(current_user: User = Depends(get_current_user)):
+def checklist_counts(checklist: List[dict]) -> dict:
+    """Progress counters stored alongside the checklist for summary views"""
+    return {
+        "checklist_total": len(checklist),
+        "checklist_completed": sum(1 for item in checklist if item.get("completed")),
+    }
+
+async def backfill_checklist_counts() -> dict:
+    """Populate checklist counters on jobs created before they existed"""
+    result = await db.jobs.update_many(
+        {"checklist_total": {"$exists": False}},
+        [{"$set": {
+            "checklist_total": {"$size": {"$ifNull": ["$checklist", []]}},
+            "checklist_completed": {"$size": {"$filter": {
+                "input": {"$ifNull": ["$checklist", []]},
+                "cond": {"$eq": ["$$this.completed", True]},
+            }}},
+        }}]
+    )
+    return {"jobs": result.modified_count}
+
+# Dates
+# Jobs and invoices store their dates as BSON datetimes. Naive values from clients are
+# taken as UTC, which is also how BSON stores them.
+JOB_DATE_FIELDS = ("entry_date", "estimated_delivery", "completion_date", "created_at", "updated_at")
+INVOICE_DATE_FIELDS = ("invoice_date", "updated_at")
+OUTBOX_DATE_FIELDS = ("created_at", "next_attempt_at", "sent_at", "claimed_at")
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def stored_datetime(value) -> Optional[datetime]:
+    """A stored date as UTC, reading ISO strings that migrate_date_fields hasn't converted yet"""
+    if isinstance(value, datetime):
+        return as_utc(value)
+    if isinstance(value, str) and value:
+        try:
+            return as_utc(datetime.fromisoformat(value))
+        except ValueError:
+            return None
+    return None
+
+async def migrate_date_fields() -> dict:
+    """Convert ISO-string dates written by older releases into BSON datetimes"""
+    converted = {}
+    unparseable = 0
+    for collection, fields in (
+        (db.jobs, JOB_DATE_FIELDS),
+        (db.invoices, INVOICE_DATE_FIELDS),
+        (db.outbox, OUTBOX_DATE_FIELDS),
+    ):
+        count = 0
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        async for doc in collection.find(query, {"_id": 1, **{field: 1 for field in fields}}):
+            update = {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                if not value:
+                    update[field] = None
+                    continue
+                try:
+                    update[field] = as_utc(datetime.fromisoformat(value))
+                except ValueError:
+                    unparseable += 1
+            if update:
+                await collection.update_one({"_id": doc["_id"]}, {"$set": update})
+                count += 1
+        converted[collection.name] = count
+    
+    # The Sheets watermark is compared against jobs.updated_at, so it has to match its type
+    state = await db.sync_state.find_one({"_id": "google_sheets"})
+    if state and isinstance(state.get("watermark"), str):
+        await db.sync_state.update_one(
+            {"_id": "google_sheets"},
+            {"$set": {"watermark": as_utc(datetime.fromisoformat(state["watermark"]))}}
+        )
+    return {"converted": converted, "unparseable": unparseable}
+
+# Conditional Requests
+def document_etag(doc: dict) -> str:
+    return f'"{doc["id"]}-v{doc.get("version", 0)}"'
+
+def parse_if_match_version(if_match: str, job_id: str) -> Optional[int]:
+    """Version named by an If-Match header for this job, or None if none of its tags apply"""
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        tag = tag[2:] if tag.startswith("W/") else tag
+        match = re.fullmatch(rf'"{re.escape(job_id)}-v(\d+)"', tag)
+        if match:
+            return int(match.group(1))
+    return None
+
+def list_etag(kind: str, docs: List[dict], *extra) -> str:
+    """Weak ETag over the (id, version) pairs a list response is built from"""
+    digest = hashlib.sha1(kind.encode())
+    for doc in docs:
+        digest.update(f"|{doc['id']}:{doc.get('version', 0)}".encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(tag in (etag, bare, f"W/{bare}") for tag in candidates)
+
+def validator_headers(etag: str, docs: List[dict]) -> dict:
+    """ETag plus Last-Modified from the newest updated_at; clients must revalidate"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    stamps = [doc.get('updated_at') or doc.get('created_at') or doc.get('invoice_date') for doc in docs]
+    stamps = [as_utc(t) for t in stamps if isinstance(t, datetime)]
+    if stamps:
+        headers["Last-Modified"] = format_datetime(max(stamps), usegmt=True)
+    return headers
+
+def encode_job_cursor(job: dict) -> str:
+    """Opaque keyset cursor for the (created_at, id) sort key"""
+    raw = json.dumps([as_utc(job['created_at']).isoformat(), job['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_job_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(job_id, str):
+            # Anything else would reach the $lt filter as-is, operators included
+            raise TypeError("cursor job id must be a string")
+        return as_utc(datetime.fromisoformat(created_at)), job_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def normalize_date_param(value: str, name: str) -> datetime:
+    """Parse a date/datetime query param into a UTC datetime for range filters"""
+    try:
+        return as_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected ISO date")
+
+def normalize_range_end(value: str, name: str) -> datetime:
+    """Exclusive upper bound for a range param; a bare YYYY-MM-DD includes that whole day"""
+    end = normalize_date_param(value, name)
+    if len(value.strip()) == 10:
+        end += timedelta(days=1)
+    return end
+
+def build_jobs_query(
+    current_user: User,
+    status_filter: Optional[str] = None,
+    mechanic_id: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+) -> dict:
+    """Role-scoped Mongo filter shared by the job listing routes"""
     query = {}
     if current_user.role == "Mechanic":
-        query = {"assigned_mechanic_id": current_user.id}
+        query["assigned_mechanic_id"] = current_user.id
+    elif mechanic_id:
+        query["assigned_mechanic_id"] = mechanic_id
+    if status_filter:
+        query["status"] = status_filter
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = normalize_date_param(created_from, "created_from")
+        if created_to:
+            query["created_at"]["$lt"] = normalize_range_end(created_to, "created_to")
+    return query
+
+def apply_job_cursor(query: dict, cursor: Optional[str]) -> dict:
+    """Restrict a jobs filter to rows after the cursor in (created_at, id) desc order"""
+    if not cursor:
+        return query
+    created_at, job_id = decode_job_cursor(cursor)
+    after_cursor = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": job_id}},
+    ]}
+    return {"$and": [query, after_cursor]} if query else after_cursor
+
+JOB_SORT = [("created_at", -1), ("id", -1)]
+
+def job_write_filter(job_id: str, current_user: User) -> dict:
+    """Filter for writes to one job, with the mechanic access check folded in"""
+    query = {"id": job_id}
+    if current_user.role == "Mechanic":
+        query["assigned_mechanic_id"] = current_user.id
+    return query
+
+async def raise_job_write_error(job_id: str, current_user: User, conflict: bool = False):
+    """Explain why a filtered job write matched nothing; only runs on the failure path"""
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "assigned_mechanic_id": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if conflict:
+        raise HTTPException(status_code=412, detail="Job was modified by someone else")
+    raise HTTPException(status_code=409, detail="Job changed during the update, please retry")
+
+# Job fields as the API describes them; search keys, counters and rollup bookkeeping stay
+# in Mongo. updated_at is read for Last-Modified and dropped by shape_jobs.
+JOB_PROJECTION = {"_id": 0, **{field: 1 for field in Job.model_fields}, "updated_at": 1}
+
+def shape_jobs(jobs: List[dict]) -> List[dict]:
+    """Turn JOB_PROJECTION documents into Job-shaped dicts in place, without revalidating"""
+    for job in jobs:
+        if isinstance(job.get('voice_note'), str):
+            # Same rule as Job.drop_inline_voice_note: never ship an unmigrated base64 blob
+            job['voice_note'] = None
+        job['thumbnails'] = photo_thumbnail_urls(job['id'], job.get('photos'))
+        job.pop('updated_at', None)
+    return jobs
+
+@api_router.get("/jobs", response_model=JobPage)
+async def get_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    mechanic_id: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """List jobs newest first, one keyset page at a time"""
+    query = build_jobs_query(current_user, status_filter, mechanic_id, created_from, created_to)
+    query = apply_job_cursor(query, cursor)
+    
+    # Fetch one extra row to know whether another page exists
+    jobs = await db.jobs.find(query, JOB_PROJECTION).sort(JOB_SORT).limit(limit + 1).to_list(limit + 1)
+    has_more = len(jobs) > limit
+    jobs = jobs[:limit]
+    next_cursor = encode_job_cursor(jobs[-1]) if has_more else None
+    
+    headers = validator_headers(list_etag("jobs", jobs, next_cursor), jobs)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse({"items": shape_jobs(jobs), "next_cursor": next_cursor}, headers=headers)
+
+@api_router.get("/jobs/stream")
+async def stream_jobs(request: Request, current_user: User = Depends(get_media_user)):
+    """Server-sent events for job creates, updates and checklist changes"""
+    subscriber = JobStreamSubscriber(current_user)
+    job_stream_subscribers.add(subscriber)
     
-    jobs = await db.jobs.find(query, {"_id": 0}).to_list(1000)
+    async def event_source():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    break
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), JOB_STREAM_HEARTBEAT_SECONDS)
+                    yield frame
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            job_stream_subscribers.discard(subscriber)
     
-    # Convert ISO strings back to datetime
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Only the fields a dashboard card needs; photos, voice data and the checklist stay on disk
+JOB_SUMMARY_PROJECTION = {
+    "_id": 0,
+    **{field: 1 for field in JobSummary.model_fields if field not in ("has_voice_note", "thumbnails")},
+    "voice_note.id": 1,
+    "photos": 1,
+    "updated_at": 1,
+}
+
+@api_router.get("/jobs/summary", response_model=JobSummaryPage)
+async def get_job_summaries(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    mechanic_id: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Same listing as GET /jobs, projected down to JobSummary"""
+    query = build_jobs_query(current_user, status_filter, mechanic_id, created_from, created_to)
+    query = apply_job_cursor(query, cursor)
+    
+    jobs = await db.jobs.find(query, JOB_SUMMARY_PROJECTION).sort(JOB_SORT).limit(limit + 1).to_list(limit + 1)
+    has_more = len(jobs) > limit
+    jobs = jobs[:limit]
+    next_cursor = encode_job_cursor(jobs[-1]) if has_more else None
+    
+    headers = validator_headers(list_etag("jobs/summary", jobs, next_cursor), jobs)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse({"items": shape_job_summaries(jobs), "next_cursor": next_cursor}, headers=headers)
+
+def shape_job_summaries(jobs: List[dict]) -> List[dict]:
+    """Turn JOB_SUMMARY_PROJECTION documents into JobSummary-shaped dicts in place"""
     for job in jobs:
-        if isinstance(job.get('entry_date'), str):
-            job['entry_date'] = datetime.fromisoformat(job['entry_date'])
-        if isinstance(job.get('estimated_delivery'), str):
-            job['estimated_delivery'] = datetime.fromisoformat(job['estimated_delivery'])
-        if job.get('completion_date') and isinstance(job['completion_date'], str):
-            job['completion_date'] = datetime.fromisoformat(job['completion_date'])
-        if isinstance(job.get('created_at'), str):
-            job['created_at'] = datetime.fromisoformat(job['created_at'])
-    
-    return [Job(**job) for job in jobs]
+        job['has_voice_note'] = bool(job.pop('voice_note', None))
+        job['thumbnails'] = photo_thumbnail_urls(job['id'], job.pop('photos', None))
+        job.pop('updated_at', None)
+    return jobs
+
+# Job Search
+# Identifiers are matched by prefix on normalized copies stored with each job
+# (`registration_key`, `vin_key`, `phone_key`), so "mh 12-ab" finds "MH12AB1234" through
+# an index range scan. Names and descriptions go through the `jobs_text` text index.
+SEARCH_KEY_FIELDS = {
+    "registration_number": "registration_key",
+    "vin": "vin_key",
+    "contact_number": "phone_key",
+}
+SEARCH_MIN_LENGTH = 2
+
+def normalize_identifier(value: str) -> str:
+    return re.sub(r"[^0-9A-Z]", "", value.upper())
+
+def normalize_phone(value: str) -> str:
+    digits = re.sub(r"\D", "", value)
+    # Drop a +91/0 trunk prefix so stored numbers start where people start typing them
+    return digits[-10:] if len(digits) > 10 else digits
+
+def job_search_keys(fields: dict) -> dict:
+    """Normalized search keys for whichever identifier fields are present"""
+    keys = {}
+    for field, key in SEARCH_KEY_FIELDS.items():
+        if fields.get(field) is not None:
+            normalize = normalize_phone if key == "phone_key" else normalize_identifier
+            keys[key] = normalize(str(fields[field]))
+    return keys
+
+async def backfill_job_search_keys() -> dict:
+    """Store normalized search keys on jobs created before search existed"""
+    projection = {"_id": 1, **{field: 1 for field in SEARCH_KEY_FIELDS}}
+    updated = 0
+    batch = []
+    async for job in db.jobs.find({"phone_key": {"$exists": False}}, projection):
+        batch.append(UpdateOne({"_id": job["_id"]}, {"$set": job_search_keys(job)}))
+        if len(batch) == 1000:
+            updated += (await db.jobs.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.jobs.bulk_write(batch, ordered=False)).modified_count
+    return {"jobs": updated}
+
+JOB_SEARCH_PROJECTION = {**JOB_SUMMARY_PROJECTION, **{key: 1 for key in SEARCH_KEY_FIELDS.values()}}
+
+async def find_prefix_matches(scope: dict, key: str, prefix: str, limit: int) -> List[dict]:
+    """Exact matches on the key, then the newest `limit` jobs whose key starts with prefix
+
+    Both queries sort newest first themselves, so the limit drops the oldest matches and an
+    exact hit is never crowded out by newer partial ones.
+    """
+    exact, newest = await asyncio.gather(
+        db.jobs.find({**scope, key: prefix}, JOB_SEARCH_PROJECTION).sort(JOB_SORT).limit(limit).to_list(limit),
+        db.jobs.find(
+            {**scope, key: {"$regex": f"^{re.escape(prefix)}"}}, JOB_SEARCH_PROJECTION
+        ).sort(JOB_SORT).limit(limit).to_list(limit),
+    )
+    return exact + newest
+
+async def find_text_matches(scope: dict, text: str, limit: int) -> List[dict]:
+    query = {**scope, "$text": {"$search": text}}
+    projection = {**JOB_SEARCH_PROJECTION, "score": {"$meta": "textScore"}}
+    cursor = db.jobs.find(query, projection).sort([("score", {"$meta": "textScore"})]).limit(limit)
+    jobs = await cursor.to_list(limit)
+    for job in jobs:
+        job.pop("score", None)
+    return jobs
+
+@api_router.get("/jobs/search", response_model=JobSearchResults)
+async def search_jobs(
+    q: str = Query(..., min_length=SEARCH_MIN_LENGTH, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    mechanic_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Find jobs by registration, VIN or phone prefix, or by customer name / work description"""
+    scope = build_jobs_query(current_user, status_filter, mechanic_id)
+    identifier = normalize_identifier(q)
+    phone = normalize_phone(q)
+    
+    lookups = []
+    if len(identifier) >= SEARCH_MIN_LENGTH:
+        lookups.append(find_prefix_matches(scope, "registration_key", identifier, limit))
+        lookups.append(find_prefix_matches(scope, "vin_key", identifier, limit))
+    # Only treat the query as a phone number when it is mostly digits
+    if len(phone) >= 3 and len(phone) >= len(identifier) - 1:
+        lookups.append(find_prefix_matches(scope, "phone_key", phone, limit))
+    prefix_lookups = len(lookups)
+    if re.search(r"[^\W\d_]", q):
+        lookups.append(find_text_matches(scope, q, limit))
+    
+    groups = await asyncio.gather(*lookups)
+    prefix_matches = [job for group in groups[:prefix_lookups] for job in group]
+    text_matches = [job for group in groups[prefix_lookups:] for job in group]
+    
+    # Exact identifier hits first, then other prefix hits newest first, then text relevance
+    def prefix_rank(job):
+        exact = identifier in (job.get('registration_key'), job.get('vin_key')) or phone == job.get('phone_key')
+        return (not exact, -job['created_at'].timestamp())
+    
+    items = []
+    seen = set()
+    for job in sorted(prefix_matches, key=prefix_rank) + text_matches:
+        if job['id'] in seen:
+            continue
+        seen.add(job['id'])
+        for key in SEARCH_KEY_FIELDS.values():
+            job.pop(key, None)
+        items.append(job)
+        if len(items) == limit:
+            break
+    
+    return ORJSONResponse({"items": shape_job_summaries(items)})
 
 @api_router.get("/jobs/{job_id}", response_model=Job)
-async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+async def get_job(
+    job_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -528,60 +1749,88 @@ async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Convert ISO strings
-    if isinstance(job.get('entry_date'), str):
-        job['entry_date'] = datetime.fromisoformat(job['entry_date'])
-    if isinstance(job.get('estimated_delivery'), str):
-        job['estimated_delivery'] = datetime.fromisoformat(job['estimated_delivery'])
-    if job.get('completion_date') and isinstance(job['completion_date'], str):
-        job['completion_date'] = datetime.fromisoformat(job['completion_date'])
-    if isinstance(job.get('created_at'), str):
-        job['created_at'] = datetime.fromisoformat(job['created_at'])
+    headers = validator_headers(document_etag(job), [job])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     
     return Job(**job)
 
 @api_router.patch("/jobs/{job_id}", response_model=Job)
-async def update_job(job_id: str, update_data: JobUpdate, current_user: User = Depends(get_current_user)):
-    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    # Check access
-    if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
+async def update_job(
+    job_id: str,
+    update_data: JobUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    # Optimistic concurrency: the write only applies to the version the client last saw
+    query = job_write_filter(job_id, current_user)
+    if if_match and if_match.strip() != "*":
+        version = parse_if_match_version(if_match, job_id)
+        if version is None:
+            raise HTTPException(status_code=412, detail="Job was modified by someone else")
+        # Jobs written before versioning have no field, which reads as version 0
+        query["version"] = version if version else {"$in": [0, None]}
     
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     
     # Handle mechanic reassignment (Manager only)
     if update_dict.get('assigned_mechanic_id') and current_user.role == "Manager":
-        mechanic = await db.users.find_one({"id": update_dict['assigned_mechanic_id']}, {"_id": 0})
+        mechanic = await db.users.find_one({"id": update_dict['assigned_mechanic_id']}, {"_id": 0, "full_name": 1})
         if mechanic:
             update_dict['assigned_mechanic_name'] = mechanic['full_name']
     
     # Handle date conversions
     if update_dict.get('entry_date'):
-        update_dict['entry_date'] = datetime.fromisoformat(update_dict['entry_date']).isoformat()
+        update_dict['entry_date'] = datetime.fromisoformat(update_dict['entry_date'])
     if update_dict.get('estimated_delivery'):
-        update_dict['estimated_delivery'] = datetime.fromisoformat(update_dict['estimated_delivery']).isoformat()
-    
-    # Auto-set completion date when status changes to Work complete
-    if update_dict.get('status') == 'Work complete' and job.get('status') != 'Work complete':
-        update_dict['completion_date'] = datetime.now(timezone.utc).isoformat()
-    
-    if update_dict:
-        await db.jobs.update_one({"id": job_id}, {"$set": update_dict})
+        update_dict['estimated_delivery'] = datetime.fromisoformat(update_dict['estimated_delivery'])
+    
+    update_dict.update(job_search_keys(update_dict))
+    
+    if not update_dict:
+        updated_job = await db.jobs.find_one(query, {"_id": 0})
+        if not updated_job:
+            await raise_job_write_error(job_id, current_user, conflict='version' in query)
+        response.headers.update(validator_headers(document_etag(updated_job), [updated_job]))
+        return Job(**updated_job)
+    
+    now = datetime.now(timezone.utc)
+    # A pipeline update so the stored status can be consulted inside the same write.
+    # Client values go through $literal so strings starting with "$" stay strings.
+    changes = {field: {"$literal": value} for field, value in update_dict.items()}
+    changes['updated_at'] = {"$literal": now}
+    changes['version'] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    if update_dict.get('status') == 'Work complete':
+        # Auto-set completion date when status changes to Work complete
+        changes['completion_date'] = {"$cond": [
+            {"$ne": ["$status", "Work complete"]}, {"$literal": now}, "$completion_date"
+        ]}
+    moves_counters = 'status' in update_dict or 'assigned_mechanic_id' in update_dict
+    if moves_counters:
+        # Keep the pre-image of the counter key, so the returned document says which bucket the job left
+        changes['last_transition'] = {
+            "status": "$status",
+            "assigned_mechanic_id": "$assigned_mechanic_id",
+            "at": {"$literal": now},
+        }
     
-    updated_job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    updated_job = await db.jobs.find_one_and_update(
+        query,
+        [{"$set": changes}],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_job:
+        await raise_job_write_error(job_id, current_user, conflict='version' in query)
     
-    # Convert ISO strings
-    if isinstance(updated_job.get('entry_date'), str):
-        updated_job['entry_date'] = datetime.fromisoformat(updated_job['entry_date'])
-    if isinstance(updated_job.get('estimated_delivery'), str):
-        updated_job['estimated_delivery'] = datetime.fromisoformat(updated_job['estimated_delivery'])
-    if updated_job.get('completion_date') and isinstance(updated_job['completion_date'], str):
-        updated_job['completion_date'] = datetime.fromisoformat(updated_job['completion_date'])
-    if isinstance(updated_job.get('created_at'), str):
-        updated_job['created_at'] = datetime.fromisoformat(updated_job['created_at'])
+    previous = updated_job['last_transition'] if moves_counters else updated_job
+    await move_job_counters(previous, update_dict)
+    if moves_counters:
+        await track_turnaround(previous, updated_job)
+    response.headers.update(validator_headers(document_etag(updated_job), [updated_job]))
+    publish_job_event("job.updated", updated_job, previous.get('assigned_mechanic_id'))
     
     return Job(**updated_job)
 
@@ -589,38 +1838,576 @@ async def update_job(job_id: str, update_data: JobUpdate, current_user: User = D
 @api_router.put("/jobs/{job_id}/checklist")
 async def update_checklist(job_id: str, checklist: List[dict], current_user: User = Depends(get_current_user)):
     """Update the checklist for a job"""
-    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    # Both Manager and assigned Mechanic can update
+    job = await db.jobs.find_one_and_update(
+        job_write_filter(job_id, current_user),
+        {"$set": {
+            "checklist": checklist,
+            **checklist_counts(checklist),
+            "updated_at": datetime.now(timezone.utc)
+        }, "$inc": {"version": 1}},
+        projection={"_id": 0, "assigned_mechanic_id": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    # Check access - both Manager and assigned Mechanic can update
-    if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    await db.jobs.update_one({"id": job_id}, {"$set": {"checklist": checklist}})
+        await raise_job_write_error(job_id, current_user)
+    publish_job_event("job.checklist", {
+        "id": job_id,
+        "assigned_mechanic_id": job['assigned_mechanic_id'],
+        "checklist": checklist,
+        **checklist_counts(checklist)
+    })
     
     return {"success": True, "checklist": checklist}
 
 
+async def attach_job_photos(job_id: str, uploads: List[UploadFile], uploaded_by: User) -> List[str]:
+    """Store uploads concurrently, link them to the job in one write, then queue derivatives"""
+    # Reject the whole batch before storing anything if one upload isn't an image
+    content_types = [await check_photo_upload(upload) for upload in uploads]
+    # Stream the uploads into GridFS and keep only the IDs on the job
+    photo_ids = await asyncio.gather(*(
+        store_photo(job_id, upload, uploaded_by.id, content_type)
+        for upload, content_type in zip(uploads, content_types)
+    ))
+    
+    job = await db.jobs.find_one_and_update(
+        job_write_filter(job_id, uploaded_by),
+        {
+            "$push": {"photos": {"$each": photo_ids}},
+            "$set": {"updated_at": datetime.now(timezone.utc)},
+            "$inc": {"version": 1}
+        },
+        projection={"_id": 0, "assigned_mechanic_id": 1, "photos": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not job:
+        # Rare path: the job is gone or not the caller's, so drop the files just stored
+        for photo_id in photo_ids:
+            await photo_bucket.delete(photo_id)
+        await raise_job_write_error(job_id, uploaded_by)
+    for photo_id in photo_ids:
+        queue_photo_derivatives(photo_id)
+    publish_job_event("job.media", {
+        "id": job_id,
+        "assigned_mechanic_id": job['assigned_mechanic_id'],
+        "photos": job['photos'],
+        "thumbnails": photo_thumbnail_urls(job_id, job['photos'])
+    })
+    return photo_ids
+
 @api_router.post("/jobs/{job_id}/photos")
 async def add_job_photo(job_id: str, photo: UploadFile = File(...), current_user: User = Depends(get_current_user)):
     """Add photo to a job"""
-    job = await db.jobs.find_one({"id": job_id})
+    [photo_id] = await attach_job_photos(job_id, [photo], current_user)
+    
+    return {
+        "message": "Photo added successfully",
+        "photo_id": photo_id,
+        "photo_url": f"/api/jobs/{job_id}/photos/{photo_id}",
+        "thumbnail_url": f"/api/jobs/{job_id}/photos/{photo_id}?size=thumb"
+    }
+
+@api_router.post("/jobs/{job_id}/photos/batch")
+async def add_job_photos(job_id: str, photos: List[UploadFile] = File(...), current_user: User = Depends(get_current_user)):
+    """Add several photos to a job in one request"""
+    if len(photos) > PHOTO_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PHOTO_BATCH_MAX} photos per upload")
+    
+    photo_ids = await attach_job_photos(job_id, photos, current_user)
+    
+    return {
+        "message": f"{len(photo_ids)} photos added successfully",
+        "photos": [
+            {
+                "photo_id": photo_id,
+                "photo_url": f"/api/jobs/{job_id}/photos/{photo_id}",
+                "thumbnail_url": f"/api/jobs/{job_id}/photos/{photo_id}?size=thumb"
+            }
+            for photo_id in photo_ids
+        ]
+    }
+
+@api_router.get("/jobs/{job_id}/photos/{photo_id}")
+async def get_job_photo(
+    job_id: str,
+    photo_id: str,
+    request: Request,
+    size: str = Query("original", pattern="^(original|medium|thumb)$"),
+    current_user: User = Depends(get_media_user)
+):
+    """Stream a job photo, or one of its WebP derivatives, from GridFS"""
+    job = await db.jobs.find_one(
+        {"id": job_id, "photos": photo_id},
+        {"_id": 0, "assigned_mechanic_id": 1}
+    )
     if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=404, detail="Photo not found")
     
-    # Read and encode image
-    image_data = await photo.read()
-    base64_image = base64.b64encode(image_data).decode('utf-8')
-    image_url = f"data:{photo.content_type};base64,{base64_image}"
+    # Check access
+    if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    # Add to photos array
+    grid_out = None
+    if size != "original":
+        try:
+            grid_out = await photo_bucket.open_download_stream(derivative_file_id(photo_id, size))
+        except gridfs.errors.NoFile:
+            pass
+    try:
+        grid_out = grid_out or await photo_bucket.open_download_stream(photo_id)
+    except gridfs.errors.NoFile:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    metadata = grid_out.metadata or {}
+    etag = f'"{metadata.get("sha256") or grid_out._id}"'
+    # Photo IDs are never reused, so the bytes behind one can be cached forever.
+    # The exception is the original standing in for a derivative that isn't rendered yet.
+    standing_in = size != "original" and grid_out._id == photo_id
+    cache_headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if standing_in else "private, max-age=31536000, immutable",
+        **MEDIA_SECURITY_HEADERS,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+    
+    async def iter_chunks():
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    
+    headers = {**cache_headers, "Content-Length": str(grid_out.length)}
+    # Legacy uploads were stored with whatever type the client claimed
+    media_type = metadata.get("content_type")
+    if not is_inline_media(media_type):
+        media_type = "application/octet-stream"
+        headers["Content-Disposition"] = "attachment"
+    return StreamingResponse(iter_chunks(), media_type=media_type, headers=headers)
+
+@api_router.post("/jobs/{job_id}/voice-note", response_model=VoiceNote)
+async def upload_voice_note(
+    job_id: str,
+    voice_note: UploadFile = File(...),
+    duration_seconds: Optional[float] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """Attach (or replace) the voice note for a job"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can add voice notes")
+    
+    # Without ffmpeg the recording is stored as uploaded, so only audio is accepted
+    content_type = voice_note.content_type or "audio/webm"
+    if not content_type.startswith("audio/"):
+        raise HTTPException(status_code=400, detail="Voice notes must be audio recordings")
+    
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "voice_note": 1, "assigned_mechanic_id": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    reference = await store_voice_note(job_id, iter_upload(voice_note), content_type, duration_seconds)
     await db.jobs.update_one(
         {"id": job_id},
-        {"$push": {"photos": image_url}}
+        {
+            "$set": {"voice_note": reference, "updated_at": datetime.now(timezone.utc)},
+            "$inc": {"version": 1}
+        }
     )
+    publish_job_event("job.media", {
+        "id": job_id,
+        "assigned_mechanic_id": job['assigned_mechanic_id'],
+        "voice_note": reference,
+        "has_voice_note": True
+    })
+    
+    # Drop the recording this one replaces
+    previous = job.get("voice_note")
+    if isinstance(previous, dict) and previous.get("id"):
+        try:
+            await voice_bucket.delete(previous["id"])
+        except gridfs.errors.NoFile:
+            pass
+    
+    return VoiceNote(**reference)
+
+@api_router.get("/jobs/{job_id}/voice-note")
+async def get_voice_note(job_id: str, request: Request, current_user: User = Depends(get_media_user)):
+    """Stream a job's voice note, honouring HTTP Range requests"""
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "assigned_mechanic_id": 1, "voice_note": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Check access
+    if current_user.role == "Mechanic" and job['assigned_mechanic_id'] != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    reference = job.get("voice_note")
+    if not isinstance(reference, dict):
+        raise HTTPException(status_code=404, detail="Voice note not found")
+    
+    try:
+        grid_out = await voice_bucket.open_download_stream(reference["id"])
+    except gridfs.errors.NoFile:
+        raise HTTPException(status_code=404, detail="Voice note not found")
+    
+    size = grid_out.length
+    byte_range = parse_range_header(request.headers.get("range"), size)
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+        "ETag": f'"{reference["id"]}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+        **MEDIA_SECURITY_HEADERS,
+    }
+    media_type = reference.get("content_type")
+    if not is_inline_media(media_type):
+        media_type = "application/octet-stream"
+        headers["Content-Disposition"] = "attachment"
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    async def iter_range():
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(PHOTO_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
     
-    return {"message": "Photo added successfully", "photo_url": image_url}
+    return StreamingResponse(
+        iter_range(),
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers
+    )
+
+# Job Events
+# Live job changes for GET /api/jobs/stream. Handlers publish into an in-process bus; with
+# JOB_CHANGE_STREAMS=true (replica set required) a Mongo change stream feeds it instead, so
+# every API process sees every write.
+JOB_CHANGE_STREAMS = os.environ.get("JOB_CHANGE_STREAMS", "false").lower() == "true"
+JOB_STREAM_QUEUE_SIZE = 100
+JOB_STREAM_HEARTBEAT_SECONDS = 15
+job_stream_subscribers = set()
+job_change_stream_task = None
+# Events carry Job and JobSummary fields only, so either kind of list can merge them.
+# job.checklist and job.media events are partial: they only update a job already listed.
+JOB_EVENT_FIELDS = set(Job.model_fields) | set(JobSummary.model_fields)
+
+class JobStreamSubscriber:
+    def __init__(self, user: User):
+        self.user = user
+        self.queue = asyncio.Queue(maxsize=JOB_STREAM_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, job: dict, previous_mechanic_id: Optional[str]) -> bool:
+        # Mechanics see their own jobs, including one just reassigned away from them
+        if self.user.role != "Mechanic":
+            return True
+        return self.user.id in (job.get('assigned_mechanic_id'), previous_mechanic_id)
+
+def broadcast_job_event(event_type: str, job: dict, previous_mechanic_id: Optional[str] = None):
+    payload = {k: v for k, v in job.items() if k in JOB_EVENT_FIELDS}
+    if isinstance(payload.get('voice_note'), str):
+        payload['voice_note'] = None
+    if 'photos' in payload:
+        # Jobs created before thumbnails were excluded from the dump still store an empty list
+        payload['thumbnails'] = photo_thumbnail_urls(payload['id'], payload['photos'])
+    if previous_mechanic_id and previous_mechanic_id != payload.get('assigned_mechanic_id'):
+        payload['previous_mechanic_id'] = previous_mechanic_id
+    frame = f"event: {event_type}\ndata: {orjson.dumps(payload, default=str).decode()}\n\n"
+    for subscriber in list(job_stream_subscribers):
+        if not subscriber.wants(payload, previous_mechanic_id):
+            continue
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # A client this far behind is told to refetch instead of buffering forever
+            subscriber.overflowed = True
+
+def publish_job_event(event_type: str, job: dict, previous_mechanic_id: Optional[str] = None):
+    """Called by write handlers; the change stream covers this when it is enabled"""
+    if not JOB_CHANGE_STREAMS:
+        broadcast_job_event(event_type, job, previous_mechanic_id)
+
+async def watch_job_changes():
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+    while True:
+        try:
+            async with db.jobs.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    job = change.get("fullDocument")
+                    if not job:
+                        continue
+                    updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+                    previous_mechanic_id = None
+                    if change["operationType"] == "insert":
+                        event_type = "job.created"
+                    elif "checklist" in updated_fields:
+                        event_type = "job.checklist"
+                    else:
+                        event_type = "job.updated"
+                    if any(field.split(".")[0] == "last_transition" for field in updated_fields):
+                        # update_job stores the pre-image, so a reassigned-away mechanic still hears about it
+                        previous_mechanic_id = job['last_transition'].get('assigned_mechanic_id')
+                    broadcast_job_event(event_type, job, previous_mechanic_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Job change stream interrupted, retrying: {str(e)}")
+            await asyncio.sleep(5)
+
+# Job Counters
+# One document per mechanic in `job_counters`: {_id: mechanic_id, mechanic_name, total, by_status: {status: n}}
+# Kept in step with jobs by create_job/update_job so stats never touch the jobs collection.
+COMPLETED_STATUSES = ["Work complete", "Washed", "Ready for delivery", "Delivered"]
+
+async def bump_job_counters(mechanic_id: str, job_status: str, delta: int, mechanic_name: Optional[str] = None):
+    update = {"$inc": {f"by_status.{job_status}": delta, "total": delta}}
+    if mechanic_name:
+        update["$set"] = {"mechanic_name": mechanic_name}
+    await db.job_counters.update_one({"_id": mechanic_id}, update, upsert=True)
+
+async def move_job_counters(previous: dict, update_dict: dict):
+    """Shift a job between counter buckets after a status change or reassignment"""
+    old_key = (previous.get('assigned_mechanic_id'), previous.get('status'))
+    new_key = (
+        update_dict.get('assigned_mechanic_id', old_key[0]),
+        update_dict.get('status', old_key[1]),
+    )
+    if old_key == new_key:
+        return
+    await bump_job_counters(old_key[0], old_key[1], -1)
+    await bump_job_counters(new_key[0], new_key[1], 1, update_dict.get('assigned_mechanic_name'))
+
+async def rebuild_job_counters() -> dict:
+    """Recompute job_counters from the jobs collection with one $group"""
+    pipeline = [
+        {"$group": {
+            "_id": {"mechanic": "$assigned_mechanic_id", "status": "$status"},
+            "mechanic_name": {"$last": "$assigned_mechanic_name"},
+            "count": {"$sum": 1},
+        }},
+    ]
+    counters = {}
+    async for row in db.jobs.aggregate(pipeline):
+        mechanic_id = row["_id"]["mechanic"]
+        doc = counters.setdefault(mechanic_id, {
+            "_id": mechanic_id,
+            "mechanic_name": row["mechanic_name"],
+            "total": 0,
+            "by_status": {},
+        })
+        doc["by_status"][row["_id"]["status"]] = row["count"]
+        doc["total"] += row["count"]
+
+    await replace_derived_documents(db.job_counters, list(counters.values()))
+    return {"mechanics": len(counters), "jobs": sum(d["total"] for d in counters.values())}
+
+# Derived Collections
+# Counters, metrics and rollups are rebuilt key by key with upserts rather than emptied and
+# reinserted, so the collection is never empty mid-rebuild and two rebuilds can't collide.
+# First-boot seeding also takes a lease in `locks`, so of several workers starting together
+# only one rebuilds.
+SEED_LEASE_SECONDS = 300
+
+async def replace_derived_documents(collection, docs: List[dict]):
+    """Overwrite `collection` with docs keyed by _id, dropping keys the rebuild no longer has"""
+    requests = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+    for start in range(0, len(requests), 1000):
+        await collection.bulk_write(requests[start:start + 1000], ordered=False)
+    await collection.delete_many({"_id": {"$nin": [doc["_id"] for doc in docs]}})
+
+async def acquire_lease(name: str, seconds: int) -> bool:
+    """Take the named lease unless another process holds an unexpired one"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.locks.update_one(
+            {"_id": name, "expires_at": {"$lt": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def release_lease(name: str):
+    await db.locks.delete_one({"_id": name})
+
+async def seed_if_empty(collection, rebuild) -> bool:
+    """Run `rebuild` for an empty derived collection, in one process only; True if it ran"""
+    if await collection.find_one({}, {"_id": 1}):
+        return False
+    lease = f"seed:{collection.name}"
+    if not await acquire_lease(lease, SEED_LEASE_SECONDS):
+        return False
+    try:
+        # Another worker may have finished seeding between the check and the lease
+        if await collection.find_one({}, {"_id": 1}):
+            return False
+        await rebuild()
+        return True
+    finally:
+        await release_lease(lease)
+
+# Mechanic Metrics
+# One `mechanic_metrics` document per mechanic with running turnaround totals:
+# {_id: mechanic_id, mechanic_name, completed, turnaround_seconds, on_time, histogram: {bucket: n}}
+# A finished job carries its own contribution as `turnaround`, so moving it back out of the
+# completed statuses can subtract exactly what was added.
+TURNAROUND_BUCKET_HOURS = [4, 8, 12, 24, 36, 48, 72, 96, 120, 168, 240, 336, 504, 720]
+
+def turnaround_bucket(seconds: float) -> int:
+    hours = seconds / 3600
+    for index, upper in enumerate(TURNAROUND_BUCKET_HOURS):
+        if hours <= upper:
+            return index
+    return len(TURNAROUND_BUCKET_HOURS)
+
+def job_turnaround(job: dict) -> Optional[dict]:
+    """Entry-to-completion contribution of a finished job, or None if it lacks usable dates"""
+    completed = stored_datetime(job.get('completion_date'))
+    entered = stored_datetime(job.get('entry_date'))
+    if not completed or not entered:
+        return None
+    due = stored_datetime(job.get('estimated_delivery'))
+    seconds = max((completed - entered).total_seconds(), 0)
+    on_time = due is not None and report_day(completed) <= report_day(due)
+    return {
+        "mechanic_id": job['assigned_mechanic_id'],
+        "seconds": seconds,
+        "on_time": on_time,
+        "bucket": turnaround_bucket(seconds),
+    }
+
+async def apply_turnaround(turnaround: dict, sign: int, mechanic_name: Optional[str] = None):
+    update = {"$inc": {
+        "completed": sign,
+        "turnaround_seconds": sign * turnaround['seconds'],
+        "on_time": sign * int(turnaround['on_time']),
+        f"histogram.{turnaround['bucket']}": sign,
+    }}
+    if mechanic_name:
+        update["$set"] = {"mechanic_name": mechanic_name}
+    await db.mechanic_metrics.update_one({"_id": turnaround['mechanic_id']}, update, upsert=True)
+
+async def track_turnaround(previous: dict, job: dict):
+    """Add or withdraw a job's turnaround when it enters or leaves the completed statuses"""
+    was_done = previous.get('status') in COMPLETED_STATUSES
+    is_done = job.get('status') in COMPLETED_STATUSES
+    if is_done and not was_done:
+        turnaround = job_turnaround(job)
+        if turnaround is None:
+            return
+        # The $exists guard makes a retried or concurrent transition count once
+        result = await db.jobs.update_one(
+            {"id": job['id'], "turnaround": {"$exists": False}}, {"$set": {"turnaround": turnaround}}
+        )
+        if result.modified_count:
+            await apply_turnaround(turnaround, 1, job.get('assigned_mechanic_name'))
+    elif was_done and not is_done:
+        before = await db.jobs.find_one_and_update(
+            {"id": job['id'], "turnaround": {"$exists": True}},
+            {"$unset": {"turnaround": ""}},
+            projection={"_id": 0, "turnaround": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if before:
+            await apply_turnaround(before['turnaround'], -1)
+
+async def rebuild_mechanic_metrics() -> dict:
+    """Recompute mechanic_metrics and every job's stored turnaround from the jobs collection"""
+    projection = {
+        "_id": 1, "id": 1, "status": 1, "assigned_mechanic_id": 1, "assigned_mechanic_name": 1,
+        "entry_date": 1, "estimated_delivery": 1, "completion_date": 1, "turnaround": 1,
+    }
+    metrics = {}
+    updates = []
+    async for job in db.jobs.find({"turnaround": {"$exists": True}}, {"_id": 1}):
+        updates.append(UpdateOne({"_id": job["_id"]}, {"$unset": {"turnaround": ""}}))
+    query = {"status": {"$in": COMPLETED_STATUSES}, "completion_date": {"$ne": None}}
+    async for job in db.jobs.find(query, projection):
+        turnaround = job_turnaround(job)
+        if turnaround is None:
+            continue
+        updates.append(UpdateOne({"_id": job["_id"]}, {"$set": {"turnaround": turnaround}}))
+        doc = metrics.setdefault(turnaround['mechanic_id'], {
+            "_id": turnaround['mechanic_id'],
+            "mechanic_name": job.get('assigned_mechanic_name'),
+            "completed": 0,
+            "turnaround_seconds": 0.0,
+            "on_time": 0,
+            "histogram": {},
+        })
+        doc["completed"] += 1
+        doc["turnaround_seconds"] += turnaround['seconds']
+        doc["on_time"] += int(turnaround['on_time'])
+        bucket = str(turnaround['bucket'])
+        doc["histogram"][bucket] = doc["histogram"].get(bucket, 0) + 1
+    
+    # Unsets come first in the list, so a job that keeps its turnaround gets it re-set
+    for start in range(0, len(updates), 1000):
+        await db.jobs.bulk_write(updates[start:start + 1000], ordered=True)
+    await replace_derived_documents(db.mechanic_metrics, list(metrics.values()))
+    return {"mechanics": len(metrics), "completed_jobs": sum(d["completed"] for d in metrics.values())}
+
+def histogram_percentile(histogram: dict, count: int, fraction: float) -> Optional[float]:
+    """Percentile in hours, interpolated inside the histogram bucket it falls in"""
+    if count <= 0:
+        return None
+    rank = fraction * count
+    seen = 0
+    for index in range(len(TURNAROUND_BUCKET_HOURS) + 1):
+        in_bucket = histogram.get(str(index), 0)
+        if in_bucket and seen + in_bucket >= rank:
+            lower = TURNAROUND_BUCKET_HOURS[index - 1] if index else 0
+            if index == len(TURNAROUND_BUCKET_HOURS):
+                return float(lower)  # Open-ended last bucket: report its floor
+            upper = TURNAROUND_BUCKET_HOURS[index]
+            return round(lower + (upper - lower) * (rank - seen) / in_bucket, 1)
+        seen += in_bucket
+    return float(TURNAROUND_BUCKET_HOURS[-1])
+
+@api_router.get("/reports/mechanics")
+async def get_mechanic_report(current_user: User = Depends(get_current_user)):
+    """Open jobs, turnaround and on-time rate per mechanic, from precomputed documents"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view mechanic reports")
+    
+    counters, metrics = await asyncio.gather(
+        db.job_counters.find({}).to_list(None),
+        db.mechanic_metrics.find({}).to_list(None),
+    )
+    counters = {doc["_id"]: doc for doc in counters}
+    metrics = {doc["_id"]: doc for doc in metrics}
+    
+    report = []
+    for mechanic_id in dict.fromkeys([*counters, *metrics]):
+        counter = counters.get(mechanic_id, {})
+        metric = metrics.get(mechanic_id, {})
+        completed = metric.get("completed", 0)
+        open_jobs = counter.get("total", 0) - sum(
+            counter.get("by_status", {}).get(s, 0) for s in COMPLETED_STATUSES
+        )
+        report.append({
+            "mechanic_id": mechanic_id,
+            "mechanic_name": counter.get("mechanic_name") or metric.get("mechanic_name"),
+            "open_jobs": open_jobs,
+            "completed_jobs": completed,
+            "avg_turnaround_hours": round(metric["turnaround_seconds"] / completed / 3600, 1) if completed else None,
+            "p90_turnaround_hours": histogram_percentile(metric.get("histogram", {}), completed, 0.9),
+            "on_time_rate": round(metric["on_time"] / completed, 3) if completed else None,
+        })
+    
+    return {
+        "mechanics": sorted(report, key=lambda row: -row["open_jobs"]),
+        "turnaround_buckets_hours": TURNAROUND_BUCKET_HOURS,
+    }
 
 # Statistics Endpoint
 @api_router.get("/stats")
@@ -628,20 +2415,225 @@ async def get_stats(current_user: User = Depends(get_current_user)):
     """Get job statistics for dashboard"""
     query = {}
     if current_user.role == "Mechanic":
-        query["assigned_mechanic_id"] = current_user.id
-    
-    all_jobs = await db.jobs.find(query, {"_id": 0}).to_list(1000)
+        query["_id"] = current_user.id
+    
+    # At most one small document per mechanic
+    counters = await db.job_counters.find(query).to_list(None)
+    
+    by_status = {}
+    by_mechanic = []
+    for doc in counters:
+        statuses = {k: v for k, v in doc.get("by_status", {}).items() if v}
+        for job_status, count in statuses.items():
+            by_status[job_status] = by_status.get(job_status, 0) + count
+        by_mechanic.append({
+            "mechanic_id": doc["_id"],
+            "mechanic_name": doc.get("mechanic_name"),
+            "total": doc.get("total", 0),
+            "by_status": statuses,
+        })
     
-    active_count = sum(1 for j in all_jobs if j.get("status") in ["Pending", "In Progress"])
-    completed_count = sum(1 for j in all_jobs if j.get("status") in ["Done", "Delivered"])
-    total_count = len(all_jobs)
+    total_count = sum(by_status.values())
+    completed_count = sum(by_status.get(s, 0) for s in COMPLETED_STATUSES)
     
     return {
-        "active": active_count,
+        "active": total_count - completed_count,
         "completed": completed_count,
-        "total": total_count
+        "total": total_count,
+        "by_status": by_status,
+        "by_mechanic": by_mechanic
     }
 
+# Revenue Rollups
+# One `revenue_daily` document per local day and mechanic:
+# {_id: "2025-10-17:<mechanic_id>", day, mechanic_id, mechanic_name, invoices, labour, parts, ...}
+# create_invoice $incs the matching document; reports sum a few hundred of these, never invoices.
+REPORT_TIMEZONE = os.environ.get("REPORT_TIMEZONE", "Asia/Kolkata")
+REVENUE_FIELDS = {
+    "labour": "labour_charges",
+    "parts": "parts_charges",
+    "tuning": "tuning_charges",
+    "others": "others_charges",
+    "gst": "gst_amount",
+    "grand_total": "grand_total",
+}
+
+def report_day(moment: datetime) -> str:
+    """Calendar day of `moment` in REPORT_TIMEZONE, as YYYY-MM-DD"""
+    return as_utc(moment).astimezone(ZoneInfo(REPORT_TIMEZONE)).strftime("%Y-%m-%d")
+
+async def record_invoice_revenue(invoice: dict):
+    day = report_day(invoice['invoice_date'])
+    mechanic_id = invoice.get('assigned_mechanic_id')
+    await db.revenue_daily.update_one(
+        {"_id": f"{day}:{mechanic_id}"},
+        {
+            "$inc": {"invoices": 1, **{name: invoice[field] for name, field in REVENUE_FIELDS.items()}},
+            "$set": {"mechanic_name": invoice.get('assigned_mechanic_name')},
+            "$setOnInsert": {"day": day, "mechanic_id": mechanic_id},
+        },
+        upsert=True
+    )
+
+async def rebuild_revenue_rollups() -> dict:
+    """Recompute revenue_daily from the invoices and report rows that had drifted"""
+    pipeline = [
+        # ISO-string dates from before `manage.py migrate-dates` are converted on the fly;
+        # anything unparseable is counted and left out rather than failing the rebuild
+        {"$set": {"invoice_date": {"$convert": {
+            "input": "$invoice_date", "to": "date", "onError": None, "onNull": None
+        }}}},
+        {"$match": {"invoice_date": {"$ne": None}}},
+        # Invoices from before attribution was stored fall back to the job's current mechanic
+        {"$lookup": {"from": "jobs", "localField": "job_id", "foreignField": "id", "as": "job"}},
+        {"$set": {"job": {"$arrayElemAt": ["$job", 0]}}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {
+                    "format": "%Y-%m-%d", "date": "$invoice_date", "timezone": REPORT_TIMEZONE
+                }},
+                "mechanic_id": {"$ifNull": ["$assigned_mechanic_id", "$job.assigned_mechanic_id"]},
+            },
+            "mechanic_name": {"$last": {"$ifNull": ["$assigned_mechanic_name", "$job.assigned_mechanic_name"]}},
+            "invoices": {"$sum": 1},
+            **{name: {"$sum": f"${field}"} for name, field in REVENUE_FIELDS.items()},
+        }},
+    ]
+    rollups = []
+    async for row in db.invoices.aggregate(pipeline):
+        day, mechanic_id = row["_id"]["day"], row["_id"]["mechanic_id"]
+        rollups.append({
+            **{k: v for k, v in row.items() if k != "_id"},
+            "_id": f"{day}:{mechanic_id}",
+            "day": day,
+            "mechanic_id": mechanic_id,
+        })
+    
+    current = {doc["_id"]: doc async for doc in db.revenue_daily.find({})}
+    drifted = [
+        doc["_id"] for doc in rollups
+        if any(
+            round(current.get(doc["_id"], {}).get(name, 0), 2) != round(doc[name], 2)
+            for name in ["invoices", *REVENUE_FIELDS]
+        )
+    ]
+    drifted += [doc_id for doc_id in current if doc_id not in {doc["_id"] for doc in rollups}]
+    
+    await replace_derived_documents(db.revenue_daily, rollups)
+    invoices = sum(doc["invoices"] for doc in rollups)
+    skipped = await db.invoices.count_documents({}) - invoices
+    if skipped:
+        logging.warning(f"Revenue rollups left out {skipped} invoices without a usable invoice_date")
+    return {"rows": len(rollups), "invoices": invoices, "skipped": skipped, "drifted": drifted}
+
+def empty_revenue() -> dict:
+    return {"invoices": 0, **{name: 0.0 for name in REVENUE_FIELDS}}
+
+def add_revenue(total: dict, row: dict):
+    for name in ["invoices", *REVENUE_FIELDS]:
+        total[name] += row.get(name, 0)
+
+def round_revenue(total: dict) -> dict:
+    return {name: value if name == "invoices" else round(value, 2) for name, value in total.items()}
+
+@api_router.get("/reports/revenue")
+async def get_revenue_report(
+    from_date: str,
+    to_date: str,
+    group_by: str = Query("day", pattern="^(day|month|financial_year)$"),
+    mechanic_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Labour, parts, tuning, others, GST and grand totals for [from_date, to_date], from the daily rollups"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view revenue reports")
+    
+    start = normalize_date_param(from_date, "from_date").strftime("%Y-%m-%d")
+    end = normalize_date_param(to_date, "to_date").strftime("%Y-%m-%d")
+    query = {"day": {"$gte": start, "$lte": end}}
+    if mechanic_id:
+        query["mechanic_id"] = mechanic_id
+    
+    totals = empty_revenue()
+    periods = {}
+    mechanics = {}
+    async for row in db.revenue_daily.find(query).sort("day", 1):
+        if group_by == "day":
+            period = row["day"]
+        elif group_by == "month":
+            period = row["day"][:7]
+        else:
+            fy = financial_year(datetime.strptime(row["day"], "%Y-%m-%d"))
+            period = f"FY{fy}-{(fy + 1) % 100:02d}"
+        add_revenue(totals, row)
+        add_revenue(periods.setdefault(period, empty_revenue()), row)
+        mechanic = mechanics.setdefault(row["mechanic_id"], {
+            "mechanic_id": row["mechanic_id"], **empty_revenue()
+        })
+        mechanic["mechanic_name"] = row.get("mechanic_name")
+        add_revenue(mechanic, row)
+    
+    return {
+        "from_date": start,
+        "to_date": end,
+        "group_by": group_by,
+        "timezone": REPORT_TIMEZONE,
+        "totals": round_revenue(totals),
+        "periods": [{"period": period, **round_revenue(values)} for period, values in periods.items()],
+        "by_mechanic": sorted(
+            (round_revenue(m) for m in mechanics.values()), key=lambda m: -m["grand_total"]
+        ),
+    }
+
+# Invoice Numbering
+# Numbers look like ICD-2025-0001: prefix, financial-year start, per-year sequence.
+# Sequences live in `counters` ({_id: "invoice-2025", seq}) and advance with one atomic $inc.
+INVOICE_PREFIX = os.environ.get("INVOICE_PREFIX", "ICD")
+FINANCIAL_YEAR_START_MONTH = int(os.environ.get("FINANCIAL_YEAR_START_MONTH", "4"))  # April
+INVOICE_NUMBER_ATTEMPTS = 5
+# Set by ensure_indexes once invoices.invoice_number is verified unique. Until then a
+# collision can't be detected on insert, so create_invoice looks the number up first.
+invoice_number_index_ready = False
+
+def financial_year(day: datetime) -> int:
+    """Calendar year in which the financial year containing `day` starts"""
+    return day.year if day.month >= FINANCIAL_YEAR_START_MONTH else day.year - 1
+
+async def seed_invoice_sequence(counter_id: str, number_prefix: str):
+    """Start a missing sequence after the highest number already issued with this prefix"""
+    pattern = re.compile(f"^{re.escape(number_prefix)}(\\d+)$")
+    highest = 0
+    async for inv in db.invoices.find(
+        {"invoice_number": {"$regex": f"^{re.escape(number_prefix)}"}},
+        {"_id": 0, "invoice_number": 1}
+    ):
+        match = pattern.match(inv["invoice_number"])
+        if match:
+            highest = max(highest, int(match.group(1)))
+    try:
+        await db.counters.update_one({"_id": counter_id}, {"$setOnInsert": {"seq": highest}}, upsert=True)
+    except DuplicateKeyError:
+        pass  # Another request seeded it first
+
+async def next_invoice_number(invoice_date: datetime) -> str:
+    # Same calendar as the revenue report, so 00:30 IST on 1 April opens the new year in both
+    fy = financial_year(datetime.strptime(report_day(invoice_date), "%Y-%m-%d"))
+    counter_id = f"invoice-{fy}"
+    number_prefix = f"{INVOICE_PREFIX}-{fy}-"
+    
+    counter = await db.counters.find_one_and_update(
+        {"_id": counter_id},
+        {"$inc": {"seq": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        await seed_invoice_sequence(counter_id, number_prefix)
+        counter = await db.counters.find_one_and_update(
+            {"_id": counter_id},
+            {"$inc": {"seq": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+    return f"{number_prefix}{counter['seq']:04d}"
 
 # Invoice Routes
 @api_router.post("/invoices", response_model=Invoice)
@@ -667,41 +2659,60 @@ async def create_invoice(invoice_data: InvoiceCreate, current_user: User = Depen
     gst_amount = subtotal * (gst_rate / 100) if gst_rate > 0 else 0
     grand_total = subtotal + gst_amount
     
-    # Use custom invoice number if provided, otherwise generate
-    if invoice_data.invoice_number and invoice_data.invoice_number.strip():
-        invoice_number = invoice_data.invoice_number.strip()
-    else:
-        count = await db.invoices.count_documents({}) + 1
-        invoice_number = f"ICD-2025-{count:04d}"
-    
     # Use custom invoice date if provided, otherwise use current date
     if invoice_data.invoice_date and invoice_data.invoice_date.strip():
         invoice_date = datetime.fromisoformat(invoice_data.invoice_date)
     else:
         invoice_date = datetime.now(timezone.utc)
     
-    invoice = Invoice(
-        invoice_number=invoice_number,
-        job_id=invoice_data.job_id,
-        invoice_date=invoice_date,
-        labour_charges=invoice_data.labour_charges,
-        parts=parts_list,
-        parts_charges=parts_total,
-        tuning_charges=invoice_data.tuning_charges,
-        others_charges=invoice_data.others_charges,
-        subtotal=subtotal,
-        gst_amount=gst_amount,
-        grand_total=grand_total
-    )
-    
-    invoice_dict = invoice.model_dump()
-    invoice_dict['invoice_date'] = invoice_dict['invoice_date'].isoformat()
+    custom_number = invoice_data.invoice_number.strip() if invoice_data.invoice_number else ""
     
-    await db.invoices.insert_one(invoice_dict)
-    return invoice
+    # A generated number can only collide with an earlier custom one; skip past it
+    for _ in range(INVOICE_NUMBER_ATTEMPTS):
+        invoice_number = custom_number or await next_invoice_number(invoice_date)
+        
+        invoice = Invoice(
+            invoice_number=invoice_number,
+            job_id=invoice_data.job_id,
+            invoice_date=invoice_date,
+            labour_charges=invoice_data.labour_charges,
+            parts=parts_list,
+            parts_charges=parts_total,
+            tuning_charges=invoice_data.tuning_charges,
+            others_charges=invoice_data.others_charges,
+            subtotal=subtotal,
+            gst_amount=gst_amount,
+            grand_total=grand_total
+        )
+        
+        invoice.version = 1
+        invoice_dict = invoice.model_dump()
+        invoice_dict['updated_at'] = datetime.now(timezone.utc)
+        # Revenue is credited to whoever has the job when it is invoiced
+        invoice_dict['assigned_mechanic_id'] = job['assigned_mechanic_id']
+        invoice_dict['assigned_mechanic_name'] = job['assigned_mechanic_name']
+        
+        # Without the unique index (see ensure_indexes) a duplicate would insert silently
+        if not invoice_number_index_ready and await db.invoices.find_one(
+            {"invoice_number": invoice_number}, {"_id": 1}
+        ):
+            inserted = False
+        else:
+            try:
+                await db.invoices.insert_one(invoice_dict)
+                inserted = True
+            except DuplicateKeyError:
+                inserted = False
+        if inserted:
+            await record_invoice_revenue(invoice_dict)
+            return invoice
+        if custom_number:
+            raise HTTPException(status_code=400, detail=f"Invoice number {custom_number} already exists")
+    
+    raise HTTPException(status_code=409, detail="Could not allocate an invoice number, please retry")
 
 @api_router.get("/invoices/{invoice_id}/pdf")
-async def get_invoice_pdf(invoice_id: str, current_user: User = Depends(get_current_user)):
+async def get_invoice_pdf(invoice_id: str, request: Request, current_user: User = Depends(get_current_user)):
     if current_user.role != "Manager":
         raise HTTPException(status_code=403, detail="Only managers can access invoices")
     
@@ -710,36 +2721,366 @@ async def get_invoice_pdf(invoice_id: str, current_user: User = Depends(get_curr
         raise HTTPException(status_code=404, detail="Invoice not found")
     
     job = await db.jobs.find_one({"id": invoice['job_id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    # Convert ISO strings for display
-    if isinstance(invoice.get('invoice_date'), str):
-        invoice['invoice_date'] = datetime.fromisoformat(invoice['invoice_date'])
+    # The key is a hash of what the PDF shows, so a revalidation never needs the file itself
+    etag = f'"{invoice_pdf_key(invoice, job)}"'
+    headers = {
+        "ETag": etag,
+        # Browsers may keep the PDF but must revalidate, which costs a 304 at most
+        "Cache-Control": "private, no-cache",
+        "Access-Control-Expose-Headers": "Content-Disposition, ETag"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    pdf_buffer = generate_invoice_pdf(invoice, job)
+    # Bytes rather than a path: the cached file may be evicted before it is streamed
+    pdf_bytes = await get_cached_invoice_pdf(invoice, job)
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            **headers,
+            "Content-Disposition": f"attachment; filename={invoice['invoice_number']}.pdf"
+        }
+    )
+
+EXPORT_WINDOW = PDF_WORKERS * 4  # invoices rendered concurrently (and held in memory) per step
+
+EXPORT_SKIPPED_ENTRY = "skipped_invoices.json"
+# The ZIP format can only store local times in this range; ZipInfo raises outside it
+ZIP_EARLIEST = (1980, 1, 1, 0, 0, 0)
+ZIP_LATEST = (2107, 12, 31, 23, 59, 58)
+
+def export_entry_name(invoice_number: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", invoice_number) + ".pdf"
+
+def zip_date_time(moment: datetime) -> tuple:
+    return min(max(moment.timetuple()[:6], ZIP_EARLIEST), ZIP_LATEST)
+
+async def iter_invoice_export(query: dict):
+    """Yield a ZIP of invoice PDFs window by window, never holding the whole archive
+
+    Headers are already sent by the time a missing job turns up, so invoices that
+    cannot be rendered are listed in a skipped_invoices.json entry at the end.
+    """
+    sink = ZipStreamSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    cursor = db.invoices.find(query, {"_id": 0}).sort([("invoice_date", 1), ("id", 1)])
+    seen_names = set()
+    skipped = []
+    
+    while True:
+        window = await cursor.to_list(EXPORT_WINDOW)
+        if not window:
+            break
+        
+        job_ids = list({inv['job_id'] for inv in window})
+        jobs = {job['id']: job async for job in db.jobs.find({"id": {"$in": job_ids}}, {"_id": 0})}
+        skipped += [
+            {"id": inv['id'], "invoice_number": inv['invoice_number'], "job_id": inv['job_id'],
+             "reason": "Job not found"}
+            for inv in window if inv['job_id'] not in jobs
+        ]
+        window = [inv for inv in window if inv['job_id'] in jobs]
+        
+        # Render the window in parallel across the PDF worker processes
+        pdfs = await asyncio.gather(*(get_cached_invoice_pdf(inv, jobs[inv['job_id']]) for inv in window))
+        
+        for inv, pdf_bytes in zip(window, pdfs):
+            name = export_entry_name(inv['invoice_number'])
+            if name in seen_names:
+                name = f"{name[:-4]}_{inv['id'][:8]}.pdf"
+            seen_names.add(name)
+            entry = zipfile.ZipInfo(name, date_time=zip_date_time(inv['invoice_date']))
+            archive.writestr(entry, pdf_bytes)
+            yield sink.drain()
+    
+    if skipped:
+        entry = zipfile.ZipInfo(EXPORT_SKIPPED_ENTRY, date_time=zip_date_time(datetime.now(timezone.utc)))
+        archive.writestr(entry, json.dumps(skipped, indent=2))
+    archive.close()
+    yield sink.drain()
+
+@api_router.get("/invoices/export")
+async def export_invoices(
+    from_date: str,
+    to_date: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every invoice dated in [from_date, to_date] as a ZIP of PDFs"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can export invoices")
     
+    start = normalize_date_param(from_date, "from_date")
+    query = {"invoice_date": {"$gte": start, "$lt": normalize_range_end(to_date, "to_date")}}
+    
+    filename = f"invoices_{from_date[:10]}_{to_date[:10]}.zip"
     return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
+        iter_invoice_export(query),
+        media_type="application/zip",
         headers={
-            "Content-Disposition": f"attachment; filename={invoice['invoice_number']}.pdf",
-            "Content-Type": "application/pdf",
-            "Cache-Control": "no-cache",
+            "Content-Disposition": f"attachment; filename={filename}",
             "Access-Control-Expose-Headers": "Content-Disposition"
         }
     )
 
+# Invoice fields only; the mechanic attribution kept for revenue rollups stays internal
+INVOICE_PROJECTION = {"_id": 0, **{field: 1 for field in Invoice.model_fields}}
+
 @api_router.get("/invoices/job/{job_id}", response_model=List[Invoice])
-async def get_job_invoices(job_id: str, current_user: User = Depends(get_current_user)):
+async def get_job_invoices(
+    job_id: str,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
     if current_user.role != "Manager":
         raise HTTPException(status_code=403, detail="Only managers can view invoices")
     
-    invoices = await db.invoices.find({"job_id": job_id}, {"_id": 0}).to_list(1000)
+    invoices = await db.invoices.find(
+        {"job_id": job_id}, {**INVOICE_PROJECTION, "updated_at": 1}
+    ).to_list(1000)
+    
+    headers = validator_headers(list_etag(f"invoices/{job_id}", invoices), invoices)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
     for inv in invoices:
-        if isinstance(inv.get('invoice_date'), str):
-            inv['invoice_date'] = datetime.fromisoformat(inv['invoice_date'])
+        inv.pop('updated_at', None)
+    return ORJSONResponse(invoices, headers=headers)
+
+@api_router.post("/invoices/batch", response_model=Dict[str, List[Invoice]])
+async def get_invoices_for_jobs(batch: InvoiceBatchRequest, current_user: User = Depends(get_current_user)):
+    """Invoices for many jobs in one indexed $in query, grouped by job ID"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view invoices")
+    
+    grouped = {}
+    async for inv in db.invoices.find({"job_id": {"$in": batch.job_ids}}, INVOICE_PROJECTION):
+        grouped.setdefault(inv['job_id'], []).append(inv)
     
-    return [Invoice(**inv) for inv in invoices]
+    return ORJSONResponse(grouped)
+
+# Vehicle History
+# A vehicle is identified by its normalized VIN (or plate, for jobs keyed before the VIN
+# was known). Both keys lead compound (key, kms) indexes, and the invoice join rides on
+# invoices.job_id, so a history is a handful of index lookups however large the shop gets.
+def vehicle_history_pipeline(key: str) -> List[dict]:
+    return [
+        {"$match": {"$or": [{"vin_key": key}, {"registration_key": key}]}},
+        {"$sort": {"kms": 1, "entry_date": 1}},
+        {"$lookup": {"from": "invoices", "localField": "id", "foreignField": "job_id", "as": "invoices"}},
+        {"$project": {
+            "_id": 0,
+            "job_id": "$id",
+            "entry_date": 1,
+            "completion_date": 1,
+            "kms": 1,
+            "status": 1,
+            "work_description": 1,
+            "assigned_mechanic_name": 1,
+            "registration_number": 1,
+            "vin": 1,
+            "customer_name": 1,
+            "car_brand": 1,
+            "car_model": 1,
+            "year": 1,
+            "invoices": {"$map": {"input": "$invoices", "in": {
+                "id": "$$this.id",
+                "invoice_number": "$$this.invoice_number",
+                "invoice_date": "$$this.invoice_date",
+                "grand_total": "$$this.grand_total",
+            }}},
+            "invoice_total": {"$sum": "$invoices.grand_total"},
+        }},
+    ]
+
+@api_router.get("/vehicles/{vin}/history", response_model=VehicleHistory)
+async def get_vehicle_history(vin: str, current_user: User = Depends(get_current_user)):
+    """Every job and invoice total for one vehicle, in odometer order"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view vehicle history")
+    
+    key = normalize_identifier(vin)
+    services = await db.jobs.aggregate(vehicle_history_pipeline(key)).to_list(None) if key else []
+    if not services:
+        raise HTTPException(status_code=404, detail="No jobs found for this vehicle")
+    
+    latest = max(services, key=lambda job: job['entry_date'])
+    vehicle = {
+        "vin": latest['vin'],
+        "registration_numbers": list(dict.fromkeys(job['registration_number'] for job in services)),
+        "car_brand": latest['car_brand'],
+        "car_model": latest['car_model'],
+        "year": latest['year'],
+        "customer_name": latest['customer_name'],
+        "visits": len(services),
+        "total_invoiced": sum(job['invoice_total'] for job in services),
+    }
+    for job in services:
+        for field in ("vin", "customer_name", "car_brand", "car_model", "year"):
+            job.pop(field, None)
+    
+    return ORJSONResponse({**vehicle, "services": services})
+
+# Notification Outbox
+# Handlers only insert into `outbox`; a background dispatcher delivers with retries.
+# Docs: {id, channel, kind, to, subject, body, job_id, invoice_id, state, attempts,
+#        next_attempt_at, last_error, created_at, sent_at}. state: pending -> sending -> sent | failed
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_POLL_SECONDS = 5
+OUTBOX_STALE_SENDING_SECONDS = 300  # a claim older than this belongs to a dead worker
+OUTBOX_CHANNELS = {
+    # channel: (sender, max concurrent sends, max sends per second)
+    "whatsapp": (
+        lambda msg: send_whatsapp_message(msg["to"], msg["body"]),
+        int(os.environ.get("WHATSAPP_CONCURRENCY", "2")),
+        float(os.environ.get("WHATSAPP_RATE_PER_SECOND", "1")),
+    ),
+    "email": (
+        lambda msg: send_email(msg["to"], msg["subject"], msg["body"]),
+        int(os.environ.get("EMAIL_CONCURRENCY", "4")),
+        float(os.environ.get("EMAIL_RATE_PER_SECOND", "5")),
+    ),
+}
+# Invoice flags flipped once the matching message has actually gone out
+OUTBOX_INVOICE_FLAGS = {
+    "invoice_customer": "sent_to_customer",
+    "invoice_accountant": "sent_to_accountant",
+}
+outbox_wakeup = asyncio.Event()
+outbox_task = None
+
+class ChannelRateLimiter:
+    """Spaces sends at least 1/rate seconds apart"""
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second
+        self.next_slot = 0.0
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+outbox_semaphores = {channel: asyncio.Semaphore(spec[1]) for channel, spec in OUTBOX_CHANNELS.items()}
+outbox_rate_limiters = {channel: ChannelRateLimiter(spec[2]) for channel, spec in OUTBOX_CHANNELS.items()}
+
+async def enqueue_notification(channel: str, kind: str, to: str, body: str, subject: Optional[str] = None,
+                               job_id: Optional[str] = None, invoice_id: Optional[str] = None) -> dict:
+    now = datetime.now(timezone.utc)
+    message = {
+        "id": str(uuid.uuid4()),
+        "channel": channel,
+        "kind": kind,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "job_id": job_id,
+        "invoice_id": invoice_id,
+        "state": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "last_error": None,
+        "created_at": now,
+        "sent_at": None,
+    }
+    await db.outbox.insert_one(message)
+    outbox_wakeup.set()
+    message.pop("_id", None)
+    return message
+
+async def claim_outbox_batch(limit: int) -> List[dict]:
+    """Atomically move up to `limit` due messages from pending to sending"""
+    claimed = []
+    now = datetime.now(timezone.utc)
+    for _ in range(limit):
+        message = await db.outbox.find_one_and_update(
+            # String timestamps are from before migrate-dates; treat those messages as due
+            {"state": "pending", "$or": [
+                {"next_attempt_at": {"$lte": now}}, {"next_attempt_at": {"$type": "string"}}
+            ]},
+            {"$set": {"state": "sending", "claimed_at": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if message is None:
+            break
+        claimed.append(message)
+    return claimed
+
+async def deliver_notification(message: dict):
+    channel = message["channel"]
+    sender = OUTBOX_CHANNELS[channel][0]
+    async with outbox_semaphores[channel]:
+        await outbox_rate_limiters[channel].acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, sender, message)
+            error = None if result and result.get("success") else (result or {}).get("message", "Send failed")
+        except Exception as e:
+            error = str(e)
+    
+    now = datetime.now(timezone.utc)
+    if error is None:
+        await db.outbox.update_one(
+            {"id": message["id"]},
+            {"$set": {"state": "sent", "sent_at": now, "last_error": None}}
+        )
+        flag = OUTBOX_INVOICE_FLAGS.get(message["kind"])
+        if flag and message.get("invoice_id"):
+            await db.invoices.update_one(
+                {"id": message["invoice_id"]},
+                {"$set": {flag: True, "updated_at": now}, "$inc": {"version": 1}}
+            )
+        return
+    
+    logging.warning(f"Notification {message['id']} attempt {message['attempts']} failed: {error}")
+    if message["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+        update = {"state": "failed", "last_error": error}
+    else:
+        backoff = OUTBOX_RETRY_BASE_SECONDS * 2 ** (message["attempts"] - 1)
+        update = {
+            "state": "pending",
+            "last_error": error,
+            "next_attempt_at": now + timedelta(seconds=backoff),
+        }
+    await db.outbox.update_one({"id": message["id"]}, {"$set": update})
+
+async def reclaim_stale_outbox() -> int:
+    """Return messages whose worker died mid-send to pending; the claim already counted the attempt"""
+    stale = datetime.now(timezone.utc) - timedelta(seconds=OUTBOX_STALE_SENDING_SECONDS)
+    result = await db.outbox.update_many(
+        {"state": "sending", "$or": [{"claimed_at": {"$lt": stale}}, {"claimed_at": {"$type": "string"}}]},
+        {"$set": {"state": "pending"}}
+    )
+    return result.modified_count
+
+async def run_outbox_dispatcher():
+    """Deliver due messages in batches; sleep until woken or the next poll"""
+    while True:
+        try:
+            await reclaim_stale_outbox()
+            batch = await claim_outbox_batch(OUTBOX_BATCH_SIZE)
+            if batch:
+                await asyncio.gather(*(deliver_notification(message) for message in batch))
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Outbox dispatcher error: {str(e)}")
+        
+        outbox_wakeup.clear()
+        try:
+            await asyncio.wait_for(outbox_wakeup.wait(), OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
 
 # Communication Routes
 @api_router.post("/jobs/{job_id}/send-confirmation")
@@ -753,8 +3094,8 @@ async def send_job_confirmation(job_id: str, current_user: User = Depends(get_cu
     
     message = f"Hi {job['customer_name']}, your {job['car_model']} service is completed and ready for delivery. — ICD Tuning, Chennai"
     
-    result = send_whatsapp_message(job['contact_number'], message)
-    return result
+    queued = await enqueue_notification("whatsapp", "job_confirmation", job['contact_number'], message, job_id=job_id)
+    return {"success": True, "message": "WhatsApp message queued", "notification_id": queued["id"]}
 
 @api_router.post("/invoices/{invoice_id}/send")
 async def send_invoice(invoice_id: str, send_type: str, current_user: User = Depends(get_current_user)):
@@ -766,32 +3107,225 @@ async def send_invoice(invoice_id: str, send_type: str, current_user: User = Dep
         raise HTTPException(status_code=404, detail="Invoice not found")
     
     job = await db.jobs.find_one({"id": invoice['job_id']}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
     if send_type == "customer":
-        result = send_whatsapp_message(
+        queued = await enqueue_notification(
+            "whatsapp",
+            "invoice_customer",
             job['contact_number'],
-            f"Your invoice {invoice['invoice_number']} is ready. Total: ₹{invoice['grand_total']}"
+            f"Your invoice {invoice['invoice_number']} is ready. Total: ₹{invoice['grand_total']}",
+            job_id=job['id'],
+            invoice_id=invoice_id
         )
-        await db.invoices.update_one({"id": invoice_id}, {"$set": {"sent_to_customer": True}})
     elif send_type == "accountant":
-        result = send_email(
+        queued = await enqueue_notification(
+            "email",
+            "invoice_accountant",
             "accountant@icdtuning.com",
-            f"Invoice {invoice['invoice_number']}",
-            f"Invoice for {job['customer_name']} - {job['car_model']}"
+            f"Invoice for {job['customer_name']} - {job['car_model']}",
+            subject=f"Invoice {invoice['invoice_number']}",
+            job_id=job['id'],
+            invoice_id=invoice_id
         )
-        await db.invoices.update_one({"id": invoice_id}, {"$set": {"sent_to_accountant": True}})
     else:
         raise HTTPException(status_code=400, detail="Invalid send type")
     
-    return result
+    return {"success": True, "message": "Invoice queued for sending", "notification_id": queued["id"]}
+
+@api_router.get("/notifications")
+async def get_notifications(
+    job_id: Optional[str] = None,
+    invoice_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Delivery state of queued messages for a job or an invoice"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view notifications")
+    if not job_id and not invoice_id:
+        raise HTTPException(status_code=400, detail="Pass job_id or invoice_id")
+    
+    query = {"invoice_id": invoice_id} if invoice_id else {"job_id": job_id}
+    return await db.outbox.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+
+# Google Sheets Sync
+# Pushes only jobs whose updated_at is past the stored watermark, keyed by job ID in column A.
+# gspread is synchronous, so every sheet call runs on a worker thread.
+SHEETS_WORKSHEET_TITLE = "ICD Tuning Jobs"
+SHEETS_BATCH_SIZE = 200
+# Incremental runs re-read this far behind the watermark. A write stamps updated_at before it
+# commits, so it can land behind a watermark that a concurrent run already advanced past it;
+# rows are keyed by job ID, so pushing a job twice is harmless.
+SHEETS_SYNC_OVERLAP = timedelta(seconds=int(os.environ.get("SHEETS_SYNC_OVERLAP_SECONDS", "300")))
+# Full job IDs in column A; the old exporter wrote 8-character prefixes and a footer row
+SHEETS_JOB_ID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+SHEETS_HEADERS = [
+    "Job ID",
+    "Customer Name",
+    "Contact Number",
+    "Vehicle",
+    "Registration No",
+    "VIN",
+    "Odometer (KMs)",
+    "Entry Date",
+    "Assigned Mechanic",
+    "Work Description",
+    "Estimated Delivery",
+    "Status",
+    "Notes",
+    "Completion Date",
+    "Created At"
+]
+SHEETS_LAST_COLUMN = "O"
+sheets_sync_status = {"state": "idle"}
+sheets_sync_task = None
+
+# Tests swap in an in-memory client here (see tests/fake_sheets.py)
+sheets_client_override = None
+
+def format_sheet_date(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str):
+        return value.split('T')[0]
+    return ''
+
+def job_sheet_row(job: dict) -> list:
+    return [
+        job.get('id', ''),
+        job.get('customer_name', ''),
+        job.get('contact_number', ''),
+        f"{job.get('car_brand', '')} {job.get('car_model', '')} ({job.get('year', '')})",
+        job.get('registration_number', ''),
+        job.get('vin', ''),
+        str(job.get('kms', '')) if job.get('kms') else '',
+        format_sheet_date(job.get('entry_date')),
+        job.get('assigned_mechanic_name', ''),
+        job.get('work_description', ''),
+        format_sheet_date(job.get('estimated_delivery')),
+        job.get('status', ''),
+        job.get('notes', '') or '',
+        format_sheet_date(job.get('completion_date')),
+        job['created_at'].isoformat() if isinstance(job.get('created_at'), datetime) else str(job.get('created_at', ''))
+    ]
+
+SHEETS_PROJECTION = {
+    "_id": 0, "id": 1, "customer_name": 1, "contact_number": 1, "car_brand": 1, "car_model": 1,
+    "year": 1, "registration_number": 1, "vin": 1, "kms": 1, "entry_date": 1,
+    "assigned_mechanic_name": 1, "work_description": 1, "estimated_delivery": 1, "status": 1,
+    "notes": 1, "completion_date": 1, "created_at": 1, "updated_at": 1,
+}
+
+def open_sync_worksheet(client, rewrite: bool):
+    """Open (or create) the jobs worksheet and return (worksheet, job ID -> row, next row, rewritten)
+
+    The sheet is cleared down to the header row for a full sync, and once for a sheet in the
+    old exporter's layout, whose short IDs can't be matched to jobs.
+    """
+    sheet = client.open_by_key(GOOGLE_SHEET_ID)
+    try:
+        worksheet = sheet.worksheet(SHEETS_WORKSHEET_TITLE)
+    except Exception:
+        worksheet = sheet.add_worksheet(title=SHEETS_WORKSHEET_TITLE, rows=1000, cols=20)
+    
+    ids = worksheet.col_values(1)
+    unknown_layout = not ids or ids[0] != SHEETS_HEADERS[0]
+    legacy_rows = any(value and not SHEETS_JOB_ID.fullmatch(value) for value in ids[1:])
+    if rewrite or unknown_layout or legacy_rows:
+        worksheet.clear()
+        worksheet.update('A1', [SHEETS_HEADERS])
+        worksheet.format(f'A1:{SHEETS_LAST_COLUMN}1', {
+            "backgroundColor": {"red": 0.82, "green": 0.18, "blue": 0.18},  # Red
+            "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}},
+            "horizontalAlignment": "CENTER"
+        })
+        return worksheet, {}, 2, True
+    row_by_id = {job_id: index + 1 for index, job_id in enumerate(ids) if index > 0 and job_id}
+    return worksheet, row_by_id, len(ids) + 1, False
+
+def push_sheet_batch(worksheet, row_by_id: dict, next_row: int, jobs: List[dict]) -> int:
+    """Update rows for known jobs and append the rest; returns the next free row"""
+    updates = []
+    appends = []
+    for job in jobs:
+        row = job_sheet_row(job)
+        if job['id'] in row_by_id:
+            row_number = row_by_id[job['id']]
+            updates.append({"range": f"A{row_number}:{SHEETS_LAST_COLUMN}{row_number}", "values": [row]})
+        else:
+            appends.append(row)
+            row_by_id[job['id']] = next_row
+            next_row += 1
+    if updates:
+        worksheet.batch_update(updates)
+    if appends:
+        worksheet.append_rows(appends)
+    return next_row
+
+async def run_sheets_sync(full: bool, requested_by: str):
+    loop = asyncio.get_running_loop()
+    state = await db.sync_state.find_one({"_id": "google_sheets"}) or {}
+    watermark = None if full else stored_datetime(state.get("watermark"))
+    sheets_sync_status.update({
+        "state": "running",
+        "full": watermark is None,
+        "requested_by": requested_by,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "error": None,
+        "processed": 0,
+        "total": None,
+    })
+    
+    try:
+        client = sheets_client_override or await loop.run_in_executor(None, get_google_sheets_client)
+        if not client:
+            raise RuntimeError("Failed to initialize Google Sheets client. Check credentials.")
+        worksheet, row_by_id, next_row, rewritten = await loop.run_in_executor(
+            None, open_sync_worksheet, client, watermark is None
+        )
+        if rewritten:
+            watermark = None
+            sheets_sync_status["full"] = True
+            # Jobs written before updated_at existed get their creation time as a watermark
+            await db.jobs.update_many({"updated_at": {"$exists": False}}, [{"$set": {"updated_at": "$created_at"}}])
+        
+        query = {"updated_at": {"$gte": watermark - SHEETS_SYNC_OVERLAP}} if watermark else {}
+        sheets_sync_status["total"] = await db.jobs.count_documents(query)
+        cursor = db.jobs.find(query, SHEETS_PROJECTION).sort([("updated_at", 1), ("id", 1)])
+        while True:
+            batch = await cursor.to_list(SHEETS_BATCH_SIZE)
+            if not batch:
+                break
+            next_row = await loop.run_in_executor(None, push_sheet_batch, worksheet, row_by_id, next_row, batch)
+            # Advance the watermark after every pushed batch so a failure resumes where it stopped.
+            # The overlap window can start a run behind the stored value; never move it back.
+            watermark = max(watermark, batch[-1]['updated_at']) if watermark else batch[-1]['updated_at']
+            await db.sync_state.update_one(
+                {"_id": "google_sheets"}, {"$set": {"watermark": watermark}}, upsert=True
+            )
+            sheets_sync_status["processed"] += len(batch)
+        
+        if sheets_sync_status["full"]:
+            await loop.run_in_executor(None, worksheet.columns_auto_resize, 0, len(SHEETS_HEADERS))
+        sheets_sync_status["state"] = "done"
+        logging.info(f"Synced {sheets_sync_status['processed']} jobs to Google Sheets for {requested_by}")
+    except Exception as e:
+        logging.error(f"Error syncing to Google Sheets: {str(e)}")
+        sheets_sync_status.update({"state": "failed", "error": str(e)})
+    finally:
+        sheets_sync_status["finished_at"] = datetime.now(timezone.utc).isoformat()
+        sheets_sync_status["watermark"] = watermark
 
 @api_router.post("/export/google-sheets")
-async def export_to_sheets(current_user: User = Depends(get_current_user)):
-    """Export all jobs to Google Sheets"""
+async def export_to_sheets(full: bool = False, current_user: User = Depends(get_current_user)):
+    """Start a background sync of changed jobs to Google Sheets"""
+    global sheets_sync_task
     if current_user.role != "Manager":
         raise HTTPException(status_code=403, detail="Only managers can export data")
     
-    if not GOOGLE_SHEETS_ENABLED:
+    if not GOOGLE_SHEETS_ENABLED and not sheets_client_override:
         return {
             "success": False,
             "message": "Google Sheets integration not configured. Please add GOOGLE_SHEETS_ENABLED=true and credentials to .env file."
@@ -803,148 +3337,212 @@ async def export_to_sheets(current_user: User = Depends(get_current_user)):
             "message": "GOOGLE_SHEET_ID not set in environment variables"
         }
     
-    try:
-        # Get all jobs
-        jobs = await db.jobs.find({}, {"_id": 0}).to_list(1000)
-        
-        if not jobs:
-            return {
-                "success": False,
-                "message": "No jobs found to export"
-            }
-        
-        # Initialize Google Sheets client
-        client = get_google_sheets_client()
-        if not client:
-            return {
-                "success": False,
-                "message": "Failed to initialize Google Sheets client. Check credentials."
-            }
-        
-        # Open the spreadsheet
-        try:
-            sheet = client.open_by_key(GOOGLE_SHEET_ID)
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to open Google Sheet. Make sure the Sheet ID is correct and shared with the service account. Error: {str(e)}"
-            }
-        
-        # Get or create worksheet
-        try:
-            worksheet = sheet.worksheet("ICD Tuning Jobs")
-        except Exception:
-            worksheet = sheet.add_worksheet(title="ICD Tuning Jobs", rows=1000, cols=20)
-        
-        # Clear existing data
-        worksheet.clear()
-        
-        # Prepare headers
-        headers = [
-            "Job ID",
-            "Customer Name",
-            "Contact Number",
-            "Vehicle",
-            "Registration No",
-            "VIN",
-            "Odometer (KMs)",
-            "Entry Date",
-            "Assigned Mechanic",
-            "Work Description",
-            "Estimated Delivery",
-            "Status",
-            "Notes",
-            "Completion Date",
-            "Created At"
-        ]
-        
-        # Prepare data rows
-        data_rows = []
-        for job in jobs:
-            entry_date = job.get('entry_date')
-            if isinstance(entry_date, datetime):
-                entry_date = entry_date.strftime('%Y-%m-%d')
-            elif isinstance(entry_date, str):
-                entry_date = entry_date.split('T')[0]
-            
-            estimated_delivery = job.get('estimated_delivery')
-            if isinstance(estimated_delivery, datetime):
-                estimated_delivery = estimated_delivery.strftime('%Y-%m-%d')
-            elif isinstance(estimated_delivery, str):
-                estimated_delivery = estimated_delivery.split('T')[0]
-            
-            completion_date = job.get('completion_date', '')
-            if completion_date and isinstance(completion_date, datetime):
-                completion_date = completion_date.strftime('%Y-%m-%d')
-            elif completion_date and isinstance(completion_date, str):
-                completion_date = completion_date.split('T')[0]
-            
-            row = [
-                job.get('id', '')[:8],  # Short ID
-                job.get('customer_name', ''),
-                job.get('contact_number', ''),
-                f"{job.get('car_brand', '')} {job.get('car_model', '')} ({job.get('year', '')})",
-                job.get('registration_number', ''),
-                job.get('vin', ''),
-                str(job.get('kms', '')) if job.get('kms') else '',
-                entry_date,
-                job.get('assigned_mechanic_name', ''),
-                job.get('work_description', ''),
-                estimated_delivery,
-                job.get('status', ''),
-                job.get('notes', ''),
-                completion_date,
-                job.get('created_at', '')
-            ]
-            data_rows.append(row)
-        
-        # Update sheet with headers and data
-        all_data = [headers] + data_rows
-        worksheet.update('A1', all_data)
-        
-        # Format the header row
-        worksheet.format('A1:O1', {
-            "backgroundColor": {"red": 0.82, "green": 0.18, "blue": 0.18},  # Red
-            "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}},
-            "horizontalAlignment": "CENTER"
-        })
-        
-        # Auto-resize columns
-        worksheet.columns_auto_resize(0, len(headers))
-        
-        # Add timestamp
-        export_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-        worksheet.update('A' + str(len(data_rows) + 3), [[f"Exported by: {current_user.full_name} on {export_time}"]])
-        
-        logging.info(f"Successfully exported {len(jobs)} jobs to Google Sheets by {current_user.full_name}")
-        
+    if sheets_sync_task and not sheets_sync_task.done():
         return {
             "success": True,
-            "message": f"Successfully exported {len(jobs)} jobs to Google Sheets",
-            "job_count": len(jobs),
-            "sheet_url": f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}"
-        }
-        
-    except Exception as e:
-        logging.error(f"Error exporting to Google Sheets: {str(e)}")
-        return {
-            "success": False,
-            "message": f"Failed to export to Google Sheets: {str(e)}"
+            "message": "A Google Sheets sync is already running",
+            "status": sheets_sync_status
         }
+    
+    sheets_sync_task = asyncio.create_task(run_sheets_sync(full, current_user.full_name))
+    return {
+        "success": True,
+        "message": "Google Sheets sync started",
+        "sheet_url": f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}"
+    }
+
+@api_router.get("/export/google-sheets/status")
+async def get_sheets_sync_status(current_user: User = Depends(get_current_user)):
+    """Progress of the current or most recent Google Sheets sync"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can export data")
+    
+    return sheets_sync_status
+
+# Indexes
+# Every hot lookup in this module, as (collection, keys, options). Unique where IDs must be unique.
+INDEX_SPECS = [
+    ("users", [("id", 1)], {"unique": True}),
+    ("users", [("username", 1)], {"unique": True}),
+    ("users", [("role", 1)], {}),
+    ("jobs", [("id", 1)], {"unique": True}),
+    # Keyset pagination for the job listings, optionally scoped by mechanic or status
+    ("jobs", JOB_SORT, {}),
+    ("jobs", [("assigned_mechanic_id", 1)] + JOB_SORT, {}),
+    ("jobs", [("status", 1)] + JOB_SORT, {}),
+    ("jobs", [("updated_at", 1), ("id", 1)], {}),
+    # GET /jobs/search: normalized identifier prefixes and full text
+    # Also GET /vehicles/{vin}/history, which reads one vehicle's jobs in odometer order
+    ("jobs", [("registration_key", 1), ("kms", 1)], {}),
+    ("jobs", [("vin_key", 1), ("kms", 1)], {}),
+    ("jobs", [("phone_key", 1)], {}),
+    ("jobs", [("customer_name", "text"), ("work_description", "text")], {
+        "name": "jobs_text",
+        "weights": {"customer_name": 5, "work_description": 1},
+        "default_language": "none",
+    }),
+    ("outbox", [("id", 1)], {"unique": True}),
+    ("outbox", [("state", 1), ("next_attempt_at", 1)], {}),
+    ("outbox", [("job_id", 1), ("created_at", -1)], {}),
+    ("outbox", [("invoice_id", 1), ("created_at", -1)], {}),
+    ("invoices", [("id", 1)], {"unique": True}),
+    ("invoices", [("job_id", 1)], {}),
+    ("invoices", [("invoice_number", 1)], {"unique": True}),
+    ("invoices", [("invoice_date", 1), ("id", 1)], {}),
+    ("revenue_daily", [("day", 1), ("mechanic_id", 1)], {}),
+]
+
+# Representative query shapes for the index report, one per route-level lookup
+HOT_QUERIES = [
+    ("get_current_user", "users", {"id": "_"}, None),
+    ("login/register", "users", {"username": "_"}, None),
+    ("get_mechanics", "users", {"role": "Mechanic"}, None),
+    ("get_job", "jobs", {"id": "_"}, None),
+    ("get_jobs (manager)", "jobs", {}, JOB_SORT),
+    ("get_jobs (mechanic)", "jobs", {"assigned_mechanic_id": "_"}, JOB_SORT),
+    ("get_jobs (status)", "jobs", {"status": "_"}, JOB_SORT),
+    ("search_jobs (registration)", "jobs", {"registration_key": {"$regex": "^_"}}, JOB_SORT),
+    ("search_jobs (vin)", "jobs", {"vin_key": {"$regex": "^_"}}, JOB_SORT),
+    ("search_jobs (phone)", "jobs", {"phone_key": {"$regex": "^_"}}, JOB_SORT),
+    ("search_jobs (text)", "jobs", {"$text": {"$search": "_"}}, None),
+    ("vehicle_history", "jobs", {"vin_key": "_"}, [("kms", 1)]),
+    ("get_invoice_pdf", "invoices", {"id": "_"}, None),
+    ("get_job_invoices", "invoices", {"job_id": "_"}, None),
+    ("get_invoices_for_jobs", "invoices", {"job_id": {"$in": ["_", "_"]}}, None),
+    ("export_invoices", "invoices", {"invoice_date": {"$gte": "_", "$lt": "_"}}, [("invoice_date", 1), ("id", 1)]),
+    ("revenue_report", "revenue_daily", {"day": {"$gte": "_", "$lte": "_"}}, [("day", 1)]),
+]
+
+async def find_duplicate_keys(collection: str, keys: List[tuple], limit: int = 20) -> List[dict]:
+    """Key values held by more than one document, i.e. what blocks a unique index"""
+    pipeline = [
+        {"$group": {"_id": {field: f"${field}" for field, _ in keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [{**row["_id"], "count": row["count"]} async for row in db[collection].aggregate(pipeline)]
+
+async def ensure_indexes() -> List[dict]:
+    """Create every index in INDEX_SPECS and verify it exists afterwards"""
+    global invoice_number_index_ready
+    results = []
+    for collection, keys, options in INDEX_SPECS:
+        entry = {"collection": collection, "keys": keys, **options}
+        try:
+            entry["name"] = await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicate IDs blocking a unique index; keep serving and report it
+            logging.error(f"Failed to create index {keys} on {collection}: {e}")
+            entry["error"] = str(e)
+        results.append(entry)
+
+    for entry in results:
+        existing = await db[entry["collection"]].index_information()
+        # Text indexes report their keys as _fts/_ftsx, so match those by name
+        matches = [
+            info for name, info in existing.items()
+            if name == entry.get("name") or info["key"] == list(entry["keys"])
+        ]
+        # A non-unique index on the same keys doesn't stand in for a unique one
+        entry["verified"] = any(info.get("unique", False) or not entry.get("unique") for info in matches)
+        if entry["verified"]:
+            continue
+        if entry.get("unique"):
+            entry["duplicates"] = await find_duplicate_keys(entry["collection"], entry["keys"])
+            logging.critical(
+                f"Unique index {entry['keys']} missing on {entry['collection']}; "
+                f"duplicate values block it: {entry['duplicates']}"
+            )
+        else:
+            logging.error(f"Index {entry['keys']} missing on {entry['collection']}")
+    
+    invoice_number_index_ready = any(
+        entry["collection"] == "invoices" and entry["keys"] == [("invoice_number", 1)] and entry["verified"]
+        for entry in results
+    )
+    return results
+
+def find_plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() winning plan"""
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    for child_key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(child_key), dict):
+            stages += find_plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += find_plan_stages(child)
+    return stages
+
+async def build_index_report() -> dict:
+    """Indexes per collection plus the winning plan for every hot query"""
+    indexes = {}
+    for collection in sorted({spec[0] for spec in INDEX_SPECS}):
+        info = await db[collection].index_information()
+        indexes[collection] = [
+            {"name": name, "keys": details["key"], "unique": details.get("unique", False)}
+            for name, details in info.items()
+        ]
+
+    queries = []
+    for route, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = find_plan_stages(plan)
+        queries.append({
+            "route": route,
+            "collection": collection,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+        })
+
+    return {
+        "indexes": indexes,
+        "queries": queries,
+        "collection_scans": [q["route"] for q in queries if q["collection_scan"]],
+    }
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: User = Depends(get_current_user)):
+    """Deploy-time check that no hot route falls back to a collection scan"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view index reports")
+    
+    return await build_index_report()
+
+@api_router.get("/admin/user-cache")
+async def get_user_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters for the authenticated-user cache"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view cache stats")
+    
+    lookups = user_cache_stats["hits"] + user_cache_stats["misses"]
+    return {
+        **user_cache_stats,
+        "hit_rate": user_cache_stats["hits"] / lookups if lookups else 0.0,
+        "size": len(user_cache),
+        "max_size": USER_CACHE_SIZE,
+        "ttl_seconds": USER_CACHE_TTL
+    }
+
+@api_router.get("/admin/compression")
+async def get_compression_stats(current_user: User = Depends(get_current_user)):
+    """Ratio and CPU time spent compressing API responses"""
+    if current_user.role != "Manager":
+        raise HTTPException(status_code=403, detail="Only managers can view compression stats")
+    
+    stats = compression_stats
+    return {
+        **stats,
+        "ratio": stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else 1.0,
+        "avg_ms": stats["seconds"] * 1000 / stats["responses"] if stats["responses"] else 0.0,
+        "min_bytes": COMPRESSION_MIN_BYTES,
+        "encodings": ["br", "gzip"] if brotli is not None else ["gzip"]
+    }
 
 # Include router
 app.include_router(api_router)
 
-# Add cache control middleware
-@app.middleware("http")
-async def add_no_cache_headers(request, call_next):
-    response = await call_next(request)
-    if request.url.path.startswith("/api"):
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-    return response
-
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -960,6 +3558,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    await ensure_indexes()
+    # Older releases stored ISO strings; reads, sorts and range filters all expect datetimes.
+    # Idempotent, so every worker can run it; a no-op once the data has been converted.
+    migrated = await migrate_date_fields()
+    if any(migrated["converted"].values()) or migrated["unparseable"]:
+        logging.warning(f"Converted string dates left by an older release: {migrated}")
+    # First boot after counters were introduced: seed them from the jobs collection
+    await seed_if_empty(db.job_counters, rebuild_job_counters)
+    await seed_if_empty(db.revenue_daily, rebuild_revenue_rollups)
+    await seed_if_empty(db.mechanic_metrics, rebuild_mechanic_metrics)
+    global outbox_task, job_change_stream_task
+    outbox_task = asyncio.create_task(run_outbox_dispatcher())
+    if JOB_CHANGE_STREAMS:
+        job_change_stream_task = asyncio.create_task(watch_job_changes())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    for task in (outbox_task, job_change_stream_task):
+        if task is not None:
+            task.cancel()
+    client.close()
+    if pdf_executor is not None:
+        pdf_executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
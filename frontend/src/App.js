@@ -10,21 +10,99 @@ import MechanicDashboard from "@/pages/MechanicDashboard";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
-// Configure axios to prevent caching
-axios.defaults.headers.common['Cache-Control'] = 'no-cache, no-store, must-revalidate';
-axios.defaults.headers.common['Pragma'] = 'no-cache';
-axios.defaults.headers.common['Expires'] = '0';
-
-// Add request interceptor to add timestamp to prevent browser caching
-axios.interceptors.request.use((config) => {
-  if (config.method === 'get') {
-    config.params = {
-      ...config.params,
-      _t: new Date().getTime()
+// API responses carry ETags with `Cache-Control: private, no-cache`, so the
+// browser revalidates every GET and gets a cheap 304 when nothing changed.
+
+const JOB_PAGE_SIZE = 200;
+const RECENT_JOB_PAGES = 5;
+
+// Load the newest jobs matching `params`, following keyset cursors for at most
+// `maxPages` pages. Returns { items, nextCursor }; pass nextCursor back as
+// `cursor` (with maxPages: 1) to load older jobs on demand.
+// With `summary` set, slim JobSummary cards are returned instead of full jobs.
+export const fetchRecentJobs = async ({ summary = false, cursor = null, maxPages = RECENT_JOB_PAGES, ...params } = {}) => {
+  const items = [];
+  let pages = 0;
+  do {
+    const response = await axios.get(`${API}/jobs${summary ? "/summary" : ""}`, {
+      params: { ...params, limit: JOB_PAGE_SIZE, ...(cursor ? { cursor } : {}) }
+    });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+    pages += 1;
+  } while (cursor && pages < maxPages);
+  return { items, nextCursor: cursor };
+};
+
+// Merge a job, or a partial change to one, into a jobs list held in React state.
+// Partial changes only update a job already listed; `keep` decides whether a job
+// still belongs in the list (e.g. still assigned to me).
+export const mergeJobChange = (setJobs, change, { partial = false, keep = () => true } = {}) => {
+  setJobs((prev) => {
+    const existing = prev.find((job) => job.id === change.id);
+    if (!existing) {
+      return !partial && keep(change) ? [change, ...prev] : prev;
+    }
+    const merged = { ...existing, ...change };
+    return keep(merged)
+      ? prev.map((job) => (job.id === change.id ? merged : job))
+      : prev.filter((job) => job.id !== change.id);
+  });
+};
+
+// <audio> and EventSource can't send the Authorization header, so their URLs carry
+// a short-lived token issued for that one path. Fetch it right before use.
+export const mediaUrl = async (path) => {
+  const response = await axios.post(`${API}/auth/media-token`, { path: `/api${path}` });
+  return `${API}${path}?access_token=${encodeURIComponent(response.data.token)}`;
+};
+
+const PARTIAL_JOB_EVENTS = ["job.checklist", "job.media"];
+const STREAM_RETRY_MS = 3000;
+
+// Apply live job events from /api/jobs/stream, including the ones our own writes
+// cause. Returns a function that closes the stream.
+export const subscribeToJobEvents = (setJobs, { onResync, keep = () => true } = {}) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const applyChange = (event) =>
+    mergeJobChange(setJobs, JSON.parse(event.data), {
+      partial: PARTIAL_JOB_EVENTS.includes(event.type),
+      keep
+    });
+
+  const connect = async () => {
+    let url;
+    try {
+      url = await mediaUrl("/jobs/stream");
+    } catch (error) {
+      retryTimer = setTimeout(connect, STREAM_RETRY_MS);
+      return;
+    }
+    if (closed) return;
+    source = new EventSource(url);
+    ["job.created", "job.updated", ...PARTIAL_JOB_EVENTS].forEach((type) =>
+      source.addEventListener(type, applyChange)
+    );
+    source.addEventListener("resync", () => onResync && onResync());
+    // The browser reconnects a dropped stream with the same URL; once its token has
+    // expired that attempt is refused and the source closes, so start over with a new one
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !closed) {
+        retryTimer = setTimeout(connect, STREAM_RETRY_MS);
+      }
     };
-  }
-  return config;
-});
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) source.close();
+  };
+};
 
 // Auth Context
 const AuthContext = createContext(null);
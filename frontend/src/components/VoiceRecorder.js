@@ -9,6 +9,7 @@ const VoiceRecorder = ({ onRecordingComplete, existingRecording }) => {
   const mediaRecorderRef = useRef(null);
   const chunksRef = useRef([]);
   const timerRef = useRef(null);
+  const startedAtRef = useRef(null);
 
   const startRecording = async () => {
     try {
@@ -27,21 +28,18 @@ const VoiceRecorder = ({ onRecordingComplete, existingRecording }) => {
         const url = URL.createObjectURL(blob);
         setAudioURL(url);
 
-        // Convert to base64
-        const reader = new FileReader();
-        reader.readAsDataURL(blob);
-        reader.onloadend = () => {
-          const base64 = reader.result;
-          if (onRecordingComplete) {
-            onRecordingComplete(base64);
-          }
-        };
+        // Hand the raw blob over; it is uploaded as multipart once the job exists
+        if (onRecordingComplete) {
+          const duration = (Date.now() - startedAtRef.current) / 1000;
+          onRecordingComplete({ blob, url, duration });
+        }
 
         // Stop all tracks
         stream.getTracks().forEach(track => track.stop());
       };
 
       mediaRecorderRef.current.start();
+      startedAtRef.current = Date.now();
       setIsRecording(true);
       setRecordingTime(0);
 
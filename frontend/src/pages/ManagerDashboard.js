@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { useAuth } from "@/App";
+import { useAuth, fetchRecentJobs, mergeJobChange, subscribeToJobEvents } from "@/App";
 import axios from "axios";
 import { toast } from "sonner";
 import { Button } from "@/components/ui/button";
@@ -100,6 +100,7 @@ const viewPDFWithAuth = async (invoiceId, invoiceNumber) => {
 const ManagerDashboard = () => {
   const { user, logout } = useAuth();
   const [jobs, setJobs] = useState([]);
+  const [olderJobsCursor, setOlderJobsCursor] = useState(null);
   const [mechanics, setMechanics] = useState([]);
   const [filterStatus, setFilterStatus] = useState("All");
   const [searchQuery, setSearchQuery] = useState("");
@@ -150,32 +151,31 @@ const ManagerDashboard = () => {
   useEffect(() => {
     fetchJobs();
     fetchMechanics();
+  }, []);
+
+  useEffect(() => {
     if (activeTab === "invoices") {
       fetchInvoices();
     }
   }, [activeTab]);
 
+  // Apply other users' changes as they happen instead of refetching the list
+  useEffect(() => subscribeToJobEvents(setJobs, { onResync: () => fetchJobs() }), []);
+
   const fetchInvoices = async () => {
     try {
-      // Fetch all jobs and their invoices
-      const jobsResponse = await axios.get(`${API}/jobs`);
-      const allJobs = jobsResponse.data;
-      
-      // For each job, try to fetch its invoice
-      const invoicePromises = allJobs.map(async (job) => {
-        try {
-          const response = await axios.get(`${API}/invoices/job/${job.id}`);
-          if (response.data && response.data.length > 0) {
-            return { job, invoice: response.data[0] };
-          }
-          return null;
-        } catch {
-          return null;
-        }
-      });
+      // Fetch recent jobs, then their invoices in batched requests
+      const { items: allJobs } = await fetchRecentJobs({ summary: true });
+      const invoicesByJob = {};
+      for (let i = 0; i < allJobs.length; i += 1000) {
+        const jobIds = allJobs.slice(i, i + 1000).map(job => job.id);
+        const response = await axios.post(`${API}/invoices/batch`, { job_ids: jobIds });
+        Object.assign(invoicesByJob, response.data);
+      }
       
-      const results = await Promise.all(invoicePromises);
-      const validInvoices = results.filter(r => r !== null);
+      const validInvoices = allJobs
+        .filter(job => invoicesByJob[job.id]?.length > 0)
+        .map(job => ({ job, invoice: invoicesByJob[job.id][0] }));
       setInvoices(validInvoices);
     } catch (error) {
       console.error("Failed to fetch invoices:", error);
@@ -184,8 +184,22 @@ const ManagerDashboard = () => {
 
   const fetchJobs = async () => {
     try {
-      const response = await axios.get(`${API}/jobs`);
-      setJobs(response.data);
+      const { items, nextCursor } = await fetchRecentJobs({ summary: true });
+      setJobs(items);
+      setOlderJobsCursor(nextCursor);
+    } catch (error) {
+      toast.error("Failed to fetch jobs");
+    }
+  };
+
+  const fetchOlderJobs = async () => {
+    try {
+      const { items, nextCursor } = await fetchRecentJobs({ summary: true, cursor: olderJobsCursor, maxPages: 1 });
+      setJobs((prev) => {
+        const loaded = new Set(prev.map((job) => job.id));
+        return [...prev, ...items.filter((job) => !loaded.has(job.id))];
+      });
+      setOlderJobsCursor(nextCursor);
     } catch (error) {
       toast.error("Failed to fetch jobs");
     }
@@ -210,13 +224,19 @@ const ManagerDashboard = () => {
         kms: newJob.kms ? parseInt(newJob.kms) : null,
         entry_date: new Date(newJob.entry_date).toISOString(),
         estimated_delivery: new Date(newJob.estimated_delivery).toISOString(),
-        checklist: checklistItems.filter(item => item.item.trim() !== ""),
-        voice_note: voiceNote
+        checklist: checklistItems.filter(item => item.item.trim() !== "")
       };
-      await axios.post(`${API}/jobs`, jobData);
+      const response = await axios.post(`${API}/jobs`, jobData);
+      mergeJobChange(setJobs, response.data);
+      if (voiceNote) {
+        const formData = new FormData();
+        formData.append("voice_note", voiceNote.blob, "voice-note.webm");
+        formData.append("duration_seconds", voiceNote.duration);
+        await axios.post(`${API}/jobs/${response.data.id}/voice-note`, formData);
+        mergeJobChange(setJobs, { id: response.data.id, has_voice_note: true }, { partial: true });
+      }
       toast.success("Job created successfully!");
       setShowNewJobDialog(false);
-      fetchJobs();
       setNewJob({
         customer_name: "",
         contact_number: "",
@@ -258,9 +278,11 @@ const ManagerDashboard = () => {
   };
   
   // Editable checklist functions (for existing jobs)
-  const handleViewChecklist = (job) => {
-    setChecklistJob(job);
-    setEditableChecklist(job.checklist || []);
+  const handleViewChecklist = async (job) => {
+    // The list only carries checklist counts; load the items themselves
+    const { data: fullJob } = await axios.get(`${API}/jobs/${job.id}`);
+    setChecklistJob(fullJob);
+    setEditableChecklist(fullJob.checklist || []);
     setActiveTab("checklist");
   };
   
@@ -284,7 +306,6 @@ const ManagerDashboard = () => {
     try {
       await axios.put(`${API}/jobs/${checklistJob.id}/checklist`, editableChecklist);
       toast.success("Checklist updated successfully!");
-      fetchJobs();
       setActiveTab("jobs");
       setChecklistJob(null);
     } catch (error) {
@@ -298,7 +319,7 @@ const ManagerDashboard = () => {
   const handleSendConfirmation = async (job) => {
     try {
       await axios.post(`${API}/jobs/${job.id}/send-confirmation`);
-      toast.success("WhatsApp confirmation sent (mocked)");
+      toast.success("WhatsApp confirmation queued");
     } catch (error) {
       toast.error("Failed to send confirmation");
     }
@@ -316,11 +337,11 @@ const ManagerDashboard = () => {
         estimated_delivery: new Date(editingJob.estimated_delivery).toISOString()
       };
       
-      await axios.patch(`${API}/jobs/${editingJob.id}`, updateData);
+      const response = await axios.patch(`${API}/jobs/${editingJob.id}`, updateData);
+      mergeJobChange(setJobs, response.data);
       toast.success("Job updated successfully!");
       setShowEditDialog(false);
       setEditingJob(null);
-      fetchJobs();
     } catch (error) {
       toast.error(error.response?.data?.detail || "Failed to update job");
     } finally {
@@ -330,9 +351,9 @@ const ManagerDashboard = () => {
 
   const handleStatusChange = async (jobId, newStatus) => {
     try {
-      await axios.patch(`${API}/jobs/${jobId}`, { status: newStatus });
+      const response = await axios.patch(`${API}/jobs/${jobId}`, { status: newStatus });
+      mergeJobChange(setJobs, response.data);
       toast.success("Status updated successfully!");
-      fetchJobs();
     } catch (error) {
       toast.error("Failed to update status");
     }
@@ -376,8 +397,12 @@ const ManagerDashboard = () => {
 
   const handleExportToSheets = async () => {
     try {
-      await axios.post(`${API}/export/google-sheets`);
-      toast.success("Data exported to Google Sheets (mocked)");
+      const response = await axios.post(`${API}/export/google-sheets`);
+      if (response.data.success) {
+        toast.success(response.data.message);
+      } else {
+        toast.error(response.data.message);
+      }
     } catch (error) {
       toast.error("Failed to export data");
     }
@@ -668,7 +693,7 @@ const ManagerDashboard = () => {
                   <Label className="text-base">Voice Note (Optional)</Label>
                   <VoiceRecorder 
                     onRecordingComplete={setVoiceNote}
-                    existingRecording={voiceNote}
+                    existingRecording={voiceNote?.url}
                   />
                   <p className="text-xs text-gray-400">
                     Record a voice note with additional instructions or details about the work
@@ -828,11 +853,13 @@ const ManagerDashboard = () => {
                           {/* Edit Button - Always visible */}
                           <Button
                             size="sm"
-                            onClick={() => {
+                            onClick={async () => {
+                              // Summary rows lack VIN, odometer, notes etc.; edit the full job
+                              const { data: fullJob } = await axios.get(`${API}/jobs/${job.id}`);
                               setEditingJob({
-                                ...job,
-                                entry_date: new Date(job.entry_date).toISOString().split('T')[0],
-                                estimated_delivery: new Date(job.estimated_delivery).toISOString().split('T')[0]
+                                ...fullJob,
+                                entry_date: new Date(fullJob.entry_date).toISOString().split('T')[0],
+                                estimated_delivery: new Date(fullJob.estimated_delivery).toISOString().split('T')[0]
                               });
                               setShowEditDialog(true);
                             }}
@@ -878,6 +905,13 @@ const ManagerDashboard = () => {
                   No jobs found
                 </div>
               )}
+              {olderJobsCursor && (
+                <div className="text-center py-4">
+                  <Button variant="outline" onClick={fetchOlderJobs}>
+                    Load older jobs
+                  </Button>
+                </div>
+              )}
             </div>
           </CardContent>
         </Card>
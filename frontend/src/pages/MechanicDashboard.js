@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { useAuth } from "@/App";
+import { useAuth, fetchRecentJobs, mediaUrl, mergeJobChange, subscribeToJobEvents } from "@/App";
 import axios from "axios";
 import { toast } from "sonner";
 import { Button } from "@/components/ui/button";
@@ -12,6 +12,32 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } f
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// The audio URL carries a short-lived token, so it is only requested when play is pressed
+const VoiceNotePlayer = ({ jobId }) => {
+  const [src, setSrc] = useState(null);
+  const [loading, setLoading] = useState(false);
+
+  const load = async () => {
+    setLoading(true);
+    try {
+      setSrc(await mediaUrl(`/jobs/${jobId}/voice-note`));
+    } catch (error) {
+      toast.error("Failed to load voice note");
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  if (!src) {
+    return (
+      <Button onClick={load} disabled={loading} size="sm" variant="outline" className="w-full border-purple-800 hover:bg-purple-900/40">
+        {loading ? "Loading..." : "▶ Play voice note"}
+      </Button>
+    );
+  }
+  return <audio src={src} autoPlay controls className="w-full h-10" />;
+};
+
 const MechanicDashboard = () => {
   const { user, logout } = useAuth();
   const [jobs, setJobs] = useState([]);
@@ -24,10 +50,17 @@ const MechanicDashboard = () => {
     fetchJobs();
   }, []);
 
+  // Live updates for jobs assigned to me; reassigned jobs drop out of the list
+  const keepMine = (job) => job.assigned_mechanic_id === user.id;
+  useEffect(() => subscribeToJobEvents(setJobs, {
+    onResync: () => fetchJobs(),
+    keep: keepMine
+  }), [user.id]);
+
   const fetchJobs = async () => {
     try {
-      const response = await axios.get(`${API}/jobs`);
-      setJobs(response.data);
+      const { items } = await fetchRecentJobs();
+      setJobs(items);
     } catch (error) {
       toast.error("Failed to fetch jobs");
     }
@@ -35,9 +68,9 @@ const MechanicDashboard = () => {
 
   const handleStatusUpdate = async (jobId, newStatus) => {
     try {
-      await axios.patch(`${API}/jobs/${jobId}`, { status: newStatus });
+      const response = await axios.patch(`${API}/jobs/${jobId}`, { status: newStatus });
+      mergeJobChange(setJobs, response.data, { keep: keepMine });
       toast.success(`Job marked as ${newStatus}`);
-      fetchJobs();
     } catch (error) {
       toast.error("Failed to update status");
     }
@@ -45,12 +78,12 @@ const MechanicDashboard = () => {
 
   const handleConfirmComplete = async (jobId) => {
     try {
-      await axios.patch(`${API}/jobs/${jobId}`, { 
+      const response = await axios.patch(`${API}/jobs/${jobId}`, { 
         confirm_complete: true,
         status: "Work complete"
       });
+      mergeJobChange(setJobs, response.data, { keep: keepMine });
       toast.success("Job marked as complete!");
-      fetchJobs();
     } catch (error) {
       toast.error("Failed to confirm completion");
     }
@@ -62,11 +95,11 @@ const MechanicDashboard = () => {
       return;
     }
     try {
-      await axios.patch(`${API}/jobs/${jobId}`, { notes });
+      const response = await axios.patch(`${API}/jobs/${jobId}`, { notes });
+      mergeJobChange(setJobs, response.data, { keep: keepMine });
       toast.success("Notes added successfully");
       setNotes("");
       setSelectedJob(null);
-      fetchJobs();
     } catch (error) {
       toast.error("Failed to add notes");
     }
@@ -74,9 +107,9 @@ const MechanicDashboard = () => {
 
   const handleChecklistUpdate = async (jobId, checklist) => {
     try {
-      await axios.put(`${API}/jobs/${jobId}/checklist`, checklist);
+      const response = await axios.put(`${API}/jobs/${jobId}/checklist`, checklist);
+      mergeJobChange(setJobs, { id: jobId, checklist: response.data.checklist }, { partial: true });
       toast.success("Checklist updated!");
-      fetchJobs();
     } catch (error) {
       toast.error("Failed to update checklist");
     }
@@ -224,7 +257,7 @@ const MechanicDashboard = () => {
                   {job.voice_note && (
                     <div className="bg-purple-900/20 border border-purple-800 p-3 rounded-lg">
                       <div className="text-xs text-purple-400 mb-2">🎤 Voice Note from Manager</div>
-                      <audio src={job.voice_note} controls className="w-full h-10" />
+                      <VoiceNotePlayer jobId={job.id} />
                     </div>
                   )}
 
@@ -0,0 +1,99 @@
+"""Shared fixtures: the backend module, imported against a throwaway test database.
+
+Tests that touch Mongo need a reachable server at TEST_MONGO_URL (default
+mongodb://127.0.0.1:27017) and are skipped without one.
+"""
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from tests.factories import make_user
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://127.0.0.1:27017")
+TEST_DB_NAME = os.environ.get("TEST_DB_NAME", "icd_tuning_test")
+
+# server.py reads these at import; set them first so backend/.env can't point tests at real data
+os.environ["MONGO_URL"] = TEST_MONGO_URL
+os.environ["DB_NAME"] = TEST_DB_NAME
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def mongo_available() -> bool:
+    try:
+        with MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500) as probe:
+            probe.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+MONGO_AVAILABLE = mongo_available()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server():
+    import server as module
+    return module
+
+
+@pytest.fixture
+async def db(server):
+    if not MONGO_AVAILABLE:
+        pytest.skip(f"no MongoDB at {TEST_MONGO_URL}")
+    await server.client.drop_database(TEST_DB_NAME)
+    yield server.db
+    await server.client.drop_database(TEST_DB_NAME)
+
+
+@pytest.fixture
+async def api(server):
+    """HTTP client for the app, without running its startup hooks"""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def manager(server, db):
+    user = make_user("Manager", "Meera")
+    await db.users.insert_one(dict(user))
+    return user
+
+
+@pytest.fixture
+async def mechanic(server, db):
+    user = make_user("Mechanic", "Ravi")
+    await db.users.insert_one(dict(user))
+    return user
+
+
+@pytest.fixture
+def pdf_cache(server, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "PDF_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(server, "pdf_cache_bytes", None)
+    return tmp_path
+
+
+@pytest.fixture
+def renders(server, monkeypatch):
+    """Count renders; they run on the loop's thread pool so the fake needn't be picklable"""
+    calls = []
+
+    def render(invoice, job):
+        calls.append(invoice["id"])
+        return b"%PDF " + invoice["id"].encode()
+
+    monkeypatch.setattr(server, "render_invoice_pdf", render)
+    monkeypatch.setattr(server, "get_pdf_executor", lambda: None)
+    return calls
@@ -0,0 +1,81 @@
+"""Documents shaped the way the API stores them, for seeding the test database directly."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+def millis(moment: datetime) -> datetime:
+    # BSON keeps milliseconds, so build timestamps that survive the round trip unchanged
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def make_user(role: str = "Mechanic", full_name: str = "Ravi") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "username": f"{full_name.lower()}-{uuid.uuid4().hex[:6]}",
+        "role": role,
+        "full_name": full_name,
+        "password_hash": "unused",
+    }
+
+
+def make_job(server, mechanic: dict, created_at: datetime = None, **fields) -> dict:
+    created_at = millis(created_at or datetime.now(timezone.utc))
+    job = {
+        "id": str(uuid.uuid4()),
+        "customer_name": "Asha",
+        "contact_number": "9800000000",
+        "car_brand": "BMW",
+        "car_model": "M340i",
+        "year": 2022,
+        "registration_number": "MH12AB1234",
+        "vin": "WBA00000000000000",
+        "kms": 12000,
+        "entry_date": created_at,
+        "estimated_delivery": created_at + timedelta(days=2),
+        "work_description": "Stage 1 tune",
+        "voice_note": None,
+        "assigned_mechanic_id": mechanic["id"],
+        "assigned_mechanic_name": mechanic["full_name"],
+        "assigned_by_manager_id": "manager-1",
+        "assigned_by_manager_name": "Manager",
+        "status": "Car Received",
+        "photos": [],
+        "notes": None,
+        "checklist": [],
+        "completion_date": None,
+        "confirm_complete": False,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "version": 1,
+        **fields,
+    }
+    job.update(server.checklist_counts(job["checklist"]))
+    job.update(server.job_search_keys(job))
+    return job
+
+
+def make_invoice(job: dict, invoice_date: datetime = None, **fields) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "invoice_number": f"ICD-2025-{uuid.uuid4().hex[:4]}",
+        "job_id": job["id"],
+        "invoice_date": millis(invoice_date or datetime.now(timezone.utc)),
+        "labour_charges": 1000.0,
+        "parts": [],
+        "parts_charges": 0.0,
+        "tuning_charges": 0.0,
+        "others_charges": 0.0,
+        "subtotal": 1000.0,
+        "gst_amount": 180.0,
+        "grand_total": 1180.0,
+        "sent_to_customer": False,
+        "sent_to_accountant": False,
+        "version": 1,
+        "assigned_mechanic_id": job["assigned_mechanic_id"],
+        "assigned_mechanic_name": job["assigned_mechanic_name"],
+        **fields,
+    }
+
+
+def auth(server, user: dict) -> dict:
+    return {"Authorization": f"Bearer {server.create_access_token({'sub': user['id']})}"}
@@ -0,0 +1,61 @@
+"""In-memory stand-in for the gspread calls the Google Sheets sync makes"""
+import re
+
+
+class FakeWorksheet:
+    def __init__(self, title):
+        self.title = title
+        self.rows = []
+
+    def col_values(self, col):
+        values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        # gspread drops trailing empty cells
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def clear(self):
+        self.rows = []
+
+    def update(self, range_name, values):
+        start_row = int(re.sub(r"[A-Z]", "", range_name.split(":")[0]))
+        for offset, row in enumerate(values):
+            index = start_row - 1 + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            self.rows[index] = list(row)
+
+    def batch_update(self, data):
+        for item in data:
+            self.update(item["range"], item["values"])
+
+    def append_rows(self, values):
+        self.rows.extend(list(row) for row in values)
+
+    def format(self, range_name, cell_format):
+        pass
+
+    def columns_auto_resize(self, start, end):
+        pass
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.worksheets = {}
+
+    def worksheet(self, title):
+        if title not in self.worksheets:
+            raise KeyError(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.worksheets[title] = FakeWorksheet(title)
+        return self.worksheets[title]
+
+
+class FakeSheetsClient:
+    def __init__(self):
+        self.spreadsheets = {}
+
+    def open_by_key(self, key):
+        return self.spreadsheets.setdefault(key, FakeSpreadsheet())
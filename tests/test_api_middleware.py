@@ -0,0 +1,127 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+BIG = {"items": ["x" * 40] * 100}
+
+
+@pytest.fixture
+def client(server):
+    app = FastAPI()
+
+    @app.get("/api/big")
+    async def big():
+        return BIG
+
+    @app.get("/api/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/api/tagged")
+    async def tagged(response: Response):
+        response.headers["ETag"] = '"v1"'
+        return BIG
+
+    @app.get("/api/not-modified")
+    async def not_modified():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    @app.get("/api/cached")
+    async def cached():
+        return PlainTextResponse("hello", headers={"Cache-Control": "private, max-age=60", "Vary": "Origin"})
+
+    @app.get("/api/pdf")
+    async def pdf():
+        return Response(b"%PDF" * 1000, media_type="application/pdf")
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            yield b"data: 1\n\n" * 200
+            yield b"data: 2\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return BIG
+
+    app.add_middleware(server.ApiResponseMiddleware)
+    return TestClient(app)
+
+
+def get(client, path, encoding="gzip"):
+    return client.get(path, headers={"Accept-Encoding": encoding})
+
+
+def test_large_json_is_gzipped_with_vary(client):
+    response = get(client, "/api/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == BIG
+
+
+def test_brotli_preferred_when_available(server, client):
+    if server.brotli is None:
+        pytest.skip("brotli not installed")
+    response = get(client, "/api/big", "gzip, br")
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == BIG
+
+
+@pytest.mark.parametrize("path, encoding", [
+    ("/api/small", "gzip"),  # below COMPRESSION_MIN_BYTES
+    ("/api/big", "identity"),  # client can't decode anything we offer
+    ("/api/big", "gzip;q=0"),
+])
+def test_uncompressed_json_still_varies(client, path, encoding):
+    response = get(client, path, encoding)
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_not_modified_varies(client):
+    response = get(client, "/api/not-modified")
+    assert response.status_code == 304
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_existing_vary_and_cache_control_are_kept(client):
+    response = get(client, "/api/cached")
+    assert response.headers["cache-control"] == "private, max-age=60"
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+
+
+def test_no_cache_headers_added_by_default(client):
+    response = get(client, "/api/small")
+    assert "no-cache" in response.headers["cache-control"]
+
+
+def test_strong_etag_weakened_when_compressed(client):
+    assert get(client, "/api/tagged").headers["etag"] == 'W/"v1"'
+    assert get(client, "/api/tagged", "identity").headers["etag"] == '"v1"'
+
+
+def test_binary_and_streaming_bodies_pass_through(client):
+    pdf = get(client, "/api/pdf")
+    assert "content-encoding" not in pdf.headers
+    assert "vary" not in pdf.headers
+
+    stream = get(client, "/api/stream")
+    assert "content-encoding" not in stream.headers
+    assert stream.content.endswith(b"data: 2\n\n")
+
+
+def test_non_api_paths_untouched(client):
+    response = get(client, "/health")
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert "cache-control" not in response.headers
+
+
+def test_gzip_body_round_trips(server):
+    body = b'{"a": 1}' * 500
+    assert gzip.decompress(server.compress_body(body, "gzip")) == body
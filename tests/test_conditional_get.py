@@ -0,0 +1,75 @@
+import pytest
+
+from tests.factories import auth, make_invoice, make_job
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def job(server, db, mechanic):
+    # Long enough that the middleware compresses the body
+    job = make_job(server, mechanic, work_description="Stage 2 tune, intake and downpipe. " * 60)
+    await db.jobs.insert_one(dict(job))
+    return job
+
+
+def headers_for(server, user, **extra) -> dict:
+    return {**auth(server, user), "Accept-Encoding": "gzip", **extra}
+
+
+async def test_compressed_job_revalidates_with_its_weak_etag(server, db, api, manager, job):
+    url = f"/api/jobs/{job['id']}"
+    first = await api.get(url, headers=headers_for(server, manager))
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == f'W/"{job["id"]}-v1"'
+
+    for tag in (first.headers["etag"], f'"{job["id"]}-v1"', f'"other", {first.headers["etag"]}'):
+        revalidated = await api.get(url, headers=headers_for(server, manager, **{"If-None-Match": tag}))
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["vary"] == "Accept-Encoding"
+        assert revalidated.headers["etag"] == f'"{job["id"]}-v1"'
+
+    await api.patch(url, json={"notes": "Changed"}, headers=auth(server, manager))
+    changed = await api.get(url, headers=headers_for(server, manager, **{"If-None-Match": first.headers["etag"]}))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] == f'W/"{job["id"]}-v2"'
+
+
+async def test_job_list_revalidates_until_a_job_changes(server, db, api, manager, mechanic, job):
+    first = await api.get("/api/jobs", headers=headers_for(server, manager))
+    assert first.headers["etag"].startswith("W/")
+    assert "last-modified" in first.headers
+
+    etag = {"If-None-Match": first.headers["etag"]}
+    assert (await api.get("/api/jobs", headers=headers_for(server, manager, **etag))).status_code == 304
+
+    await db.jobs.insert_one(make_job(server, mechanic))
+    assert (await api.get("/api/jobs", headers=headers_for(server, manager, **etag))).status_code == 200
+
+
+async def test_created_job_carries_version_one_and_its_etag(server, db, api, manager, mechanic):
+    payload = {
+        key: value.isoformat() if hasattr(value, "isoformat") else value
+        for key, value in make_job(server, mechanic).items()
+        if key in server.JobCreate.model_fields
+    }
+    response = await api.post("/api/jobs", json=payload, headers=auth(server, manager))
+    created = response.json()
+    assert created["version"] == 1
+    assert response.headers["etag"] == f'"{created["id"]}-v1"'
+
+    stored = await api.get(f"/api/jobs/{created['id']}", headers=auth(server, manager))
+    assert stored.headers["etag"] == response.headers["etag"]
+
+
+async def test_job_invoices_revalidate(server, db, api, manager, job):
+    await db.invoices.insert_one(make_invoice(job))
+    url = f"/api/invoices/job/{job['id']}"
+    first = await api.get(url, headers=auth(server, manager))
+    assert len(first.json()) == 1
+
+    etag = {"If-None-Match": first.headers["etag"]}
+    assert (await api.get(url, headers={**auth(server, manager), **etag})).status_code == 304
+    await db.invoices.insert_one(make_invoice(job))
+    assert (await api.get(url, headers={**auth(server, manager), **etag})).status_code == 200
@@ -0,0 +1,63 @@
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+
+import pytest
+
+from tests.factories import auth, make_invoice, make_job
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("moment, expected", [
+    (datetime(1975, 3, 1, tzinfo=timezone.utc), (1980, 1, 1, 0, 0, 0)),
+    (datetime(2025, 6, 10, 12, 30, 15, tzinfo=timezone.utc), (2025, 6, 10, 12, 30, 15)),
+    (datetime(2200, 1, 1, tzinfo=timezone.utc), (2107, 12, 31, 23, 59, 58)),
+])
+def test_zip_date_time_is_clamped_to_the_zip_range(server, moment, expected):
+    assert server.zip_date_time(moment) == expected
+    zipfile.ZipInfo("x.pdf", date_time=server.zip_date_time(moment))
+
+
+async def export(server, api, manager) -> zipfile.ZipFile:
+    response = await api.get(
+        "/api/invoices/export", params={"from_date": "1970-01-01", "to_date": "2030-12-31"},
+        headers=auth(server, manager)
+    )
+    assert response.status_code == 200
+    return zipfile.ZipFile(io.BytesIO(response.content))
+
+
+async def test_export_lists_invoices_without_a_job(server, db, api, manager, mechanic, pdf_cache, renders):
+    job = make_job(server, mechanic)
+    await db.jobs.insert_one(dict(job))
+    kept = make_invoice(job, datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc))
+    orphan = make_invoice(
+        make_job(server, mechanic), datetime(2025, 6, 11, 12, 0, tzinfo=timezone.utc), invoice_number="ICD-ORPHAN"
+    )
+    await db.invoices.insert_many([dict(kept), dict(orphan)])
+
+    archive = await export(server, api, manager)
+    assert archive.namelist() == [server.export_entry_name(kept["invoice_number"]), server.EXPORT_SKIPPED_ENTRY]
+    assert json.loads(archive.read(server.EXPORT_SKIPPED_ENTRY)) == [{
+        "id": orphan["id"], "invoice_number": "ICD-ORPHAN", "job_id": orphan["job_id"], "reason": "Job not found"
+    }]
+    assert renders == [kept["id"]]
+
+    # The single-invoice routes refuse the orphan rather than failing on it
+    assert (await api.get(f"/api/invoices/{orphan['id']}/pdf", headers=auth(server, manager))).status_code == 404
+
+
+async def test_export_has_no_skipped_entry_when_complete(server, db, api, manager, mechanic, pdf_cache, renders):
+    job = make_job(server, mechanic)
+    await db.jobs.insert_one(dict(job))
+    # Backdated before the earliest time a ZIP entry can carry
+    invoice = make_invoice(job, datetime(1975, 3, 1, tzinfo=timezone.utc))
+    await db.invoices.insert_one(dict(invoice))
+
+    archive = await export(server, api, manager)
+    [entry] = archive.infolist()
+    assert entry.filename == server.export_entry_name(invoice["invoice_number"])
+    assert entry.date_time == (1980, 1, 1, 0, 0, 0)
+    assert archive.read(entry) == b"%PDF " + invoice["id"].encode()
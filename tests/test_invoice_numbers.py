@@ -0,0 +1,86 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def job(server, db):
+    job = {
+        "id": str(uuid.uuid4()),
+        "customer_name": "Asha",
+        "assigned_mechanic_id": "mechanic-1",
+        "assigned_mechanic_name": "Ravi",
+    }
+    await db.jobs.insert_one(dict(job))
+    return job
+
+
+@pytest.fixture
+def manager(server):
+    return server.User(id="manager-1", username="manager", role="Manager", full_name="Manager")
+
+
+async def create_invoice(server, manager, job, **fields):
+    data = server.InvoiceCreate(
+        job_id=job["id"], labour_charges=1000, tuning_charges=0, others_charges=0,
+        invoice_date="2025-06-01T10:00:00+00:00", **fields
+    )
+    return await server.create_invoice(data, current_user=manager)
+
+
+async def test_sequence_seeds_after_the_highest_existing_number(server, db):
+    await db.invoices.insert_many([
+        {"id": "a", "invoice_number": "ICD-2025-0007"},
+        {"id": "b", "invoice_number": "ICD-2025-0003"},
+        {"id": "c", "invoice_number": "ICD-2025-SPECIAL"},
+        {"id": "d", "invoice_number": "ICD-2024-0042"},
+    ])
+    june = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    assert await server.next_invoice_number(june) == "ICD-2025-0008"
+    assert await server.next_invoice_number(june) == "ICD-2025-0009"
+    assert await server.next_invoice_number(datetime(2025, 1, 15, tzinfo=timezone.utc)) == "ICD-2024-0043"
+
+
+async def test_financial_year_follows_the_report_timezone(server, db, monkeypatch):
+    monkeypatch.setattr(server, "REPORT_TIMEZONE", "Asia/Kolkata")
+    # 31 March 19:00 UTC is 00:30 on 1 April in India: the new financial year
+    moment = datetime(2026, 3, 31, 19, 0, tzinfo=timezone.utc)
+    assert await server.next_invoice_number(moment) == "ICD-2026-0001"
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+async def test_custom_number_collisions(server, db, job, manager, monkeypatch, with_index):
+    if with_index:
+        await server.ensure_indexes()
+        assert server.invoice_number_index_ready
+    else:
+        monkeypatch.setattr(server, "invoice_number_index_ready", False)
+
+    first = await create_invoice(server, manager, job)
+    assert first.invoice_number == "ICD-2025-0001"
+
+    # A custom number that the sequence will reach next is skipped over, not duplicated
+    await create_invoice(server, manager, job, invoice_number="ICD-2025-0002")
+    third = await create_invoice(server, manager, job)
+    assert third.invoice_number == "ICD-2025-0003"
+
+    with pytest.raises(HTTPException) as excinfo:
+        await create_invoice(server, manager, job, invoice_number="ICD-2025-0002")
+    assert excinfo.value.status_code == 400
+    assert await db.invoices.count_documents({"invoice_number": "ICD-2025-0002"}) == 1
+
+
+async def test_ensure_indexes_reports_duplicates_blocking_a_unique_index(server, db):
+    await db.invoices.insert_many([
+        {"id": "a", "invoice_number": "ICD-2025-0001"},
+        {"id": "b", "invoice_number": "ICD-2025-0001"},
+    ])
+    results = await server.ensure_indexes()
+    entry = next(e for e in results if e["collection"] == "invoices" and e["keys"] == [("invoice_number", 1)])
+    assert not entry["verified"]
+    assert entry["duplicates"] == [{"invoice_number": "ICD-2025-0001", "count": 2}]
+    assert not server.invoice_number_index_ready
@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+import pytest
+
+from tests.factories import auth, make_invoice, make_job
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def documents(server):
+    job = make_job(server, {"id": "mechanic-1", "full_name": "Ravi"})
+    return make_invoice(job), job
+
+
+async def test_miss_renders_once_then_hits(server, pdf_cache, renders, documents):
+    invoice, job = documents
+    first = await asyncio.gather(*(server.get_cached_invoice_pdf(invoice, job) for _ in range(3)))
+    assert renders == [invoice["id"]]  # concurrent misses share a single render
+    assert await server.get_cached_invoice_pdf(invoice, job) == first[0]
+    assert renders == [invoice["id"]]
+    assert (pdf_cache / f"{server.invoice_pdf_key(invoice, job)}.pdf").read_bytes() == first[0]
+
+    # Anything drawn on the PDF is part of the key
+    assert await server.get_cached_invoice_pdf({**invoice, "grand_total": 99.0}, job)
+    assert len(renders) == 2
+
+
+async def test_file_evicted_mid_hit_falls_back_to_render(server, pdf_cache, renders, documents, monkeypatch):
+    invoice, job = documents
+    pdf_bytes = await server.get_cached_invoice_pdf(invoice, job)
+    real_utime = os.utime
+
+    def evicted_meanwhile(path, *args, **kwargs):
+        os.unlink(path)
+        return real_utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(server.os, "utime", evicted_meanwhile)
+    assert await server.get_cached_invoice_pdf(invoice, job) == pdf_bytes
+    assert len(renders) == 2
+
+
+def test_eviction_drops_least_recently_used(server, pdf_cache, monkeypatch):
+    monkeypatch.setattr(server, "PDF_CACHE_MAX_BYTES", 350)
+    for name in "abc":
+        server.write_pdf_cache(pdf_cache / f"{name}.pdf", b"x" * 100)
+    for name, mtime in (("a", 1000), ("b", 3000), ("c", 2000)):
+        os.utime(pdf_cache / f"{name}.pdf", (mtime, mtime))
+
+    # Over the limit: trim to the low-water mark, oldest mtime first
+    server.write_pdf_cache(pdf_cache / "d.pdf", b"x" * 100)
+    assert sorted(path.stem for path in pdf_cache.glob("*.pdf")) == ["b", "d"]
+    assert server.pdf_cache_bytes == 200
+
+
+async def test_matching_etag_is_answered_without_rendering(server, db, api, manager, mechanic, pdf_cache, renders):
+    job = make_job(server, mechanic)
+    invoice = make_invoice(job)
+    await db.jobs.insert_one(dict(job))
+    await db.invoices.insert_one(dict(invoice))
+    url = f"/api/invoices/{invoice['id']}/pdf"
+
+    response = await api.get(url, headers=auth(server, manager))
+    assert response.status_code == 200
+    assert response.content == b"%PDF " + invoice["id"].encode()
+
+    for path in pdf_cache.glob("*.pdf"):
+        path.unlink()
+    revalidated = await api.get(url, headers={**auth(server, manager), "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert renders == [invoice["id"]]
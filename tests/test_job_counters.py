@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.factories import auth, make_job, make_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def aggregated_counts(db) -> dict:
+    """mechanic -> status -> jobs, straight from the jobs collection"""
+    counts = {}
+    pipeline = [{"$group": {"_id": {"mechanic": "$assigned_mechanic_id", "status": "$status"}, "n": {"$sum": 1}}}]
+    async for row in db.jobs.aggregate(pipeline):
+        counts.setdefault(row["_id"]["mechanic"], {})[row["_id"]["status"]] = row["n"]
+    return counts
+
+
+async def stored_counts(db) -> dict:
+    counts = {}
+    async for doc in db.job_counters.find({}):
+        by_status = {status: n for status, n in doc["by_status"].items() if n}
+        assert doc["total"] == sum(by_status.values())
+        if by_status:
+            counts[doc["_id"]] = by_status
+    return counts
+
+
+def job_payload(mechanic: dict) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "customer_name": "Asha",
+        "contact_number": "9800000000",
+        "car_brand": "BMW",
+        "car_model": "M340i",
+        "year": 2022,
+        "registration_number": "MH12AB1234",
+        "vin": "WBA00000000000000",
+        "kms": 12000,
+        "entry_date": now.isoformat(),
+        "work_description": "Stage 1 tune",
+        "estimated_delivery": (now + timedelta(days=2)).isoformat(),
+        "assigned_mechanic_id": mechanic["id"],
+    }
+
+
+async def test_counters_follow_creates_status_changes_and_reassignments(server, db, api, manager, mechanic):
+    other = make_user("Mechanic", "Kiran")
+    await db.users.insert_one(dict(other))
+    headers = auth(server, manager)
+
+    jobs = []
+    for _ in range(3):
+        response = await api.post("/api/jobs", json=job_payload(mechanic), headers=headers)
+        assert response.status_code == 200
+        jobs.append(response.json())
+    assert await stored_counts(db) == await aggregated_counts(db)
+
+    edits = [
+        (jobs[0], {"status": "Work in progress"}, headers),
+        (jobs[1], {"assigned_mechanic_id": other["id"]}, headers),
+        (jobs[2], {"status": "Work complete", "assigned_mechanic_id": other["id"]}, headers),
+        (jobs[0], {"status": "Work complete"}, auth(server, mechanic)),
+        (jobs[0], {"status": "Work complete"}, headers),  # no-op transition
+    ]
+    for job, change, who in edits:
+        response = await api.patch(f"/api/jobs/{job['id']}", json=change, headers=who)
+        assert response.status_code == 200
+        assert await stored_counts(db) == await aggregated_counts(db)
+
+    stats = (await api.get("/api/stats", headers=headers)).json()
+    assert stats["by_status"] == {"Car Received": 1, "Work complete": 2}
+    assert (stats["active"], stats["completed"]) == (1, 2)
+
+
+async def test_concurrent_seeding_runs_one_rebuild(server, db, mechanic):
+    await db.jobs.insert_many([make_job(server, mechanic) for _ in range(3)])
+
+    seeded = await asyncio.gather(*(
+        server.seed_if_empty(db.job_counters, server.rebuild_job_counters) for _ in range(4)
+    ))
+    assert seeded.count(True) == 1
+    assert await stored_counts(db) == {mechanic["id"]: {"Car Received": 3}}
+    assert await db.locks.count_documents({}) == 0
+
+    # A populated collection is left alone
+    assert not await server.seed_if_empty(db.job_counters, server.rebuild_job_counters)
+
+
+async def test_rebuild_overwrites_in_place(server, db, mechanic):
+    await db.jobs.insert_many([make_job(server, mechanic) for _ in range(2)])
+    await db.job_counters.insert_one({"_id": "gone", "total": 4, "by_status": {"Car Received": 4}})
+
+    await asyncio.gather(server.rebuild_job_counters(), server.rebuild_job_counters())
+    assert await stored_counts(db) == {mechanic["id"]: {"Car Received": 2}}
@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.factories import auth, make_job, make_user
+
+pytestmark = pytest.mark.anyio
+
+NOON = datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc)
+
+
+async def list_all(server, api, user, url, limit, **params) -> list:
+    """Follow next_cursor to the end, returning job IDs in page order"""
+    ids = []
+    cursor = None
+    while True:
+        query = {"limit": limit, **params, **({"cursor": cursor} if cursor else {})}
+        response = await api.get(url, params=query, headers=auth(server, user))
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= limit
+        ids += [job["id"] for job in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("url", ["/api/jobs", "/api/jobs/summary"])
+async def test_pages_through_shared_created_at_without_gaps(server, db, api, manager, mechanic, url):
+    # Seven jobs created in the same millisecond force the id tiebreak across page boundaries
+    jobs = [make_job(server, mechanic, NOON) for _ in range(7)]
+    jobs += [make_job(server, mechanic, NOON + timedelta(minutes=m)) for m in (-5, 5, 10)]
+    await db.jobs.insert_many([dict(job) for job in jobs])
+
+    ids = await list_all(server, api, manager, url, limit=3)
+    expected = sorted(jobs, key=lambda job: (job["created_at"], job["id"]), reverse=True)
+    assert ids == [job["id"] for job in expected]
+
+
+async def test_status_filter(server, db, api, manager, mechanic):
+    done = make_job(server, mechanic, status="Work complete")
+    await db.jobs.insert_many([done, make_job(server, mechanic)])
+    assert await list_all(server, api, manager, "/api/jobs", 5, status="Work complete") == [done["id"]]
+
+
+async def test_mechanic_filter_and_scope(server, db, api, manager, mechanic):
+    other = make_user("Mechanic", "Kiran")
+    await db.users.insert_one(dict(other))
+    own, theirs = make_job(server, mechanic), make_job(server, other)
+    await db.jobs.insert_many([own, theirs])
+
+    assert await list_all(server, api, manager, "/api/jobs", 5, mechanic_id=other["id"]) == [theirs["id"]]
+    # A mechanic only ever sees their own jobs, whatever they ask for
+    assert await list_all(server, api, mechanic, "/api/jobs", 5, mechanic_id=other["id"]) == [own["id"]]
+
+
+async def test_created_range_includes_the_whole_end_day(server, db, api, manager, mechanic):
+    jobs = {
+        name: make_job(server, mechanic, moment)
+        for name, moment in {
+            "before": datetime(2025, 6, 9, 23, 59, tzinfo=timezone.utc),
+            "first": datetime(2025, 6, 10, 0, 0, tzinfo=timezone.utc),
+            "last": datetime(2025, 6, 11, 23, 59, tzinfo=timezone.utc),
+            "after": datetime(2025, 6, 12, 0, 0, tzinfo=timezone.utc),
+        }.items()
+    }
+    await db.jobs.insert_many([dict(job) for job in jobs.values()])
+
+    ids = await list_all(server, api, manager, "/api/jobs", 5, created_from="2025-06-10", created_to="2025-06-11")
+    assert ids == [jobs["last"]["id"], jobs["first"]["id"]]
+    # A full timestamp is an exact, exclusive bound
+    ids = await list_all(
+        server, api, manager, "/api/jobs", 5, created_from="2025-06-10", created_to="2025-06-11T23:59:00+00:00"
+    )
+    assert ids == [jobs["first"]["id"]]
+
+
+def encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    "é",
+    encode({"created_at": "2025-06-10"}),
+    encode(["2025-06-10"]),
+    encode(["not a date", "id"]),
+    encode([20250610, "id"]),
+    encode(["2025-06-10T12:00:00+00:00", {"$gt": ""}]),
+])
+async def test_malformed_cursor_is_400(server, db, api, manager, cursor):
+    response = await api.get("/api/jobs", params={"cursor": cursor}, headers=auth(server, manager))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_bad_date_filter_is_400(server, db, api, manager):
+    response = await api.get("/api/jobs", params={"created_from": "last week"}, headers=auth(server, manager))
+    assert response.status_code == 400
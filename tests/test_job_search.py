@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.factories import auth, make_job
+
+pytestmark = pytest.mark.anyio
+
+NOON = datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("mh 12-ab 1234", "MH12AB1234"),
+    ("wba.3a5c", "WBA3A5C"),
+    ("KA-01", "KA01"),
+])
+def test_normalize_identifier(server, raw, expected):
+    assert server.normalize_identifier(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+91 98765 43210", "9876543210"),
+    ("098765-43210", "9876543210"),
+    ("98765", "98765"),
+])
+def test_normalize_phone(server, raw, expected):
+    assert server.normalize_phone(raw) == expected
+
+
+@pytest.fixture
+async def search(server, db, api, manager):
+    await server.ensure_indexes()  # the text index backs name and description matches
+
+    async def run(q, **params):
+        response = await api.get("/api/jobs/search", params={"q": q, **params}, headers=auth(server, manager))
+        assert response.status_code == 200
+        return [job["id"] for job in response.json()["items"]]
+    return run
+
+
+async def test_newest_prefix_matches_survive_the_limit(server, db, mechanic, search):
+    # The alphabetically first keys belong to the oldest jobs
+    jobs = [
+        make_job(server, mechanic, NOON + timedelta(days=day), registration_number=f"MH12A{letter}0001")
+        for day, letter in enumerate("ABCD")
+    ]
+    await db.jobs.insert_many([dict(job) for job in jobs])
+    assert await search("MH12A", limit=2) == [jobs[3]["id"], jobs[2]["id"]]
+
+
+async def test_exact_identifier_ranks_first_even_when_oldest(server, db, mechanic, search):
+    exact = make_job(server, mechanic, NOON - timedelta(days=30), registration_number="MH12AB12")
+    newer = [
+        make_job(server, mechanic, NOON + timedelta(days=day), registration_number=f"MH12AB12{day}")
+        for day in range(3)
+    ]
+    await db.jobs.insert_many([dict(job) for job in [exact, *newer]])
+    assert await search("mh 12 ab 12", limit=3) == [exact["id"], newer[2]["id"], newer[1]["id"]]
+
+
+async def test_phone_and_vin_prefixes(server, db, mechanic, search):
+    job = make_job(server, mechanic, contact_number="+91 98765 43210", vin="WBA3A5C50DF000001")
+    await db.jobs.insert_many([dict(job), make_job(server, mechanic, registration_number="KA01AA0001")])
+    assert await search("98765 4") == [job["id"]]
+    assert await search("wba3a5") == [job["id"]]
+
+
+async def test_text_matches_follow_identifier_matches(server, db, mechanic, search):
+    by_name = make_job(server, mechanic, NOON, customer_name="Vikram Rao", registration_number="KA01AA0001")
+    by_plate = make_job(server, mechanic, NOON - timedelta(days=1), registration_number="VIKRAM1")
+    await db.jobs.insert_many([dict(by_name), dict(by_plate)])
+    assert await search("vikram") == [by_plate["id"], by_name["id"]]
@@ -0,0 +1,83 @@
+import pytest
+
+from tests.factories import auth, make_job, make_user
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def job(server, db, mechanic):
+    job = make_job(server, mechanic, version=3)
+    await db.jobs.insert_one(dict(job))
+    return job
+
+
+async def patch(server, api, job, user, change, if_match=None):
+    headers = auth(server, user)
+    if if_match is not None:
+        headers["If-Match"] = if_match
+    return await api.patch(f"/api/jobs/{job['id']}", json=change, headers=headers)
+
+
+async def test_current_if_match_applies_and_bumps_version(server, db, api, manager, job):
+    response = await patch(server, api, job, manager, {"notes": "Check boost leak"}, f'"{job["id"]}-v3"')
+    assert response.status_code == 200
+    assert response.json()["version"] == 4
+    assert response.headers["etag"] == f'"{job["id"]}-v4"'
+
+
+@pytest.mark.parametrize("change", [{"notes": "Check boost leak"}, {}])
+@pytest.mark.parametrize("tag", ['"{id}-v2"', 'W/"{id}-v2"', '"other-job-v3"'])
+async def test_stale_or_foreign_if_match_is_412(server, db, api, manager, job, change, tag):
+    response = await patch(server, api, job, manager, change, tag.format(id=job["id"]))
+    assert response.status_code == 412
+    stored = await db.jobs.find_one({"id": job["id"]})
+    assert (stored["version"], stored["notes"]) == (3, None)
+
+
+async def test_wildcard_if_match_skips_the_version_check(server, db, api, manager, job):
+    response = await patch(server, api, job, manager, {"notes": "Any version"}, "*")
+    assert response.status_code == 200
+    assert response.json()["version"] == 4
+
+
+async def test_legacy_job_without_version_reads_as_v0(server, db, api, manager, mechanic):
+    legacy = make_job(server, mechanic)
+    del legacy["version"]
+    await db.jobs.insert_one(dict(legacy))
+
+    response = await patch(server, api, legacy, manager, {"notes": "First edit"}, f'"{legacy["id"]}-v0"')
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+
+    stale = await patch(server, api, legacy, manager, {"notes": "Second edit"}, f'"{legacy["id"]}-v0"')
+    assert stale.status_code == 412
+
+
+@pytest.mark.parametrize("if_match", [None, '"{id}-v3"', '"{id}-v1"'])
+async def test_mechanic_editing_another_mechanics_job_is_403(server, db, api, job, if_match):
+    intruder = make_user("Mechanic", "Kiran")
+    await db.users.insert_one(dict(intruder))
+    tag = if_match.format(id=job["id"]) if if_match else None
+    response = await patch(server, api, job, intruder, {"status": "Work complete"}, tag)
+    assert response.status_code == 403
+    assert (await db.jobs.find_one({"id": job["id"]}))["status"] == "Car Received"
+
+
+async def test_missing_job_is_404(server, db, api, manager, job):
+    response = await patch(server, api, {"id": "missing"}, manager, {"notes": "x"}, '"missing-v1"')
+    assert response.status_code == 404
+
+
+async def test_status_change_records_the_previous_state(server, db, api, manager, mechanic, job):
+    other = make_user("Mechanic", "Kiran")
+    await db.users.insert_one(dict(other))
+    response = await patch(server, api, job, manager, {"status": "Work complete", "assigned_mechanic_id": other["id"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["assigned_mechanic_name"], body["completion_date"] is not None) == ("Kiran", True)
+
+    stored = await db.jobs.find_one({"id": job["id"]})
+    assert stored["last_transition"]["status"] == "Car Received"
+    assert stored["last_transition"]["assigned_mechanic_id"] == mechanic["id"]
+    assert stored["version"] == 4
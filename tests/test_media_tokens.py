@@ -0,0 +1,69 @@
+import pytest
+
+from tests.factories import auth, make_job, make_user
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def job(server, db, mechanic):
+    job = make_job(server, mechanic)
+    await db.jobs.insert_one(dict(job))
+    return job
+
+
+async def media_token(server, api, user, path) -> str:
+    response = await api.post("/api/auth/media-token", json={"path": path}, headers=auth(server, user))
+    assert response.status_code == 200
+    assert response.json()["expires_in"] == server.MEDIA_TOKEN_TTL_SECONDS
+    return response.json()["token"]
+
+
+def voice_note_path(job) -> str:
+    return f"/api/jobs/{job['id']}/voice-note"
+
+
+async def test_media_token_opens_only_its_own_path(server, db, api, mechanic, job):
+    token = await media_token(server, api, mechanic, voice_note_path(job))
+
+    # Past auth: the job simply has no voice note
+    response = await api.get(voice_note_path(job), params={"access_token": token})
+    assert (response.status_code, response.json()["detail"]) == (404, "Voice note not found")
+
+    other = make_job(server, mechanic)
+    await db.jobs.insert_one(dict(other))
+    assert (await api.get(voice_note_path(other), params={"access_token": token})).status_code == 401
+
+
+async def test_session_token_is_refused_in_the_url(server, db, api, mechanic, job):
+    session_token = auth(server, mechanic)["Authorization"].split()[1]
+    response = await api.get(voice_note_path(job), params={"access_token": session_token})
+    assert response.status_code == 401
+    # The header still works for API clients that can send one
+    assert (await api.get(voice_note_path(job), headers=auth(server, mechanic))).status_code == 404
+
+
+async def test_media_token_is_not_a_session_token(server, db, api, mechanic, job):
+    token = await media_token(server, api, mechanic, voice_note_path(job))
+    response = await api.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert (await api.get(voice_note_path(job), headers={"Authorization": f"Bearer {token}"})).status_code == 401
+
+
+async def test_expired_media_token_is_refused(server, db, api, mechanic, job, monkeypatch):
+    monkeypatch.setattr(server, "MEDIA_TOKEN_TTL_SECONDS", -60)
+    token = server.create_media_token(mechanic["id"], voice_note_path(job))
+    assert (await api.get(voice_note_path(job), params={"access_token": token})).status_code == 401
+
+
+async def test_media_token_still_goes_through_access_checks(server, db, api, job):
+    intruder = make_user("Mechanic", "Kiran")
+    await db.users.insert_one(dict(intruder))
+    token = await media_token(server, api, intruder, voice_note_path(job))
+    assert (await api.get(voice_note_path(job), params={"access_token": token})).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/api/jobs", "/api/invoices/x/pdf", "/api/jobs/x/voice-note/../../users"])
+async def test_tokens_are_only_issued_for_media_paths(server, db, api, mechanic, path):
+    response = await api.post("/api/auth/media-token", json={"path": path}, headers=auth(server, mechanic))
+    assert response.status_code == 400
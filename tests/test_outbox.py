@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.factories import make_invoice, make_job
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sends(server, monkeypatch):
+    """Record WhatsApp sends; set `sends.fail` to make them fail"""
+    class Sends(list):
+        fail = False
+
+    sent = Sends()
+
+    def sender(message):
+        sent.append(message["id"])
+        return {"success": False, "message": "gateway down"} if sent.fail else {"success": True}
+
+    monkeypatch.setitem(server.OUTBOX_CHANNELS, "whatsapp", (sender, 2, 1000.0))
+    monkeypatch.setitem(server.outbox_rate_limiters, "whatsapp", server.ChannelRateLimiter(1000.0))
+    return sent
+
+
+async def dispatch_once(server) -> list:
+    batch = await server.claim_outbox_batch(server.OUTBOX_BATCH_SIZE)
+    await asyncio.gather(*(server.deliver_notification(message) for message in batch))
+    return batch
+
+
+async def stored(db, message) -> dict:
+    return await db.outbox.find_one({"id": message["id"]}, {"_id": 0})
+
+
+async def make_due(db, message):
+    await db.outbox.update_one(
+        {"id": message["id"]}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+
+
+async def test_delivery_marks_sent_and_flags_the_invoice(server, db, mechanic, sends):
+    invoice = make_invoice(make_job(server, mechanic))
+    await db.invoices.insert_one(dict(invoice))
+    message = await server.enqueue_notification(
+        "whatsapp", "invoice_customer", "9800000000", "Your invoice", invoice_id=invoice["id"]
+    )
+
+    assert [m["id"] for m in await dispatch_once(server)] == [message["id"]]
+    assert (await stored(db, message))["state"] == "sent"
+    updated = await db.invoices.find_one({"id": invoice["id"]})
+    assert (updated["sent_to_customer"], updated["version"]) == (True, 2)
+    assert await dispatch_once(server) == []
+    assert sends == [message["id"]]
+
+
+async def test_failures_back_off_exponentially(server, db, sends):
+    sends.fail = True
+    message = await server.enqueue_notification("whatsapp", "job_confirmation", "9800000000", "Ready")
+
+    for attempt, backoff in ((1, 5), (2, 10), (3, 20)):
+        before = datetime.now(timezone.utc)
+        await dispatch_once(server)
+        doc = await stored(db, message)
+        assert (doc["state"], doc["attempts"], doc["last_error"]) == ("pending", attempt, "gateway down")
+        delay = (server.as_utc(doc["next_attempt_at"]) - before).total_seconds()
+        assert backoff - 1 <= delay <= backoff + 1
+        # Not due yet, so nothing is claimed until the backoff passes
+        assert await dispatch_once(server) == []
+        await make_due(db, message)
+
+    sends.fail = False
+    await dispatch_once(server)
+    doc = await stored(db, message)
+    assert (doc["state"], doc["attempts"], doc["last_error"]) == ("sent", 4, None)
+
+
+async def test_gives_up_after_max_attempts(server, db, sends, monkeypatch):
+    monkeypatch.setattr(server, "OUTBOX_MAX_ATTEMPTS", 2)
+    sends.fail = True
+    message = await server.enqueue_notification("whatsapp", "job_confirmation", "9800000000", "Ready")
+
+    await dispatch_once(server)
+    await make_due(db, message)
+    await dispatch_once(server)
+    doc = await stored(db, message)
+    assert (doc["state"], doc["attempts"]) == ("failed", 2)
+
+    await make_due(db, message)
+    assert await dispatch_once(server) == []
+    assert len(sends) == 2
+
+
+async def test_expired_claims_are_reclaimed(server, db, sends):
+    dead_worker = await server.enqueue_notification("whatsapp", "job_confirmation", "9800000000", "Ready")
+    live_worker = await server.enqueue_notification("whatsapp", "job_confirmation", "9800000001", "Ready")
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=server.OUTBOX_STALE_SENDING_SECONDS + 60)
+    await db.outbox.update_one(
+        {"id": dead_worker["id"]}, {"$set": {"state": "sending", "claimed_at": long_ago, "attempts": 1}}
+    )
+    await db.outbox.update_one(
+        {"id": live_worker["id"]}, {"$set": {"state": "sending", "claimed_at": datetime.now(timezone.utc)}}
+    )
+
+    assert await server.reclaim_stale_outbox() == 1
+    assert [m["id"] for m in await dispatch_once(server)] == [dead_worker["id"]]
+    doc = await stored(db, dead_worker)
+    assert (doc["state"], doc["attempts"]) == ("sent", 2)
+    assert (await stored(db, live_worker))["state"] == "sending"
+
+
+async def test_concurrent_claims_never_share_a_message(server, db, sends):
+    messages = [
+        await server.enqueue_notification("whatsapp", "job_confirmation", f"98000000{n:02d}", "Ready")
+        for n in range(10)
+    ]
+    batches = await asyncio.gather(*(server.claim_outbox_batch(4) for _ in range(4)))
+    claimed = [message["id"] for batch in batches for message in batch]
+    assert sorted(claimed) == sorted(message["id"] for message in messages)
@@ -0,0 +1,117 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tests.fake_sheets import FakeSheetsClient
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sheets(server, monkeypatch):
+    client = FakeSheetsClient()
+    monkeypatch.setattr(server, "sheets_client_override", client)
+    monkeypatch.setattr(server, "GOOGLE_SHEET_ID", "test-sheet")
+    return client
+
+
+def worksheet_rows(server, sheets) -> list:
+    return sheets.open_by_key("test-sheet").worksheet(server.SHEETS_WORKSHEET_TITLE).rows
+
+
+def make_job(name: str, updated_at: datetime) -> dict:
+    # BSON keeps milliseconds, so build timestamps that survive the round trip unchanged
+    updated_at = updated_at.replace(microsecond=updated_at.microsecond // 1000 * 1000)
+    return {
+        "id": str(uuid.uuid4()),
+        "customer_name": name,
+        "contact_number": "9800000000",
+        "car_brand": "BMW",
+        "car_model": "M340i",
+        "year": 2022,
+        "registration_number": "MH12AB1234",
+        "vin": "WBA00000000000000",
+        "kms": 12000,
+        "entry_date": updated_at,
+        "estimated_delivery": updated_at + timedelta(days=2),
+        "assigned_mechanic_name": "Ravi",
+        "work_description": "Stage 1 tune",
+        "status": "Car Received",
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+
+
+async def test_sync_appends_then_updates_rows_in_place(server, db, sheets):
+    now = datetime.now(timezone.utc)
+    first, second = make_job("Asha", now - timedelta(minutes=2)), make_job("Vikram", now - timedelta(minutes=1))
+    await db.jobs.insert_many([first, second])
+
+    await server.run_sheets_sync(full=False, requested_by="test")
+    rows = worksheet_rows(server, sheets)
+    assert server.sheets_sync_status["state"] == "done"
+    assert rows[0] == server.SHEETS_HEADERS
+    assert [row[0] for row in rows[1:]] == [first["id"], second["id"]]
+
+    await db.jobs.update_one({"id": first["id"]}, {"$set": {"customer_name": "Asha K", "updated_at": now}})
+    await server.run_sheets_sync(full=False, requested_by="test")
+    rows = worksheet_rows(server, sheets)
+    assert len(rows) == 3
+    assert rows[1][0] == first["id"] and rows[1][1] == "Asha K"
+
+
+async def test_sync_resumes_after_a_failed_batch(server, db, sheets, monkeypatch):
+    now = datetime.now(timezone.utc)
+    jobs = [make_job(f"Customer {n}", now - timedelta(minutes=10 - n)) for n in range(4)]
+    await db.jobs.insert_many(jobs)
+    monkeypatch.setattr(server, "SHEETS_BATCH_SIZE", 2)
+
+    push_sheet_batch = server.push_sheet_batch
+    calls = []
+
+    def flaky_push(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("quota exceeded")
+        return push_sheet_batch(*args)
+
+    monkeypatch.setattr(server, "push_sheet_batch", flaky_push)
+    await server.run_sheets_sync(full=False, requested_by="test")
+    assert server.sheets_sync_status["state"] == "failed"
+    state = await db.sync_state.find_one({"_id": "google_sheets"})
+    assert server.as_utc(state["watermark"]) == jobs[1]["updated_at"]
+
+    monkeypatch.setattr(server, "push_sheet_batch", push_sheet_batch)
+    await server.run_sheets_sync(full=False, requested_by="test")
+    assert server.sheets_sync_status["state"] == "done"
+    assert [row[0] for row in worksheet_rows(server, sheets)[1:]] == [job["id"] for job in jobs]
+
+
+async def test_sync_picks_up_writes_that_land_behind_the_watermark(server, db, sheets):
+    now = datetime.now(timezone.utc)
+    await db.jobs.insert_one(make_job("Early", now - timedelta(minutes=5)))
+    await server.run_sheets_sync(full=False, requested_by="test")
+
+    # Stamped before the last run's watermark, committed after that run read past it
+    late = make_job("Late", now - timedelta(minutes=6))
+    await db.jobs.insert_one(late)
+    await server.run_sheets_sync(full=False, requested_by="test")
+    assert late["id"] in [row[0] for row in worksheet_rows(server, sheets)]
+
+
+async def test_sync_rewrites_a_sheet_from_the_old_exporter(server, db, sheets):
+    job = make_job("Asha", datetime.now(timezone.utc))
+    await db.jobs.insert_one(job)
+    worksheet = sheets.open_by_key("test-sheet").add_worksheet(server.SHEETS_WORKSHEET_TITLE, rows=1000, cols=20)
+    worksheet.rows = [
+        list(server.SHEETS_HEADERS),
+        [job["id"][:8], "Asha"],
+        [],
+        ["Exported by: Manager on 2025-01-01 10:00:00 UTC"],
+    ]
+    await db.sync_state.insert_one({"_id": "google_sheets", "watermark": datetime.now(timezone.utc)})
+
+    await server.run_sheets_sync(full=False, requested_by="test")
+    assert server.sheets_sync_status["full"] is True
+    assert [row[0] for row in worksheet_rows(server, sheets)] == [server.SHEETS_HEADERS[0], job["id"]]
@@ -0,0 +1,61 @@
+import io
+import zipfile
+from datetime import datetime, timezone
+
+import pytest
+
+from tests.factories import auth, make_invoice, make_job
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def startup(server):
+    yield server.startup_db_client
+    for task in (server.outbox_task, server.job_change_stream_task):
+        if task is not None:
+            task.cancel()
+
+
+def as_legacy(doc: dict, fields) -> dict:
+    """The document as releases before BSON dates wrote it: ISO strings"""
+    return {**doc, **{field: doc[field].isoformat() for field in fields if doc.get(field)}}
+
+
+async def test_string_dated_rows_are_served_after_startup(server, db, api, manager, mechanic, startup):
+    legacy_job = make_job(server, mechanic, datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc))
+    current_job = make_job(server, mechanic, registration_number="MH12AB9999")
+    legacy_invoice = make_invoice(legacy_job, datetime(2024, 5, 2, 11, 0, tzinfo=timezone.utc))
+    await db.jobs.insert_many([as_legacy(legacy_job, server.JOB_DATE_FIELDS), current_job])
+    await db.invoices.insert_one(as_legacy(legacy_invoice, server.INVOICE_DATE_FIELDS))
+
+    await startup()
+    stored = await db.jobs.find_one({"id": legacy_job["id"]})
+    assert all(isinstance(stored[field], datetime) for field in ("entry_date", "created_at", "updated_at"))
+    headers = auth(server, manager)
+
+    # Keyset pagination reaches the converted job instead of dropping it
+    first = (await api.get("/api/jobs", params={"limit": 1}, headers=headers)).json()
+    second = (await api.get("/api/jobs", params={"limit": 1, "cursor": first["next_cursor"]}, headers=headers)).json()
+    assert [first["items"][0]["id"], second["items"][0]["id"]] == [current_job["id"], legacy_job["id"]]
+
+    summaries = await api.get("/api/jobs/summary", headers=headers)
+    assert summaries.status_code == 200
+    assert len(summaries.json()["items"]) == 2
+
+    search = await api.get("/api/jobs/search", params={"q": "MH12AB"}, headers=headers)
+    assert [job["id"] for job in search.json()["items"]] == [current_job["id"], legacy_job["id"]]
+
+    history = await api.get(f"/api/vehicles/{legacy_job['vin']}/history", headers=headers)
+    assert history.json()["visits"] == 2
+
+    pdf = await api.get(f"/api/invoices/{legacy_invoice['id']}/pdf", headers=headers)
+    assert pdf.status_code == 200
+    assert pdf.content.startswith(b"%PDF")
+
+    export = await api.get(
+        "/api/invoices/export", params={"from_date": "2024-05-01", "to_date": "2024-05-31"}, headers=headers
+    )
+    with zipfile.ZipFile(io.BytesIO(export.content)) as archive:
+        entry = archive.getinfo(server.export_entry_name(legacy_invoice["invoice_number"]))
+    assert entry.date_time[:3] == (2024, 5, 2)